@@ -0,0 +1,71 @@
+"""
+OpenAI client configuration for the Biogen Patient Services Streamlit app.
+
+Resolves the API key and the connection pool, timeout and concurrency
+settings, and builds pooled clients from them. The process-wide client
+itself is owned by the AI service (see ai_service.py), so it is shared by
+every rerun and every session and keeps connections to the API alive
+between chat turns.
+"""
+
+import os
+
+import httpx
+import streamlit as st
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# Connection pool, timeout and concurrency defaults. Each can be overridden with
+# an OPENAI_<NAME> environment variable or a key of the [openai] secrets section.
+DEFAULT_SETTINGS = {
+    "pool_size": 20,
+    "keepalive_expiry": 60.0,
+    "connect_timeout": 5.0,
+    "read_timeout": 30.0,
+    "max_retries": 2,
+    "base_url": "",
+    "max_concurrency": 8,
+    "deadline": 30.0,
+}
+
+
+def _secret(section, name):
+    """Read a value from Streamlit secrets, returning None when absent"""
+    try:
+        return st.secrets[section][name]
+    except Exception:
+        return None
+
+
+def get_api_key():
+    """Return the OpenAI API key from the environment or Streamlit secrets"""
+    return os.getenv('OPENAI_API_KEY') or _secret('openai', 'api_key')
+
+
+def get_client_settings():
+    """Resolve pool, timeout and concurrency settings from the environment and secrets"""
+    settings = {}
+    for name, default in DEFAULT_SETTINGS.items():
+        value = os.getenv(f"OPENAI_{name.upper()}")
+        if value is None:
+            value = _secret('openai', name)
+        settings[name] = default if value is None else type(default)(value)
+    return settings
+
+
+def build_async_client(api_key, settings):
+    """Build an AsyncOpenAI client with a keep-alive connection pool"""
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings["pool_size"],
+            max_keepalive_connections=settings["pool_size"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        ),
+    )
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=settings["base_url"] or None,
+        timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"]),
+        # Retries happen in the provider router, under its shared retry budget
+        max_retries=0,
+        http_client=http_client,
+    )
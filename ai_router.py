@@ -0,0 +1,332 @@
+"""
+Model provider registry and router for the Patient Services assistant.
+
+Providers are registered by name: OpenAI, and any OpenAI-compatible local
+endpoint (vLLM, Ollama, LM Studio, ...) configured with LOCAL_AI_BASE_URL.
+The router keeps a rolling window of outcomes per provider and sends each
+request to the one with the lowest expected time to a successful answer
+(mean latency divided by success rate, with a neutral prior so a provider
+that hasn't been sampled neither jumps the queue nor gets starved) whose
+circuit breaker is closed, moving on to the next within the same request
+when a call fails. Transient failures
+(connection errors, rate limits, server errors) are retried with jittered
+backoff under a process-wide retry budget, and each provider's attempts
+share one deadline. Once every breaker is open, requests are rejected
+without any network call and the caller answers from the offline demo
+engine (assistant.demo_response) straight away.
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from functools import lru_cache
+
+import openai
+
+from ai_client import get_api_key, get_client_settings
+from ai_service import AIService, DeadlineExceeded, get_ai_service
+from instrumentation import count
+from resilience import OPEN, CircuitBreaker, RetryBudget, backoff_delay
+
+DEFAULT_LOCAL_MODEL = "llama3"
+
+# Outcomes remembered per provider for its rolling latency
+ROUTER_WINDOW = 20
+
+# Neutral prior for ranking: PRIOR_CALLS successful calls of PRIOR_LATENCY_SECONDS each
+PRIOR_LATENCY_SECONDS = 2.0
+PRIOR_CALLS = 2
+
+# Errors worth retrying on the same provider; anything else fails over at once
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+_END = object()
+
+
+class ProvidersFailed(RuntimeError):
+    """No configured provider could answer the request"""
+
+
+class Provider(ABC):
+    """A chat completion backend with the AIService complete()/stream() interface"""
+
+    name = None
+
+    def available(self):
+        return True
+
+    @abstractmethod
+    def service(self):
+        """The AIService that sends this provider's requests"""
+
+    def params(self, params):
+        return params
+
+    def complete(self, messages, **params):
+        return self.service().complete(messages, **self.params(params))
+
+    def stream(self, messages, **params):
+        return self.service().stream(messages, **self.params(params))
+
+
+@lru_cache(maxsize=8)
+def key_problem(api_key):
+    """Why an OpenAI API key can't be used, or None if it looks valid (checked once per key)"""
+    if not api_key:
+        return "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable or configure it in Streamlit secrets."
+    # Don't make an actual API call here, just validate the key format
+    if not api_key.startswith('sk-proj-'):
+        return "Invalid API key format. Please check your OpenAI API key."
+    return None
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def available(self):
+        return key_problem(get_api_key()) is None
+
+    def service(self):
+        return get_ai_service()
+
+
+class LocalProvider(Provider):
+    """An OpenAI-compatible server at LOCAL_AI_BASE_URL serving LOCAL_AI_MODEL"""
+
+    name = "local"
+
+    def __init__(self):
+        self._service = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return bool(os.getenv("LOCAL_AI_BASE_URL"))
+
+    def _config(self):
+        settings = dict(get_client_settings(), base_url=os.getenv("LOCAL_AI_BASE_URL", ""))
+        return os.getenv("LOCAL_AI_API_KEY", "local"), settings
+
+    def service(self):
+        with self._lock:
+            if self._service is None:
+                self._service = AIService(self._config, name="ai-service-local")
+            return self._service
+
+    def params(self, params):
+        return dict(params, model=os.getenv("LOCAL_AI_MODEL", DEFAULT_LOCAL_MODEL))
+
+
+PROVIDERS = {}
+
+
+def register_provider(provider):
+    """Add a provider to the registry; earlier registrations win ties when routing"""
+    PROVIDERS[provider.name] = provider
+    return provider
+
+
+register_provider(OpenAIProvider())
+register_provider(LocalProvider())
+
+
+class ProviderStats:
+    """Rolling latency and error rate for one provider"""
+
+    def __init__(self, window=ROUTER_WINDOW):
+        self.outcomes = deque(maxlen=window)  # (latency seconds, succeeded)
+
+    def record(self, latency, succeeded):
+        self.outcomes.append((latency, succeeded))
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, succeeded in self.outcomes if not succeeded) / len(self.outcomes)
+
+    @property
+    def latency(self):
+        """Mean latency of recent successful calls (0 until one has succeeded)"""
+        latencies = [latency for latency, succeeded in self.outcomes if succeeded]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    @property
+    def expected_latency(self):
+        """Seconds to a successful answer: smoothed mean latency over the smoothed success rate
+
+        Both are blended with PRIOR_CALLS successful calls of PRIOR_LATENCY_SECONDS, so an
+        unsampled provider ranks as an average one and a failing one can't score zero.
+        """
+        latencies = [latency for latency, succeeded in self.outcomes if succeeded]
+        latency = (sum(latencies) + PRIOR_CALLS * PRIOR_LATENCY_SECONDS) / (len(latencies) + PRIOR_CALLS)
+        success_rate = (len(latencies) + PRIOR_CALLS) / (len(self.outcomes) + PRIOR_CALLS)
+        return latency / success_rate
+
+
+class ProviderRouter:
+    """Sends each request to the quickest reliable provider with a closed circuit, failing over to the others"""
+
+    def __init__(self, providers=PROVIDERS, failure_threshold=3, reset_timeout=30.0, retry_budget=None):
+        self.providers = providers
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.retry_budget = retry_budget or RetryBudget()
+        self._stats = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        return [provider for provider in self.providers.values() if provider.available()]
+
+    def _stats_for(self, name):
+        # Caller holds the lock
+        if name not in self._stats:
+            self._stats[name] = ProviderStats()
+        return self._stats[name]
+
+    def breaker(self, name):
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[name]
+
+    def accepting(self):
+        """Whether any configured provider's circuit would let a request through"""
+        return any(self.breaker(provider.name).state != OPEN for provider in self.available())
+
+    def ranked(self, prefer=None):
+        """Available providers in the order requests try them"""
+        providers = self.available()
+        states = {provider.name: self.breaker(provider.name).state for provider in providers}
+        with self._lock:
+            keys = {
+                provider.name: (
+                    provider.name != prefer,
+                    states[provider.name] == OPEN,
+                    self._stats_for(provider.name).expected_latency,
+                    position,
+                )
+                for position, provider in enumerate(providers)
+            }
+        return sorted(providers, key=lambda provider: keys[provider.name])
+
+    def record(self, name, latency, succeeded):
+        with self._lock:
+            self._stats_for(name).record(latency, succeeded)
+
+    def _attempt(self, provider, call):
+        """call(deadline) against one provider, retrying transient errors within a single deadline"""
+        settings = get_client_settings()
+        expires_at = time.monotonic() + settings["deadline"]
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded(f"AI response deadline of {settings['deadline']:g}s exceeded")
+                result = call(remaining)
+            except Exception as e:
+                self.record(provider.name, time.perf_counter() - started, False)
+                delay = backoff_delay(attempt)
+                if (isinstance(e, RETRYABLE_ERRORS) and attempt < settings["max_retries"]
+                        and delay < expires_at - time.monotonic() and self.retry_budget.withdraw()):
+                    count("ai.retry")
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                raise
+            self.record(provider.name, time.perf_counter() - started, True)
+            return result
+
+    def _route(self, prefer, call):
+        """(provider, result) of call(provider, deadline) on the first provider that succeeds"""
+        self.retry_budget.deposit()
+        errors = []
+        for provider in self.ranked(prefer):
+            breaker = self.breaker(provider.name)
+            if not breaker.allow():
+                count("ai.circuit_open")
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            try:
+                result = self._attempt(provider, lambda deadline: call(provider, deadline))
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(f"{provider.name}: {e}")
+                continue
+            breaker.record_success()
+            return provider, result
+        raise ProvidersFailed("; ".join(errors) or "no AI provider is configured")
+
+    def complete(self, messages, prefer=None, **params):
+        """(provider name, completion) from the first provider that answers"""
+        provider, response = self._route(prefer, lambda provider, deadline: provider.complete(messages, deadline=deadline, **params))
+        return provider.name, response
+
+    def stream(self, messages, prefer=None, **params):
+        """Yield text chunks, failing over to the next provider until one has produced output"""
+        _, chunks = self.open_stream(messages, prefer, **params)
+        yield from chunks
+
+    def open_stream(self, messages, prefer=None, **params):
+        """(provider name, text chunks) once a provider has produced output, failing over until one does
+
+        Latency for a stream is the time to its first chunk.
+        """
+        def first_chunk(provider, deadline):
+            chunks = iter(provider.stream(messages, deadline=deadline, **params))
+            return chunks, next(chunks, _END)
+
+        provider, (chunks, first) = self._route(prefer, first_chunk)
+        return provider.name, self._relay(provider, chunks, first)
+
+    def _relay(self, provider, chunks, first):
+        if first is _END:
+            return
+        yield first
+        try:
+            yield from chunks
+        except Exception:
+            # Text already shown can't be swapped for another model's answer
+            self.breaker(provider.name).record_failure()
+            raise
+
+    def stats(self):
+        names = set(self._stats) | set(self._breakers)
+        states = {name: self.breaker(name).state for name in names}
+        with self._lock:
+            return {
+                name: {
+                    "latency": self._stats_for(name).latency,
+                    "error_rate": self._stats_for(name).error_rate,
+                    "expected_latency": self._stats_for(name).expected_latency,
+                    "calls": len(self._stats_for(name).outcomes),
+                    "circuit": states[name],
+                }
+                for name in names
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_ai_router():
+    """Return the process-wide router over the registered providers
+
+    AI_CIRCUIT_FAILURES consecutive failures (default 3) open a provider's
+    circuit for AI_CIRCUIT_RESET_SECONDS (default 30); AI_RETRY_BUDGET_RATIO
+    (default 0.2) is the share of requests that may be retried.
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter(
+                failure_threshold=int(os.getenv("AI_CIRCUIT_FAILURES", "3")),
+                reset_timeout=float(os.getenv("AI_CIRCUIT_RESET_SECONDS", "30")),
+                retry_budget=RetryBudget(ratio=float(os.getenv("AI_RETRY_BUDGET_RATIO", "0.2"))),
+            )
+        return _router
@@ -0,0 +1,194 @@
+"""
+Asynchronous AI backend for the Patient Services assistant.
+
+Provider calls run on a single background asyncio loop instead of the
+Streamlit script thread. The service bounds how many requests are in
+flight to the provider at once, coalesces identical concurrent prompts into
+one upstream call (streamed replies are fanned out to every caller that
+joins, replaying the text already received to late joiners), and enforces a
+deadline on every request. Callers use
+the blocking complete() and stream() wrappers and fall back to demo mode
+when DeadlineExceeded is raised.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import queue
+import threading
+import time
+
+from ai_client import build_async_client, get_api_key, get_client_settings
+
+_DONE = object()
+
+
+class DeadlineExceeded(TimeoutError):
+    """The provider did not answer within the request deadline"""
+
+
+def default_config():
+    """OpenAI API key and client settings from the environment and Streamlit secrets"""
+    return get_api_key(), get_client_settings()
+
+
+class _SharedStream:
+    """One upstream streaming call and the queues of every caller reading it; used only on the event loop"""
+
+    def __init__(self):
+        self.received = []
+        self.listeners = []
+        self.task = None
+
+    def publish(self, item):
+        if isinstance(item, str):
+            self.received.append(item)
+        for listener in self.listeners:
+            listener.put(item)
+
+
+class AIService:
+    """Runs provider calls on a dedicated event loop shared by all sessions
+
+    `resolve_config` returns the (api_key, settings) to call with; it is
+    re-read on every request so key and setting changes take effect live.
+    """
+
+    def __init__(self, resolve_config=default_config, name="ai-service"):
+        self._resolve_config = resolve_config
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+        self._lock = threading.Lock()
+        self._client = None
+        self._semaphore = None
+        self._settings = None
+        self._fingerprint = None
+        self._inflight = {}
+        self._streams = {}
+
+    def _configure(self):
+        """Return the pooled client, rebuilding it if the key or settings changed"""
+        api_key, settings = self._resolve_config()
+        fingerprint = (api_key, tuple(sorted(settings.items())))
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                previous = self._client
+                self._client = build_async_client(api_key, settings)
+                self._semaphore = asyncio.Semaphore(settings["max_concurrency"])
+                self._settings = settings
+                self._fingerprint = fingerprint
+                if previous is not None:
+                    asyncio.run_coroutine_threadsafe(previous.close(), self._loop)
+            return self._client, self._semaphore, self._settings
+
+    def complete(self, messages, deadline=None, **params):
+        """Return a chat completion, sharing the upstream call with identical in-flight requests"""
+        client, semaphore, settings = self._configure()
+        deadline = deadline or settings["deadline"]
+        request = dict(params, messages=messages)
+        key = self._request_key(request)
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._coalesced(key, client, semaphore, request, deadline), self._loop
+        )
+        try:
+            return future.result(deadline)
+        except (concurrent.futures.TimeoutError, asyncio.TimeoutError):
+            future.cancel()
+            raise DeadlineExceeded(f"AI response deadline of {deadline:.3g}s exceeded")
+
+    def _request_key(self, request):
+        return hashlib.sha256(json.dumps([self._fingerprint, request], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    async def _coalesced(self, key, client, semaphore, request, deadline):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(client, semaphore, request, deadline))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        # Shield the shared call so one caller giving up doesn't cancel it for the others
+        return await asyncio.wait_for(asyncio.shield(task), deadline)
+
+    def _finished(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every waiter already timed out
+
+    async def _call(self, client, semaphore, request, deadline):
+        async with semaphore:
+            return await asyncio.wait_for(client.chat.completions.create(**request), deadline)
+
+    def stream(self, messages, deadline=None, **params):
+        """Yield completion text chunks as they arrive, within the request deadline
+
+        Identical concurrent requests read one shared upstream stream, which is
+        cancelled once every caller has stopped reading.
+        """
+        client, semaphore, settings = self._configure()
+        deadline = deadline or settings["deadline"]
+        request = dict(params, messages=messages, stream=True)
+        key = self._request_key(request)
+        chunks = queue.Queue()
+        shared = asyncio.run_coroutine_threadsafe(
+            self._join_stream(key, client, semaphore, request, chunks), self._loop
+        ).result()
+        expires_at = time.monotonic() + deadline
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=max(expires_at - time.monotonic(), 0))
+                except queue.Empty:
+                    raise DeadlineExceeded(f"AI response deadline of {deadline:.3g}s exceeded")
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self._loop.call_soon_threadsafe(self._leave_stream, shared, chunks)
+
+    async def _join_stream(self, key, client, semaphore, request, chunks):
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _SharedStream()
+            shared.task = asyncio.ensure_future(self._stream(key, shared, client, semaphore, request))
+        for text in shared.received:
+            chunks.put(text)
+        shared.listeners.append(chunks)
+        return shared
+
+    def _leave_stream(self, shared, chunks):
+        shared.listeners.remove(chunks)
+        if not shared.listeners:
+            shared.task.cancel()
+
+    async def _stream(self, key, shared, client, semaphore, request):
+        try:
+            async with semaphore:
+                response = await client.chat.completions.create(**request)
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        shared.publish(chunk.choices[0].delta.content)
+        except Exception as e:
+            shared.publish(e)
+        finally:
+            # Later identical requests start a new call
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+            shared.publish(_DONE)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ai_service():
+    """Return the process-wide AI service, starting its event loop on first use"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AIService()
+        return _service
@@ -0,0 +1,311 @@
+"""
+Static styling and markup for the Patient Services Streamlit app.
+
+Imported once per process; the stylesheet is minified at import time so each
+rerun sends a smaller, identical CSS element.
+"""
+
+import re
+
+# Custom CSS with Biogen brand colors and elegant styling
+_APP_STYLESHEET = """
+    /* Import Biogen font */
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
+    
+    /* Global styles */
+    .stApp {
+        font-family: 'Inter', sans-serif;
+    }
+    
+    /* Main header with Biogen blue gradient - Mobile optimized */
+    .main-header {
+        background: linear-gradient(135deg, #003366 0%, #0066cc 50%, #0080ff 100%);
+        padding: 1.5rem 1rem;
+        border-radius: 10px;
+        color: white;
+        text-align: center;
+        margin-bottom: 1rem;
+        box-shadow: 0 4px 16px rgba(0, 102, 204, 0.2);
+        border: 1px solid rgba(255, 255, 255, 0.1);
+    }
+    
+    .main-header h1 {
+        font-size: 1.8rem;
+        font-weight: 700;
+        margin-bottom: 0.25rem;
+        text-shadow: 0 2px 4px rgba(0, 0, 0, 0.3);
+    }
+    
+    .main-header p {
+        font-size: 1rem;
+        font-weight: 300;
+        opacity: 0.9;
+        margin: 0;
+    }
+    
+    /* Mobile responsive adjustments */
+    @media (max-width: 768px) {
+        .main-header {
+            padding: 1rem 0.75rem;
+            margin-bottom: 0.75rem;
+        }
+        
+        .main-header h1 {
+            font-size: 1.5rem;
+        }
+        
+        .main-header p {
+            font-size: 0.9rem;
+        }
+    }
+    
+    /* Patient card with elegant blue gradient - Compact */
+    .user-card {
+        background: linear-gradient(135deg, #e6f3ff 0%, #cce7ff 50%, #b3d9ff 100%);
+        padding: 1rem;
+        border-radius: 10px;
+        color: #003366;
+        margin-bottom: 0.75rem;
+        border-left: 5px solid #0066cc;
+        box-shadow: 0 4px 16px rgba(0, 102, 204, 0.1);
+    }
+    
+    .user-card h2 {
+        color: #003366;
+        font-weight: 600;
+        margin-bottom: 0.5rem;
+        font-size: 1.2rem;
+    }
+    
+    /* Agent card with professional green gradient - Compact */
+    .agent-card {
+        background: linear-gradient(135deg, #f0f8f0 0%, #e0f0e0 50%, #d0e8d0 100%);
+        padding: 1rem;
+        border-radius: 10px;
+        color: #2d5a2d;
+        margin-bottom: 0.75rem;
+        border-left: 5px solid #4a7c4a;
+        box-shadow: 0 4px 16px rgba(74, 124, 74, 0.1);
+    }
+    
+    .agent-card h2 {
+        color: #2d5a2d;
+        font-weight: 600;
+        margin-bottom: 1rem;
+    }
+    
+    /* Chat messages with Biogen styling */
+    .chat-message {
+        padding: 1.25rem;
+        border-radius: 15px;
+        margin: 0.75rem 0;
+        font-size: 1rem;
+        line-height: 1.6;
+    }
+    
+    .user-message {
+        background: linear-gradient(135deg, #0066cc 0%, #0080ff 100%);
+        color: white;
+        margin-left: 25%;
+        box-shadow: 0 4px 12px rgba(0, 102, 204, 0.3);
+    }
+    
+    .ai-message {
+        background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
+        color: #333;
+        margin-right: 25%;
+        border: 2px solid #e6f3ff;
+        box-shadow: 0 4px 12px rgba(0, 102, 204, 0.1);
+    }
+    
+    /* Metric cards with Biogen styling */
+    .metric-card {
+        background: white;
+        padding: 1.5rem;
+        border-radius: 15px;
+        box-shadow: 0 4px 20px rgba(0, 102, 204, 0.1);
+        text-align: center;
+        margin: 0.75rem;
+        border: 1px solid #e6f3ff;
+        transition: transform 0.2s ease, box-shadow 0.2s ease;
+    }
+    
+    .metric-card:hover {
+        transform: translateY(-2px);
+        box-shadow: 0 8px 25px rgba(0, 102, 204, 0.15);
+    }
+    
+    .metric-card h3 {
+        color: #0066cc;
+        font-size: 2rem;
+        font-weight: 700;
+        margin-bottom: 0.5rem;
+    }
+    
+    .metric-card p {
+        color: #666;
+        font-weight: 500;
+        margin: 0;
+    }
+    
+    /* Sidebar styling */
+    .css-1d391kg {
+        background: linear-gradient(180deg, #f8f9fa 0%, #ffffff 100%);
+    }
+    
+    /* Button styling */
+    .stButton > button {
+        background: linear-gradient(135deg, #0066cc 0%, #0080ff 100%);
+        color: white;
+        border: none;
+        border-radius: 10px;
+        padding: 0.75rem 1.5rem;
+        font-weight: 600;
+        transition: all 0.3s ease;
+        box-shadow: 0 4px 12px rgba(0, 102, 204, 0.3);
+    }
+    
+    .stButton > button:hover {
+        transform: translateY(-2px);
+        box-shadow: 0 6px 20px rgba(0, 102, 204, 0.4);
+    }
+    
+    /* Input styling */
+    .stTextInput > div > div > input {
+        border: 2px solid #e6f3ff;
+        border-radius: 10px;
+        padding: 0.75rem;
+        font-size: 1rem;
+    }
+    
+    .stTextInput > div > div > input:focus {
+        border-color: #0066cc;
+        box-shadow: 0 0 0 3px rgba(0, 102, 204, 0.1);
+    }
+    
+    /* Select box styling */
+    .stSelectbox > div > div {
+        border: 2px solid #e6f3ff;
+        border-radius: 10px;
+    }
+    
+    /* Success/Error messages */
+    .stSuccess {
+        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
+        border: 1px solid #4a7c4a;
+        border-radius: 10px;
+    }
+    
+    .stError {
+        background: linear-gradient(135deg, #f8d7da 0%, #f5c6cb 100%);
+        border: 1px solid #dc3545;
+        border-radius: 10px;
+    }
+    
+    /* Journey tracker styling */
+    .journey-step {
+        background: linear-gradient(135deg, #e6f3ff 0%, #f0f8ff 100%);
+        border: 2px solid #0066cc;
+        border-radius: 10px;
+        padding: 0.75rem;
+        margin: 0.5rem 0;
+        text-align: center;
+    }
+    
+    /* Quick action buttons */
+    .quick-action {
+        background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
+        border: 2px solid #e6f3ff;
+        border-radius: 15px;
+        padding: 1.5rem;
+        text-align: center;
+        transition: all 0.3s ease;
+        cursor: pointer;
+    }
+    
+    .quick-action:hover {
+        border-color: #0066cc;
+        background: linear-gradient(135deg, #e6f3ff 0%, #f0f8ff 100%);
+        transform: translateY(-2px);
+        box-shadow: 0 8px 25px rgba(0, 102, 204, 0.15);
+    }
+    
+    /* Mobile-specific improvements */
+    @media (max-width: 768px) {
+        .stApp {
+            padding: 0.5rem;
+        }
+        
+        .user-card, .agent-card {
+            padding: 1rem;
+            margin-bottom: 1rem;
+        }
+        
+        .metric-card {
+            padding: 1rem;
+            margin: 0.5rem;
+        }
+        
+        .journey-step {
+            padding: 1rem;
+            margin: 0.5rem 0;
+        }
+        
+        .chat-message {
+            padding: 1rem;
+            margin: 0.5rem 0;
+        }
+        
+        .user-message {
+            margin-left: 15%;
+        }
+        
+        .ai-message {
+            margin-right: 15%;
+        }
+        
+        /* Sidebar improvements for mobile */
+        .css-1d391kg {
+            padding: 0.5rem;
+        }
+        
+        /* Button improvements for mobile */
+        .stButton > button {
+            padding: 0.75rem 1rem;
+            font-size: 14px;
+        }
+        
+        /* Input improvements for mobile */
+        .stTextInput > div > div > input {
+            padding: 0.75rem;
+            font-size: 16px; /* Prevents zoom on iOS */
+        }
+        
+        /* Date input improvements for mobile */
+        .stDateInput > div > div > input {
+            padding: 0.75rem;
+            font-size: 16px;
+        }
+    }
+"""
+
+_CSS_COMMENTS = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_WHITESPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION_SPACE = re.compile(r"\s*([{}:;,>])\s*")
+
+
+def minify_css(stylesheet):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    stylesheet = _CSS_COMMENTS.sub("", stylesheet)
+    stylesheet = _CSS_WHITESPACE.sub(" ", stylesheet)
+    return _CSS_PUNCTUATION_SPACE.sub(r"\1", stylesheet).strip()
+
+
+APP_CSS = f"<style>{minify_css(_APP_STYLESHEET)}</style>"
+
+HEADER_HTML = """
+<div class="main-header">
+    <h1>🏥 Patient Services</h1>
+    <p>AI powered Patient Support System</p>
+</div>
+"""
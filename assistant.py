@@ -0,0 +1,239 @@
+"""
+Streamlit-free request path for the Patient Services assistant.
+
+answer() sends one question through the FAQ retrieval, response cache, prompt
+building, provider router and demo-mode fallback, and reports how it was
+answered in an AIResult; answer_stream() takes the same path but yields the
+reply's text as it arrives, for the patient chat. It never touches Streamlit
+session state, so it can run on worker threads (the agent "Run all"
+scenarios) and from the command line (evaluate_assistant.py).
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+from ai_client import get_client_settings
+from ai_router import ProvidersFailed, get_ai_router
+from faq_retrieval import get_faq_index, thresholds as faq_thresholds
+from instrumentation import count, record_duration, timed_section
+from intents import DEMO_MATCHER
+from prompts import COMPLETION_PARAMS, build_chat_messages, count_tokens
+from response_cache import get_response_cache
+
+
+@dataclass
+class AIResult:
+    text: str
+    backend: str  # the provider that answered ("openai", "local", ...), "faq", "cache" or "demo"
+    latency: float  # seconds
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit: bool = False
+    error: str = None  # why the providers were skipped in favour of demo mode
+    incomplete: bool = False  # a streamed reply broke off after part of its text (see `error`)
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def demo_response(message, user_context):
+    """Answer from the offline intent table"""
+    return DEMO_MATCHER.classify(message.strip()).render(message, user_context)
+
+
+def faq_answer(message, user_context):
+    """(curated answer, None) for a close FAQ match, (None, grounding text) for a weaker one, else (None, None)"""
+    match = get_faq_index().search(message)
+    action = match.action(*faq_thresholds())
+    if action == "answer":
+        count("faq.answered")
+        return match.render(message, user_context), None
+    if action == "ground":
+        count("faq.grounded")
+        return None, (
+            "Patient Services FAQ answer to a related question, for reference if it applies "
+            f"(\"{match.question}\"): {match.render(message, user_context)}"
+        )
+    return None, None
+
+
+def get_service():
+    """Return the shared provider router, or None if no provider is configured"""
+    router = get_ai_router()
+    return router if router.available() else None
+
+
+class _Turn:
+    """One question's path through FAQ, cache, prompt and demo fallback, shared by answer() and answer_stream()"""
+
+    def __init__(self, message, user_context, service, recent_turns, summary, use_cache, use_faq):
+        self.message = message
+        self.user_context = user_context
+        self.service = service
+        self.recent_turns = list(recent_turns)
+        self.summary = summary
+        self.use_cache = use_cache
+        self.use_faq = use_faq
+        self.started = time.perf_counter()
+        self.messages = None
+        self.prompt_tokens = 0
+        self.error = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def prepare(self):
+        """An AIResult answered without a model call (FAQ, cache or demo mode), else None with the prompt built"""
+        text, grounding = faq_answer(self.message, self.user_context) if self.use_faq else (None, None)
+        if text is not None:
+            return AIResult(text, "faq", self.elapsed(), completion_tokens=count_tokens(text))
+        if self.service is not None and not self.service.accepting():
+            # Every provider's circuit is open: answer offline without building a prompt
+            self.service = None
+            self.error = "AI providers unavailable (circuit open)"
+        if self.service is None:
+            return self.demo()
+
+        # Follow-up questions depend on the conversation, so only standalone questions use the cache
+        self.use_cache = self.use_cache and not self.recent_turns
+        if self.use_cache:
+            cached = get_response_cache().get(self.message, self.user_context)
+            if cached is not None:
+                count("ai.cache_hit")
+                return AIResult(cached, "cache", self.elapsed(), completion_tokens=count_tokens(cached), cache_hit=True)
+            count("ai.cache_miss")
+
+        try:
+            self.messages, self.prompt_tokens = build_chat_messages(
+                self.message, self.user_context, self.recent_turns, self.summary, grounding=grounding
+            )
+        except Exception as e:
+            self.error = f"AI provider error: {e}"
+            return self.demo()
+        return None
+
+    def fail(self, error):
+        """Record why the providers couldn't answer"""
+        if isinstance(error, ProvidersFailed):
+            self.error = f"AI providers unavailable ({error})"
+        else:
+            self.error = f"AI provider error: {error}"
+
+    def answered(self, text, backend, prompt_tokens=None, completion_tokens=None):
+        if self.use_cache:
+            get_response_cache().set(self.message, self.user_context, text)
+        return AIResult(
+            text,
+            backend,
+            self.elapsed(),
+            prompt_tokens=self.prompt_tokens if prompt_tokens is None else prompt_tokens,
+            completion_tokens=count_tokens(text) if completion_tokens is None else completion_tokens,
+        )
+
+    def demo(self):
+        text = demo_response(self.message, self.user_context)
+        return AIResult(text, "demo", self.elapsed(), prompt_tokens=self.prompt_tokens,
+                        completion_tokens=count_tokens(text), error=self.error)
+
+
+def answer(message, user_context, service=None, recent_turns=(), summary=None, use_cache=True, use_faq=True):
+    """Answer one question from the FAQ, else through the provider router when `service` is given, else in demo mode
+
+    use_faq=False skips FAQ answers and grounding, so every question reaches the model.
+    """
+    turn = _Turn(message, user_context, service, recent_turns, summary, use_cache, use_faq)
+    result = turn.prepare()
+    if result is not None:
+        return result
+    try:
+        with timed_section("ai.provider"):
+            backend, response = turn.service.complete(turn.messages, **COMPLETION_PARAMS)
+        text = response.choices[0].message.content.strip()
+    except Exception as e:
+        turn.fail(e)
+        return turn.demo()
+    usage = getattr(response, "usage", None)
+    if usage:
+        return turn.answered(text, backend, usage.prompt_tokens, usage.completion_tokens)
+    return turn.answered(text, backend)
+
+
+class AnswerStream:
+    """Text chunks of one answer as they arrive; `result` holds its AIResult once iteration finishes
+
+    If the provider breaks off after some text was yielded, the partial text is
+    kept (it has already been shown) and the result is marked incomplete.
+    """
+
+    def __init__(self, turn):
+        self.result = None
+        self._turn = turn
+
+    def __iter__(self):
+        turn = self._turn
+        result = turn.prepare()
+        if result is not None:
+            self.result = result
+            yield result.text
+            return
+
+        parts = []
+        backend = None
+        started = time.perf_counter()
+        try:
+            backend, chunks = turn.service.open_stream(turn.messages, **COMPLETION_PARAMS)
+            for delta in chunks:
+                if not parts:
+                    record_duration("ai.provider_first_token", time.perf_counter() - started)
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            turn.fail(e)
+            if not parts:
+                self.result = turn.demo()
+                yield self.result.text
+                return
+            self.result = AIResult("".join(parts).strip(), backend, turn.elapsed(), prompt_tokens=turn.prompt_tokens,
+                                   completion_tokens=count_tokens("".join(parts)), error=turn.error, incomplete=True)
+            return
+        record_duration("ai.provider", time.perf_counter() - started)
+        self.result = turn.answered("".join(parts).strip(), backend)
+
+
+def answer_stream(message, user_context, service=None, recent_turns=(), summary=None, use_cache=True, use_faq=True):
+    """Like answer(), but returns an AnswerStream that yields the reply's text as the provider produces it
+
+    FAQ, cached and demo-mode replies arrive as a single chunk.
+    """
+    return AnswerStream(_Turn(message, user_context, service, recent_turns, summary, use_cache, use_faq))
+
+
+def answer_many(messages, user_context, service=None, max_workers=None, use_cache=True, use_faq=True):
+    """Answer several questions concurrently, returning AIResults in input order
+
+    The pool is bounded by OPENAI_MAX_CONCURRENCY, the same limit the AI
+    service applies to requests in flight.
+    """
+    if not messages:
+        return []
+    max_workers = max_workers or get_client_settings()["max_concurrency"]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(messages)), thread_name_prefix="assistant") as pool:
+        return list(pool.map(lambda message: answer(message, user_context, service, use_cache=use_cache, use_faq=use_faq), messages))
+
+
+def parse_scenarios(text, filename=""):
+    """Read test questions from a .txt (one per line), .json (list) or .jsonl file"""
+    if filename.endswith(".jsonl"):
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    elif filename.endswith(".json"):
+        records = json.loads(text)
+    else:
+        records = text.splitlines()
+    scenarios = []
+    for record in records:
+        message = record.get("message", "") if isinstance(record, dict) else str(record)
+        if message.strip():
+            scenarios.append(message.strip())
+    return scenarios
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Offline performance benchmarks for the Patient Services Streamlit app.
+
+Drives streamlit_app.py through Streamlit's AppTest harness against the local
+fake OpenAI server, so no API key or network access is needed. Measures:
+
+- rerun time of the patient and agent dashboards
+- generate_ai_response latency percentiles (blocking and streaming)
+- generate_demo_response throughput
+- memory and rerun time growth over a long chat session
+
+Results are written as JSON so runs can be diffed between releases:
+    python benchmarks/bench_app.py --output bench_results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "streamlit_app.py")
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_openai_server import start_fake_server
+
+PATIENT_LOGIN = 0
+AGENT_LOGIN = 1
+
+DEMO_MESSAGES = [
+    "What is Tysabri?",
+    "tell me about tysabri side effects",
+    "I've had a headache since my infusion",
+    "When is my next appointment?",
+    "Can you help with transportation?",
+    "I'm feeling anxious about my treatment",
+    "hi there",
+    "thanks so much",
+    "what should I eat before an infusion?",
+    "my insurance changed last month",
+]
+
+
+def summarize(samples):
+    """Millisecond summary statistics for a list of durations in seconds"""
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _logged_in_app(login_button):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    app.button[login_button].click().run()
+    if app.exception:
+        raise RuntimeError(f"App raised during login: {app.exception}")
+    return app
+
+
+def _ask(app, question):
+    app.text_input[0].input(question).run()
+    next(button for button in app.button if button.label.startswith("Ask")).click().run()
+
+
+def bench_dashboard_reruns(login_button, reruns):
+    app = _logged_in_app(login_button)
+    timings = []
+    script_timings = []
+    script_cpu = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+        # The app's own profile of the rerun, excluding AppTest harness overhead
+        profile = app.session_state["_rerun_profiles"][-1]
+        script_timings.append(profile["total_ms"] / 1000)
+        script_cpu.append(profile["cpu_ms"] / 1000)
+    result = summarize(timings)
+    result["script"] = summarize(script_timings)
+    result["script_cpu"] = summarize(script_cpu)
+    result["elements"] = len(list(app.main)) + len(list(app.sidebar))
+    return result
+
+
+def bench_ai_latency(app_module, requests):
+    blocking = []
+    first_token = []
+    streamed = []
+    for index in range(requests):
+        started = time.perf_counter()
+        app_module.generate_ai_response(f"Benchmark question {index}?", app_module.PATIENT_CONTEXT)
+        blocking.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        chunks = app_module.generate_ai_response(f"Streaming benchmark question {index}?", app_module.PATIENT_CONTEXT, stream=True)
+        first = None
+        for _ in chunks:
+            if first is None:
+                first = time.perf_counter() - started
+        streamed.append(time.perf_counter() - started)
+        first_token.append(first if first is not None else streamed[-1])
+    return {
+        "blocking": summarize(blocking),
+        "stream_first_token": summarize(first_token),
+        "stream_total": summarize(streamed),
+    }
+
+
+def bench_demo_throughput(app_module, iterations):
+    context = app_module.PATIENT_CONTEXT
+    started = time.perf_counter()
+    for index in range(iterations):
+        app_module.generate_demo_response(DEMO_MESSAGES[index % len(DEMO_MESSAGES)], context)
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "messages_per_second": iterations / elapsed,
+        "mean_us": elapsed / iterations * 1e6,
+    }
+
+
+def bench_long_chat(turns, sample_every):
+    app = _logged_in_app(PATIENT_LOGIN)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    samples = []
+    for turn in range(1, turns + 1):
+        _ask(app, f"Long chat question {turn}?")
+        if turn % sample_every == 0:
+            started = time.perf_counter()
+            app.run()
+            samples.append({
+                "turns": turn,
+                "rerun_ms": (time.perf_counter() - started) * 1000,
+                "traced_kib": (tracemalloc.get_traced_memory()[0] - baseline) / 1024,
+            })
+    tracemalloc.stop()
+    return {"samples": samples}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Patient Services Streamlit app")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server delay before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="fake server delay between streamed tokens")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--ai-requests", type=int, default=20)
+    parser.add_argument("--demo-iterations", type=int, default=20000)
+    parser.add_argument("--chat-turns", type=int, default=100)
+    args = parser.parse_args()
+
+    server = start_fake_server(latency=args.latency, token_delay=args.token_delay)
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-proj-benchmark",
+        "OPENAI_BASE_URL": server.base_url,
+        "AI_CACHE_PATH": "",
+        "PATIENT_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="bench-patients-"), "patients.sqlite3"),
+    })
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    import streamlit_app
+
+    print("🏁 Running Patient Services benchmarks against", server.base_url)
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "fake_server": {"latency": args.latency, "token_delay": args.token_delay},
+        },
+        "patient_dashboard_rerun": bench_dashboard_reruns(PATIENT_LOGIN, args.reruns),
+        "agent_dashboard_rerun": bench_dashboard_reruns(AGENT_LOGIN, args.reruns),
+        "generate_ai_response": bench_ai_latency(streamlit_app, args.ai_requests),
+        "generate_demo_response": bench_demo_throughput(streamlit_app, args.demo_iterations),
+        "long_chat": bench_long_chat(args.chat_turns, max(args.chat_turns // 10, 1)),
+    }
+    results["meta"]["upstream_requests"] = server.request_count
+    server.shutdown()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"  Patient dashboard rerun p50: {results['patient_dashboard_rerun']['p50_ms']:.1f} ms")
+    print(f"  Agent dashboard rerun p50:   {results['agent_dashboard_rerun']['p50_ms']:.1f} ms")
+    print(f"  Patient rerun CPU mean:      {results['patient_dashboard_rerun']['script_cpu']['mean_ms']:.2f} ms")
+    print(f"  Agent rerun CPU mean:        {results['agent_dashboard_rerun']['script_cpu']['mean_ms']:.2f} ms")
+    print(f"  AI response p50:             {results['generate_ai_response']['blocking']['p50_ms']:.1f} ms")
+    print(f"  Stream first token p50:      {results['generate_ai_response']['stream_first_token']['p50_ms']:.1f} ms")
+    print(f"  Demo responses per second:   {results['generate_demo_response']['messages_per_second']:.0f}")
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for phone number normalization.
+
+Builds a synthetic roster of phone numbers typed the ways patients and
+imports write them (separators, country code prefixes, a share of invalid
+entries) and measures:
+
+- cold normalize_many() over unique numbers with an empty memo
+- warm normalize_many() over the same roster (memoized)
+- the chained str.replace() cleanup the dashboards used before, for reference
+
+    python benchmarks/bench_phone_numbers.py --numbers 50000 --output phone_bench.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from phone_numbers import _parse, normalize_many
+
+FORMATS = (
+    "({area}) {exchange}-{line}",
+    "{area}-{exchange}-{line}",
+    "{area}.{exchange}.{line}",
+    "+1 {area} {exchange}-{line}",
+    "1-{area}-{exchange}-{line}",
+    "{area}{exchange}{line}",
+    "+44 20 {exchange}{line}",
+    "{exchange}-{line}",  # missing area code
+    "{area}-{exchange}-{line} ext 12",  # extension
+)
+
+
+def synthetic_roster(count, seed=11):
+    rng = random.Random(seed)
+    roster = set()
+    while len(roster) < count:
+        roster.add(rng.choice(FORMATS).format(
+            area=rng.randint(200, 999), exchange=rng.randint(200, 999), line=f"{rng.randint(0, 9999):04d}",
+        ))
+    return sorted(roster)
+
+
+def legacy_cleanup(number):
+    """The dashboards' previous cleanup: strip +, - and spaces, prepend 1 to ten digits"""
+    clean = number.replace('+', '').replace('-', '').replace(' ', '')
+    if len(clean) < 10:
+        return None
+    if not clean.startswith('1') and len(clean) == 10:
+        clean = '1' + clean
+    return clean
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phone number normalization throughput")
+    parser.add_argument("--numbers", type=int, default=50000)
+    parser.add_argument("--output", default="phone_bench.json")
+    args = parser.parse_args()
+
+    roster = synthetic_roster(args.numbers)
+    _parse.cache_clear()
+    (normalized, errors), cold = timed(normalize_many, roster)
+    _, warm = timed(normalize_many, roster)
+    _, legacy = timed(lambda numbers: [legacy_cleanup(number) for number in numbers], roster)
+
+    results = {
+        "numbers": len(roster),
+        "invalid": len(errors),
+        "cold_numbers_per_second": len(roster) / cold,
+        "warm_numbers_per_second": len(roster) / warm,
+        "legacy_numbers_per_second": len(roster) / legacy,
+        "memo": _parse.cache_info()._asdict(),
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"🏁 {len(roster)} numbers, {len(errors)} invalid")
+    print(f"  Cold normalize_many:  {results['cold_numbers_per_second']:,.0f} numbers/s")
+    print(f"  Warm normalize_many:  {results['warm_numbers_per_second']:,.0f} numbers/s")
+    print(f"  Legacy replace chain: {results['legacy_numbers_per_second']:,.0f} numbers/s (no validation)")
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Serves POST /v1/chat/completions with canned replies, both as a single JSON
+body and as a server-sent event stream, after a configurable delay. Point
+the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 to benchmark or
+exercise the AI paths offline without spending API credits.
+
+Run standalone:
+    python benchmarks/fake_openai_server.py --port 8765 --latency 0.4 --token-delay 0.02
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Tysabri is given as an IV infusion every 28 days, and your care team will "
+    "monitor you closely. Is there anything specific you'd like to know?"
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        settings = self.server.settings
+        self.server.record_request(request)
+
+        if settings["error_rate"] and self.server.should_fail():
+            self._send_json(500, {"error": {"message": "Simulated upstream failure"}})
+            return
+
+        time.sleep(settings["latency"])
+        reply = settings["reply"]
+        words = reply.split(" ")
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in request.get("messages", [])) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_tokens + len(words),
+        }
+
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for index, word in enumerate(words):
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(settings["token_delay"])
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        time.sleep(settings["token_delay"] * len(words))
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, token_delay=0.0, reply=DEFAULT_REPLY, error_rate=0.0):
+        super().__init__(address, FakeOpenAIHandler)
+        self.settings = {
+            "latency": latency,
+            "token_delay": token_delay,
+            "reply": reply,
+            "error_rate": error_rate,
+        }
+        self.request_count = 0
+        self._failures = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self, request):
+        with self._lock:
+            self.request_count += 1
+
+    def should_fail(self):
+        # Deterministic: fail every 1/error_rate-th request
+        with self._lock:
+            self._failures += self.settings["error_rate"]
+            if self._failures >= 1.0:
+                self._failures -= 1.0
+                return True
+            return False
+
+
+def start_fake_server(port=0, **settings):
+    """Start a fake server on a background thread and return it"""
+    server = FakeOpenAIServer(("127.0.0.1", port), **settings)
+    thread = threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        ("127.0.0.1", args.port),
+        latency=args.latency,
+        token_delay=args.token_delay,
+        reply=args.reply,
+        error_rate=args.error_rate,
+    )
+    print(f"🧪 Fake OpenAI API listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Bounded conversation memory for the patient chat.
+
+Recent turns live in a fixed-size ring buffer of slotted records. Turns that
+fall out of the buffer move to a capped archive of plain tuples, which is
+only read when the patient pages back through old messages. Only a
+token-budgeted window of recent turns is sent to the model. Older turns are
+represented by a short rolling summary of what the patient asked about.
+"""
+
+import time
+from collections import deque
+
+from prompts import TOKENS_PER_MESSAGE, count_tokens
+
+# Characters kept from each archived question in the rolling summary
+SUMMARY_SNIPPET_CHARS = 80
+
+
+class ChatTurn:
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role, content, timestamp=None):
+        self.role = role
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+
+def _snippet(text):
+    text = " ".join(text.split())
+    if len(text) <= SUMMARY_SNIPPET_CHARS:
+        return text
+    return text[:SUMMARY_SNIPPET_CHARS - 1] + "…"
+
+
+class ChatMemory:
+    """Capped chat history with an archive and a rolling summary"""
+
+    def __init__(self, max_turns=40, max_archived=1000, max_summary_topics=8):
+        self._recent = deque(maxlen=max_turns)
+        self._archive = deque(maxlen=max_archived)  # (role, content, timestamp) tuples
+        self._topics = deque(maxlen=max_summary_topics)  # questions from archived turns
+
+    def __len__(self):
+        return len(self._archive) + len(self._recent)
+
+    def __iter__(self):
+        return iter(self._recent)
+
+    def append(self, role, content):
+        if len(self._recent) == self._recent.maxlen:
+            oldest = self._recent[0]
+            self._archive.append((oldest.role, oldest.content, oldest.timestamp))
+            if oldest.role == "user":
+                self._topics.append(_snippet(oldest.content))
+        self._recent.append(ChatTurn(role, content))
+
+    def latest(self, count):
+        """Return the newest `count` turns, oldest first, reading into the archive if needed"""
+        if count <= len(self._recent):
+            return list(self._recent)[len(self._recent) - count:]
+        from_archive = min(count - len(self._recent), len(self._archive))
+        archived = list(self._archive)[len(self._archive) - from_archive:]
+        return [ChatTurn(*turn) for turn in archived] + list(self._recent)
+
+    def context_window(self, token_budget):
+        """Return (summary, messages): the recent turns that fit in the budget and a summary of the rest"""
+        messages = []
+        used = 0
+        topics = []
+        window_full = False
+        for turn in reversed(self._recent):
+            cost = count_tokens(turn.content) + TOKENS_PER_MESSAGE
+            if not window_full and used + cost <= token_budget:
+                messages.append({"role": turn.role, "content": turn.content})
+                used += cost
+                continue
+            window_full = True
+            if turn.role == "user":
+                topics.append(_snippet(turn.content))
+        # Start on a question: a reply whose question didn't fit would be an orphan
+        while messages and messages[-1]["role"] == "assistant":
+            messages.pop()
+        messages.reverse()
+        topics.reverse()
+
+        topics = (list(self._topics) + topics)[-self._topics.maxlen:]
+        summary = None
+        if topics:
+            summary = "Earlier in this conversation the patient asked about: " + "; ".join(topics)
+        return summary, messages
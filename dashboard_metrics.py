@@ -0,0 +1,145 @@
+"""
+Live agent dashboard metrics for the Patient Services app.
+
+Chat turns, contacts, scheduling changes, prior authorization updates and
+reply feedback are appended to the event log in the patient store. The
+DashboardMetrics aggregator tails that log and folds each new event into
+rolling counters in constant time, so the cards never rescan history.
+Calls Today counts each patient contacted at most once a day, however many
+times the contact buttons are pressed. Agents
+read a cached snapshot that is refreshed at most every
+DASHBOARD_REFRESH_SECONDS, however many of them are watching.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import date
+
+from patient_store import get_patient_repository
+
+CHAT_TURN = "chat_turn"
+CONTACT = "contact"
+SCHEDULE_CHANGE = "schedule_change"
+PRIOR_AUTH = "prior_auth"
+FEEDBACK = "feedback"
+
+PRIOR_AUTH_STATUSES = ("pending", "approved", "denied")
+
+# A patient counts as active if they had any event in this many days
+ACTIVE_WINDOW_DAYS = 30
+
+
+class DashboardMetrics:
+    """Rolling aggregates over the event log, updated once per event"""
+
+    def __init__(self, active_window_days=ACTIVE_WINDOW_DAYS):
+        self.active_window_days = active_window_days
+        self._lock = threading.Lock()
+        self.last_event_id = 0
+        self.today = None
+        self.today_counts = {}  # kind -> events since midnight
+        self.contacted_today = set()  # patient ids with a contact since midnight
+        self.last_active = {}  # patient_id -> day ordinal of their latest event
+        self._active_by_day = {}  # day ordinal -> patient ids last active that day
+        self._active_days = deque()  # day ordinals in _active_by_day, oldest first
+        self.prior_auth = {}  # patient_id -> latest prior authorization status
+        self.pending_prior_auths = 0
+        self.feedback_total = 0
+        self.feedback_positive = 0
+        self._snapshot = None
+        self._snapshot_at = 0.0
+
+    def _roll(self, today):
+        """Start a new day's counters and expire patients outside the active window"""
+        if today != self.today:
+            self.today = today
+            self.today_counts = {}
+            self.contacted_today = set()
+        cutoff = today - self.active_window_days
+        while self._active_days and self._active_days[0] <= cutoff:
+            for patient_id in self._active_by_day.pop(self._active_days.popleft()):
+                del self.last_active[patient_id]
+
+    def _mark_active(self, patient_id, day):
+        previous = self.last_active.get(patient_id)
+        if previous is not None and previous >= day:
+            return
+        if previous is not None:
+            self._active_by_day[previous].discard(patient_id)
+        if day not in self._active_by_day:
+            self._active_by_day[day] = set()
+            self._active_days.append(day)
+        self._active_by_day[day].add(patient_id)
+        self.last_active[patient_id] = day
+
+    def apply(self, event_id, occurred_at, kind, patient_id, payload):
+        """Fold one event into the aggregates; the caller holds the lock"""
+        self.last_event_id = event_id
+        day = date.fromtimestamp(occurred_at).toordinal()
+        if day == self.today:
+            self.today_counts[kind] = self.today_counts.get(kind, 0) + 1
+            if kind == CONTACT:
+                self.contacted_today.add(patient_id)
+        if patient_id and day > self.today - self.active_window_days:
+            self._mark_active(patient_id, day)
+
+        if kind == PRIOR_AUTH and patient_id:
+            status = payload.get("status")
+            if self.prior_auth.get(patient_id) == "pending":
+                self.pending_prior_auths -= 1
+            if status == "pending":
+                self.pending_prior_auths += 1
+            self.prior_auth[patient_id] = status
+        elif kind == FEEDBACK:
+            self.feedback_total += 1
+            self.feedback_positive += 1 if payload.get("helpful") else 0
+
+    def refresh(self, events):
+        """Apply events appended since the last refresh"""
+        with self._lock:
+            self._roll(date.today().toordinal())
+            for event in events(self.last_event_id):
+                self.apply(*event)
+
+    def snapshot(self, events, max_age):
+        """Card values, rebuilt from new events at most every max_age seconds"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_at < max_age:
+            return self._snapshot
+        self.refresh(events)
+        with self._lock:
+            self._snapshot = {
+                "active_patients": len(self.last_active),
+                "calls_today": len(self.contacted_today),
+                "chat_turns_today": self.today_counts.get(CHAT_TURN, 0),
+                "schedule_changes_today": self.today_counts.get(SCHEDULE_CHANGE, 0),
+                "pending_prior_auths": self.pending_prior_auths,
+                "satisfaction": self.feedback_positive / self.feedback_total if self.feedback_total else None,
+                "feedback_count": self.feedback_total,
+            }
+            self._snapshot_at = now
+            return self._snapshot
+
+    def prior_auth_status(self, patient_id):
+        return self.prior_auth.get(patient_id)
+
+
+_metrics = DashboardMetrics()
+
+
+def record_event(kind, patient_id=None, **payload):
+    """Append an event to the log; dashboards pick it up on their next refresh"""
+    return get_patient_repository().append_event(time.time(), kind, patient_id, payload)
+
+
+def dashboard_snapshot():
+    """Cached dashboard card values (refresh interval: DASHBOARD_REFRESH_SECONDS, default 5)"""
+    max_age = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "5"))
+    return _metrics.snapshot(get_patient_repository().iter_events, max_age)
+
+
+def prior_auth_status(patient_id):
+    """Latest prior authorization status for a patient as of the last refresh"""
+    return _metrics.prior_auth_status(patient_id)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Batch offline evaluation for the Patient Services assistant.
+
+Reads patient questions from a JSONL file, one object per line:
+
+    {"id": "q-001", "message": "What is Tysabri?", "user_context": {"name": "John Smith"}}
+
+`id` defaults to the line number and `user_context` overrides fields of the
+demo patient's context. Records without a message are skipped and reported. Each question goes through the same cache, prompt
+building, provider routing and demo-mode fallback as the app (assistant.answer),
+on a bounded worker pool. Results are appended to the output JSONL as they
+finish, so the output doubles as a checkpoint: rerunning with --resume skips
+questions that already have a result.
+
+    python evaluate_assistant.py questions.jsonl --output results.jsonl
+    python evaluate_assistant.py questions.jsonl --dry-run       # local stub server, no API key needed
+    python evaluate_assistant.py questions.jsonl --mode demo     # demo mode only
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from reference_data import PATIENT_CONTEXT
+
+
+def read_questions(path, skipped=None):
+    """Yield (id, message, user_context) for each question in a JSONL file
+
+    Line numbers of records without a message are appended to `skipped`.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            message = record.get("message")
+            if not isinstance(message, str) or not message.strip():
+                if skipped is not None:
+                    skipped.append(line_number)
+                continue
+            user_context = dict(PATIENT_CONTEXT, **record.get("user_context", {}))
+            yield str(record.get("id", line_number)), message, user_context
+
+
+def load_checkpoint(path):
+    """Return ids already answered in `path`, dropping a torn final line"""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    complete_lines = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+            complete_lines.append(line if line.endswith("\n") else line + "\n")
+    # Rewrite without any partially written record before appending to it
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.writelines(complete_lines)
+    os.replace(temporary, path)
+    return done
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+def evaluate(questions, output, service, concurrency, use_cache=True, use_faq=True):
+    """Answer questions on a bounded pool, appending each result to `output` as it finishes"""
+    from assistant import answer
+
+    def run(question_id, message, user_context):
+        result = answer(message, user_context, service, use_cache=use_cache, use_faq=use_faq)
+        record = {"id": question_id, "message": message, **result.as_dict()}
+        record["latency_ms"] = round(record.pop("latency") * 1000, 2)
+        return record
+
+    latencies = []
+    totals = {"answered": 0, "backends": {}, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="evaluate") as pool:
+        pending = set()
+        questions = iter(questions)
+        exhausted = False
+        while pending or not exhausted:
+            # Keep at most two batches queued so huge inputs are read lazily
+            while not exhausted and len(pending) < concurrency * 2:
+                question = next(questions, None)
+                if question is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(run, *question))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                latencies.append(record["latency_ms"])
+                totals["answered"] += 1
+                totals["backends"][record["backend"]] = totals["backends"].get(record["backend"], 0) + 1
+                totals["cache_hits"] += record["cache_hit"]
+                totals["errors"] += record["error"] is not None
+                totals["prompt_tokens"] += record["prompt_tokens"]
+                totals["completion_tokens"] += record["completion_tokens"]
+
+    latencies.sort()
+    totals["p50_ms"] = percentile(latencies, 0.50)
+    totals["p90_ms"] = percentile(latencies, 0.90)
+    totals["p99_ms"] = percentile(latencies, 0.99)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch offline evaluation for the Patient Services assistant")
+    parser.add_argument("questions", help="JSONL file of questions")
+    parser.add_argument("--output", default="evaluation_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=None, help="worker threads (default OPENAI_MAX_CONCURRENCY)")
+    parser.add_argument("--mode", choices=("auto", "model", "demo"), default="auto",
+                        help="auto routes to the configured model providers (OpenAI, LOCAL_AI_BASE_URL) and uses demo mode if there are none")
+    parser.add_argument("--resume", action="store_true", help="skip questions already present in the output file")
+    parser.add_argument("--no-cache", action="store_true", help="always call the provider instead of answering from the FAQ or the response cache")
+    parser.add_argument("--dry-run", action="store_true", help="send requests to a local stub server instead of OpenAI")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="stub server delay in seconds (with --dry-run)")
+    args = parser.parse_args()
+
+    server = None
+    if args.dry_run:
+        from benchmarks.fake_openai_server import start_fake_server
+
+        server = start_fake_server(latency=args.stub_latency)
+        os.environ.update({
+            "OPENAI_API_KEY": "sk-proj-dry-run",
+            "OPENAI_BASE_URL": server.base_url,
+            "AI_CACHE_PATH": "",
+        })
+        print(f"🧪 Dry run against stub server at {server.base_url}")
+
+    try:
+        from ai_client import get_client_settings
+        from assistant import get_service
+
+        service = None if args.mode == "demo" else get_service()
+        if args.mode == "model" and service is None:
+            sys.exit("❌ No model provider configured (set OPENAI_API_KEY or LOCAL_AI_BASE_URL, or use --dry-run)")
+        concurrency = args.concurrency or get_client_settings()["max_concurrency"]
+
+        done = load_checkpoint(args.output) if args.resume else set()
+        if done:
+            print(f"⏩ Resuming: {len(done)} questions already answered in {args.output}")
+        skipped = []
+        questions = (question for question in read_questions(args.questions, skipped) if question[0] not in done)
+
+        providers = ", ".join(provider.name for provider in service.available()) if service else "demo mode"
+        print(f"🏁 Evaluating with {providers} on {concurrency} workers")
+        with open(args.output, "a" if args.resume else "w", encoding="utf-8") as output:
+            totals = evaluate(questions, output, service, concurrency, use_cache=not args.no_cache, use_faq=not args.no_cache)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if skipped:
+        lines = ", ".join(map(str, skipped[:10])) + (", ..." if len(skipped) > 10 else "")
+        print(f"⚠️ Skipped {len(skipped)} without a message: line {lines}")
+
+    backends = ", ".join(f"{count} {backend}" for backend, count in sorted(totals["backends"].items()))
+    print(f"  Answered:       {totals['answered']} ({backends or 'none'})")
+    print(f"  Cache hits:     {totals['cache_hits']}")
+    print(f"  Fallbacks:      {totals['errors']}")
+    print(f"  Latency p50/p90/p99: {totals['p50_ms']:.1f} / {totals['p90_ms']:.1f} / {totals['p99_ms']:.1f} ms")
+    print(f"  Tokens:         {totals['prompt_tokens']} prompt, {totals['completion_tokens']} completion")
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Curated FAQ retrieval ahead of the language model.
+
+Each FAQ entry lists a few phrasings of a question and the curated answer
+(the demo-mode intent responses, plus entries of its own). All phrasings are
+embedded once with a TF-IDF model over word unigrams and bigrams into one
+L2-normalized numpy matrix, so a question is scored against the whole corpus
+with a single matrix-vector product. Words the corpus has never seen still
+count towards the question's length, so "can I drink alcohol on Tysabri"
+doesn't look like a close match for "what is Tysabri".
+
+A match above FAQ_DIRECT_SIMILARITY is answered straight from the FAQ; a
+weaker match above FAQ_GROUNDING_SIMILARITY is handed to the model as
+grounding for its answer. Questions that mention an urgent symptom or
+self-harm (RED_FLAGS) are at most used for grounding, however close the match.
+
+Try some questions:
+    python faq_retrieval.py "what's tysabri?" "is it ok to drink wine on tysabri"
+"""
+
+import argparse
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from intents import DEMO_INTENTS, Intent
+
+INTENTS = {intent.name: intent for intent in DEMO_INTENTS}
+
+STOPWORDS = frozenset("""
+a about am an and any are at be been being can could did do does for from get got have how i i'm if in is it
+its me my of on or our should so tell that the their there this to was we were what when where which who why
+will with would you your s d ll m re ve
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Urgent symptoms (infection, PML, allergic reaction) and self-harm: a question
+# mentioning one needs more than a canned answer, so it is never answered from the FAQ alone
+RED_FLAGS = re.compile(
+    r"\b(stiff neck|fever\w*|confus\w*|vision|seizure\w*|weakness|chest pain|short(ness)? of breath|"
+    r"can'?t breathe|trouble breathing|faint\w*|swell\w*|hives|suicid\w*|kill myself|hurt myself|harm myself|want to die)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class FaqEntry:
+    intent: Intent  # name and answer template
+    questions: tuple
+
+
+@dataclass(frozen=True)
+class FaqMatch:
+    entry: FaqEntry
+    question: str  # the phrasing that matched best
+    score: float  # cosine similarity, 0-1
+    red_flag: bool = False  # the question mentions an urgent symptom or self-harm
+
+    def action(self, direct, grounding):
+        """"answer" straight from the FAQ, "ground" the model's answer with it, or "skip" it"""
+        if self.score >= direct and not self.red_flag:
+            return "answer"
+        return "ground" if self.score >= grounding else "skip"
+
+    def render(self, message, user_context):
+        return self.entry.intent.render(message, user_context)
+
+
+FAQ_ENTRIES = (
+    FaqEntry(INTENTS["tysabri"], (
+        "what is tysabri", "tell me about tysabri", "what is natalizumab", "how does tysabri work",
+        "what does tysabri do for ms",
+    )),
+    FaqEntry(INTENTS["side_effects"], (
+        "what are the side effects of tysabri", "side effects", "does tysabri have side effects",
+        "what reactions can tysabri cause",
+    )),
+    FaqEntry(INTENTS["headache"], (
+        "i have a headache after my infusion", "headaches after tysabri", "what can i take for a headache",
+        "is a headache normal after infusion",
+    )),
+    FaqEntry(INTENTS["appointment"], (
+        "when is my next appointment", "when is my next infusion", "how often are infusions",
+        "can i reschedule my appointment", "appointment schedule",
+    )),
+    FaqEntry(INTENTS["transportation"], (
+        "can you help me get a ride to my infusion", "i need transportation to my appointment",
+        "can you book an uber", "how do i get to the infusion center",
+    )),
+    FaqEntry(INTENTS["emotional_support"], (
+        "i am worried about starting treatment", "i feel anxious", "i am scared of the infusion",
+        "i am nervous about tysabri",
+    )),
+    FaqEntry(Intent(
+        name="infusion_length",
+        priority=0,
+        keywords=(),
+        response="A Tysabri infusion takes about an hour, and you'll stay for about an hour afterwards so the team can watch for any reactions, so plan on roughly two hours at the center. You can read, use your phone or bring someone along. Would you like help planning the ride there and back?",
+    ), (
+        "how long does an infusion take", "how long will i be at the infusion center",
+        "how long is the tysabri infusion", "how much time does the infusion take",
+    )),
+)
+
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def tokenize(text):
+    """Lower-cased content words with plural "s" stripped, plus adjacent-word bigrams"""
+    words = [_stem(word) for word in _WORD.findall(text.casefold()) if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class FaqIndex:
+    """TF-IDF vectors for every FAQ phrasing in one normalized matrix"""
+
+    def __init__(self, entries=FAQ_ENTRIES):
+        self.entries = entries
+        phrasings = [(entry, question) for entry in entries for question in entry.questions]
+        self._rows = phrasings
+        documents = [tokenize(question) for _, question in phrasings]
+        self.vocabulary = {term: index for index, term in enumerate(sorted({term for terms in documents for term in terms}))}
+        frequency = np.zeros(len(self.vocabulary))
+        for terms in documents:
+            frequency[[self.vocabulary[term] for term in set(terms)]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + frequency)) + 1
+        # A word the corpus has never seen weighs like a typical corpus word
+        self.unseen_idf = float(np.median(self.idf))
+        self.matrix = np.vstack([self._vector(terms) for terms in documents]).astype(np.float32)
+
+    def _vector(self, terms):
+        """Unit TF-IDF vector over the vocabulary (unseen words count towards the norm)"""
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        vector = np.zeros(len(self.vocabulary))
+        unseen = 0.0
+        for term, tf in counts.items():
+            weight = 1 + math.log(tf)
+            if term in self.vocabulary:
+                vector[self.vocabulary[term]] = weight * self.idf[self.vocabulary[term]]
+            elif " " not in term:
+                # Unseen bigrams are mostly new word pairings, so only unseen words dilute the match
+                unseen += (weight * self.unseen_idf) ** 2
+        norm = math.sqrt(float(vector @ vector) + unseen)
+        return vector / norm if norm else vector
+
+    def search(self, question):
+        """Best-matching FaqMatch for a question (score 0 when nothing overlaps)"""
+        scores = self.matrix @ self._vector(tokenize(question)).astype(np.float32)
+        best = int(np.argmax(scores))
+        entry, phrasing = self._rows[best]
+        return FaqMatch(entry, phrasing, float(scores[best]), RED_FLAGS.search(question) is not None)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_faq_index():
+    """Return the process-wide FAQ index, embedding the corpus on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FaqIndex()
+        return _index
+
+
+def thresholds():
+    """(direct, grounding) similarity thresholds from FAQ_DIRECT_SIMILARITY / FAQ_GROUNDING_SIMILARITY"""
+    return float(os.getenv("FAQ_DIRECT_SIMILARITY", "0.9")), float(os.getenv("FAQ_GROUNDING_SIMILARITY", "0.3"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show FAQ matches for questions")
+    parser.add_argument("questions", nargs="+")
+    args = parser.parse_args()
+
+    index = get_faq_index()
+    direct, grounding = thresholds()
+    for question in args.questions:
+        started = time.perf_counter()
+        match = index.search(question)
+        elapsed = (time.perf_counter() - started) * 1000
+        action = match.action(direct, grounding)
+        print(f"{match.score:.2f} {action:6} {elapsed:.3f} ms  {question!r} -> {match.entry.intent.name} ({match.question!r})")
+
+
+if __name__ == "__main__":
+    main()
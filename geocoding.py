@@ -0,0 +1,373 @@
+"""
+Offline geocoding for patient addresses.
+
+Addresses are normalized (case folding, street-suffix, direction and state
+abbreviations folded, unit numbers dropped, ZIP+4 trimmed to the ZIP) and
+resolved against a local gazetteer instead of an external API: street
+centroids (data/street_centroids.csv) first, then ZIP code centroids
+(data/zip_centroids.csv), then city centroids. A misspelt city is matched
+to a close spelling. A misspelt street is matched only when the typo is in
+the street name, the street type is the same and only one known street
+fits, and the result is marked "street_approx" rather than "street".
+Results go into a SQLite cache on disk, so repeated addresses never
+recompute. An address that differs from a cached one only by such a typo,
+with the same house number in the same ZIP code or city, reuses that
+result, also as "street_approx".
+"""
+
+import csv
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DEFAULT_GAZETTEER = os.path.join(DATA_DIR, "zip_centroids.csv")
+DEFAULT_STREETS = os.path.join(DATA_DIR, "street_centroids.csv")
+
+# Similarity (difflib ratio) needed to accept a misspelt city name
+GAZETTEER_CUTOFF = 0.8
+
+# Result precisions, most precise first
+STREET = "street"
+STREET_APPROX = "street_approx"  # street name matched by correcting a typo
+ZIP = "zip"
+CITY = "city"
+PRECISION_LABELS = {STREET: "street address", STREET_APPROX: "closest street spelling", ZIP: "ZIP code", CITY: "city"}
+
+ABBREVIATIONS = {
+    "street": "st", "str": "st", "avenue": "ave", "av": "ave", "boulevard": "blvd", "drive": "dr",
+    "road": "rd", "lane": "ln", "court": "ct", "place": "pl", "parkway": "pkwy", "highway": "hwy",
+    "expressway": "expy", "circle": "cir", "terrace": "ter", "square": "sq", "trail": "trl",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    "apartment": "apt", "suite": "ste", "floor": "fl", "room": "rm", "building": "bldg",
+    "mount": "mt", "fort": "ft",
+}
+STREET_SUFFIXES = {"st", "ave", "blvd", "dr", "rd", "ln", "ct", "pl", "pkwy", "hwy", "expy", "cir", "ter", "sq", "trl", "way", "real"}
+UNIT_DESIGNATORS = {"apt", "ste", "unit", "fl", "rm", "bldg"}
+STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca", "colorado": "co",
+    "connecticut": "ct", "delaware": "de", "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id",
+    "illinois": "il", "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny", "north carolina": "nc",
+    "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa",
+    "rhode island": "ri", "south carolina": "sc", "south dakota": "sd", "tennessee": "tn", "texas": "tx",
+    "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa", "west virginia": "wv",
+    "wisconsin": "wi", "wyoming": "wy", "district of columbia": "dc",
+}
+STATE_CODES = set(STATES.values())
+
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+_STATE_NAMES = re.compile(r"\b(" + "|".join(sorted(STATES, key=len, reverse=True)) + r")\b")
+_PUNCTUATION = re.compile(r"[^\w\s,#]")
+
+
+@dataclass(frozen=True)
+class NormalizedAddress:
+    number: str = ""
+    street: str = ""
+    city: str = ""
+    state: str = ""
+    zip: str = ""
+
+    @property
+    def key(self):
+        """Canonical text used as the cache key"""
+        line = " ".join(part for part in (self.number, self.street) if part)
+        region = " ".join(part for part in (self.state, self.zip) if part)
+        return ", ".join(part for part in (line, self.city, region) if part)
+
+    @property
+    def partition(self):
+        """Near duplicates are only looked for among cached addresses in the same ZIP code or city"""
+        return self.zip or self.city
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    lat: float
+    lon: float
+    precision: str  # STREET, STREET_APPROX, ZIP or CITY
+
+    @property
+    def point(self):
+        return self.lat, self.lon
+
+
+def _fold(text):
+    """Case-fold, strip punctuation and unit numbers, and abbreviate street words"""
+    text = _STATE_NAMES.sub(lambda match: STATES[match.group(1)], _PUNCTUATION.sub(" ", text.casefold()))
+    tokens = []
+    skip_next = False
+    for token in text.replace("#", " # ").split():
+        token = ABBREVIATIONS.get(token, token)
+        if skip_next:
+            skip_next = False
+        elif token == "#" or token in UNIT_DESIGNATORS:
+            skip_next = True
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def normalize_address(address):
+    """Split a free-text US address into canonical number, street, city, state and ZIP"""
+    zip_code = ""
+    matches = list(ZIP_PATTERN.finditer(address))
+    # A leading five-digit house number is not a ZIP code
+    if matches and not (matches[-1].start() == 0 and address[matches[-1].end():].strip(" ,")):
+        zip_code = matches[-1].group(1)
+        address = address[:matches[-1].start()] + address[matches[-1].end():]
+
+    parts = [tokens for tokens in (_fold(part) for part in address.split(",")) if tokens]
+    number, street_tokens, rest = "", [], [token for tokens in parts[1:] for token in tokens]
+    if parts and parts[0][0].isdigit():
+        number, *street_tokens = parts[0]
+        if len(parts) == 1:
+            # No commas: the street runs up to its suffix, the city follows
+            for position, token in enumerate(street_tokens):
+                if token in STREET_SUFFIXES:
+                    street_tokens, rest = street_tokens[:position + 1], street_tokens[position + 1:]
+                    break
+    elif parts and parts[0][-1] in STREET_SUFFIXES:
+        street_tokens = parts[0]
+    else:
+        rest = [token for tokens in parts for token in tokens]
+    state = rest.pop() if rest and rest[-1] in STATE_CODES else ""
+    return NormalizedAddress(number, " ".join(street_tokens), " ".join(rest), state, zip_code)
+
+
+def _close_match(word, candidates, cutoff):
+    matches = difflib.get_close_matches(word, candidates, n=1, cutoff=cutoff)
+    return matches[0] if matches else None
+
+
+def _split_street(street):
+    """(name, type) of a normalized street, e.g. ("lytton", "ave")"""
+    name, _, kind = street.rpartition(" ")
+    return (name, kind) if name and kind in STREET_SUFFIXES else (street, "")
+
+
+def _typo_allowance(name):
+    """Edits tolerated in a street name: none for short names, one from 5 letters, two from 9"""
+    letters = len(name.replace(" ", ""))
+    return 0 if letters < 5 else 1 if letters < 9 else 2
+
+
+def _edit_distance(first, second, limit):
+    """Optimal string alignment distance (a transposition is one edit), capped at limit + 1"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+def street_typo_match(street, candidates):
+    """The one candidate street that `street` misspells, or None
+
+    Only the name may differ, within its typo allowance; the street type
+    must be the same. Two or more candidates within reach is ambiguous.
+    """
+    name, kind = _split_street(street)
+    allowance = _typo_allowance(name)
+    if not allowance:
+        return None
+    matches = []
+    for candidate in candidates:
+        candidate_name, candidate_kind = _split_street(candidate)
+        if candidate != street and candidate_kind == kind and _edit_distance(name, candidate_name, allowance) <= allowance:
+            matches.append(candidate)
+    return matches[0] if len(matches) == 1 else None
+
+
+class Gazetteer:
+    """Street, ZIP and city centroids loaded from local CSV files"""
+
+    def __init__(self, zip_path, streets_path=None):
+        self.zips = {}  # zip -> (lat, lon)
+        cities = {}  # city -> [(lat, lon)]
+        with open(zip_path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                point = (float(row["lat"]), float(row["lon"]))
+                self.zips[row["zip"]] = point
+                cities.setdefault(" ".join(_fold(row["city"])), []).append(point)
+        # A city without a ZIP resolves to the mean of its ZIP centroids
+        self.cities = {
+            city: (sum(lat for lat, _ in points) / len(points), sum(lon for _, lon in points) / len(points))
+            for city, points in cities.items()
+        }
+        self.streets = {}  # zip or city -> {street: (lat, lon)}
+        if streets_path and os.path.exists(streets_path):
+            with open(streets_path, encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    point = (float(row["lat"]), float(row["lon"]))
+                    street = " ".join(_fold(row["street"]))
+                    self.streets.setdefault(row["zip"], {})[street] = point
+                    self.streets.setdefault(" ".join(_fold(row["city"])), {})[street] = point
+
+    def _street(self, address):
+        """(point, precision) for the street in its ZIP code or city, or None"""
+        for area in (address.zip, address.city):
+            streets = self.streets.get(area)
+            if streets and address.street:
+                if address.street in streets:
+                    return streets[address.street], STREET
+                street = street_typo_match(address.street, streets)
+                if street:
+                    return streets[street], STREET_APPROX
+        return None
+
+    def _city(self, address):
+        if address.city in self.cities:
+            return self.cities[address.city]
+        # Free text without commas: look for a known city name anywhere in it
+        text = f" {address.street} {address.city} "
+        for city, point in self.cities.items():
+            if f" {city} " in text:
+                return point
+        city = _close_match(address.city, self.cities, GAZETTEER_CUTOFF) if address.city else None
+        return self.cities[city] if city else None
+
+    def resolve(self, address):
+        """GeocodeResult for a NormalizedAddress, most precise match first, or None"""
+        street = self._street(address)
+        if street is not None:
+            (lat, lon), precision = street
+            return GeocodeResult(lat, lon, precision)
+        for precision, point in ((ZIP, self.zips.get(address.zip)), (CITY, self._city(address))):
+            if point is not None:
+                return GeocodeResult(point[0], point[1], precision)
+        return None
+
+
+class Geocoder:
+    """Gazetteer lookups behind an exact and street-typo cache, persisted to SQLite"""
+
+    def __init__(self, gazetteer, db_path=None):
+        self.gazetteer = gazetteer
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._entries = {}  # key -> GeocodeResult, or None for addresses the gazetteer cannot place
+        self._streets = {}  # (zip or city, house number) -> {street: key} of cached street-level results
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS geocodes (
+                key TEXT PRIMARY KEY,
+                partition TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                precision TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+        for key, lat, lon, precision in self._db.execute("SELECT key, lat, lon, precision FROM geocodes"):
+            self._remember(normalize_address(key), GeocodeResult(lat, lon, precision))
+
+    def _remember(self, address, result):
+        # Caller holds the lock, except while the cache is being opened
+        self._entries[address.key] = result
+        if result is not None and result.precision == STREET:
+            self._streets.setdefault((address.partition, address.number), {})[address.street] = address.key
+
+    def locate(self, address):
+        """GeocodeResult for a free-text address, or None if it cannot be placed"""
+        normalized = normalize_address(address)
+        key = normalized.key
+        if not key:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            # The same house number on a misspelling of a street already placed nearby
+            cached = self._streets.get((normalized.partition, normalized.number), {})
+            street = street_typo_match(normalized.street, cached) if normalized.number else None
+            if street is not None:
+                self.fuzzy_hits += 1
+                original = self._entries[cached[street]]
+                result = GeocodeResult(original.lat, original.lon, STREET_APPROX)
+                self._entries[key] = result
+                return result
+            self.misses += 1
+
+        result = self.gazetteer.resolve(normalized)
+        with self._lock:
+            if key not in self._entries:
+                self._remember(normalized, result)
+                if result is not None and self._db is not None:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO geocodes (key, partition, lat, lon, precision, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, normalized.partition, result.lat, result.lon, result.precision, time.time()),
+                    )
+                    self._db.commit()
+        return result
+
+    def geocode(self, address):
+        result = self.locate(address)
+        return result.point if result else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.fuzzy_hits + self.misses
+            return {
+                "hits": self.hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.fuzzy_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Return the process-wide geocoder, loading the gazetteer and cache on first use"""
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = Geocoder(
+                Gazetteer(
+                    os.getenv("GEOCODER_GAZETTEER_PATH") or DEFAULT_GAZETTEER,
+                    os.getenv("GEOCODER_STREETS_PATH") or DEFAULT_STREETS,
+                ),
+                db_path=os.getenv("GEOCODER_CACHE_PATH", os.path.join(".cache", "geocodes.sqlite3")) or None,
+            )
+        return _geocoder
+
+
+def geocode(address):
+    """(lat, lon) for an address from the offline gazetteer, or None"""
+    return get_geocoder().geocode(address)
+
+
+def locate(address):
+    """GeocodeResult (with its precision) for an address, or None"""
+    return get_geocoder().locate(address)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Infusion schedule engine for the Patient Services app.
+
+Appointment series are numpy datetime64[D] arrays computed in one
+vectorized step from a RecurrenceRule: an interval and count, plus the
+days the clinic is closed (weekdays it doesn't open, holidays and any
+per-patient skip dates). Each nominal date is rolled forward to the next
+open day with numpy.busday_offset, so a closure shifts one infusion without
+dragging the rest of the series. The same code computes one patient's
+series, reschedules from an edited date, and regenerates every patient's
+schedule in bulk.
+
+Regenerate schedules for the whole patient store:
+    python infusion_schedule.py --regenerate
+"""
+
+import argparse
+import re
+import time
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from reference_data import CLINIC_HOLIDAYS
+
+INFUSION_INTERVAL_DAYS = 28
+SERIES_LENGTH = 6
+DEFAULT_START = "2025-10-25"
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+_HOURS_PATTERN = re.compile(
+    r"(?P<days>[A-Za-z,\- ]+?)\s+(?P<open>\d{1,2}(?::\d{2})?\s*[AP]M)\s*-\s*(?P<close>\d{1,2}(?::\d{2})?\s*[AP]M)",
+    re.IGNORECASE,
+)
+
+
+def _parse_time(text):
+    """'8AM' -> 8.0, '5:30PM' -> 17.5"""
+    match = re.fullmatch(r"(\d{1,2})(?::(\d{2}))?\s*([AP]M)", text.strip(), re.IGNORECASE)
+    hour = int(match.group(1)) % 12 + (12 if match.group(3).upper() == "PM" else 0)
+    return hour + int(match.group(2) or 0) / 60
+
+
+def _parse_days(text):
+    """'Mon-Fri' or 'Mon,Wed,Fri' -> numpy weekmask string such as '1111100'"""
+    open_days = [False] * 7
+    for part in text.split(","):
+        bounds = [WEEKDAYS.index(day.strip()[:3].title()) for day in part.split("-")]
+        first, last = bounds[0], bounds[-1]
+        for offset in range((last - first) % 7 + 1):
+            open_days[(first + offset) % 7] = True
+    return "".join("1" if is_open else "0" for is_open in open_days)
+
+
+def parse_clinic_hours(hours):
+    """Parse center hours like 'Mon-Fri 8AM-6PM' into (weekmask, open_hour, close_hour)"""
+    match = _HOURS_PATTERN.fullmatch(hours.strip())
+    if match is None:
+        raise ValueError(f"Unrecognized clinic hours: {hours!r}")
+    return _parse_days(match.group("days")), _parse_time(match.group("open")), _parse_time(match.group("close"))
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    interval_days: int = INFUSION_INTERVAL_DAYS
+    count: int = SERIES_LENGTH
+    weekmask: str = "1111111"  # Mon..Sun, 1 = clinic open
+    holidays: tuple = CLINIC_HOLIDAYS  # clinic-wide closures
+    skip_dates: tuple = ()  # dates this patient cannot attend
+
+    @classmethod
+    def for_clinic(cls, hours, **overrides):
+        """Rule for the days a center whose hours read like 'Mon-Fri 8AM-6PM' is open
+
+        Series are whole dates; the slot allocator places each visit within the opening hours.
+        """
+        weekmask, _, _ = parse_clinic_hours(hours)
+        return cls(weekmask=weekmask, **overrides)
+
+    def closed_dates(self):
+        return np.array(self.holidays + self.skip_dates, dtype="datetime64[D]")
+
+
+DEFAULT_RULE = RecurrenceRule()
+
+
+def as_dates(values):
+    """Coerce ISO strings, dates or datetime64 values to a datetime64[D] array"""
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def bulk_appointment_series(starts, rule=DEFAULT_RULE):
+    """Schedules for many patients at once: one row of rule.count dates per start date"""
+    starts = as_dates(starts).reshape(-1)
+    nominal = starts[:, None] + np.arange(rule.count) * np.timedelta64(rule.interval_days, "D")
+    return np.busday_offset(nominal, 0, roll="forward", weekmask=rule.weekmask, holidays=rule.closed_dates())
+
+
+def appointment_series(start=DEFAULT_START, rule=DEFAULT_RULE):
+    """One patient's appointment series starting on (or after, if closed) `start`"""
+    return bulk_appointment_series([start], rule)[0]
+
+
+def reschedule_series(appointments, new_date, rule=DEFAULT_RULE):
+    """Keep appointments before `new_date`, then continue the series from it"""
+    appointments = as_dates(appointments)
+    kept = appointments[appointments < np.datetime64(new_date, "D")][: rule.count - 1]
+    following = appointment_series(new_date, replace(rule, count=rule.count - len(kept)))
+    return np.concatenate([kept, following])
+
+
+def to_iso(dates):
+    """datetime64[D] array -> list of YYYY-MM-DD strings"""
+    return np.datetime_as_string(as_dates(dates), unit="D").tolist()
+
+
+def regenerate_all(repository, rule=DEFAULT_RULE, batch_size=50000):
+    """Rebuild every patient's series from their next appointment; returns patients updated"""
+    updated = 0
+    for patient_ids, starts in repository.iter_next_appointments(batch_size):
+        schedules = bulk_appointment_series(starts, rule)
+        repository.save_appointments_bulk(patient_ids, np.datetime_as_string(schedules, unit="D"))
+        updated += len(patient_ids)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Infusion schedule engine")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild every patient's schedule in the patient store")
+    parser.add_argument("--clinic-hours", default=None, help="only schedule on days these hours are open, e.g. 'Mon-Fri 8AM-6PM'")
+    args = parser.parse_args()
+
+    rule = RecurrenceRule.for_clinic(args.clinic_hours) if args.clinic_hours else DEFAULT_RULE
+    if not args.regenerate:
+        print("\n".join(to_iso(appointment_series(rule=rule))))
+        return
+
+    from patient_store import get_patient_repository
+
+    started = time.perf_counter()
+    updated = regenerate_all(get_patient_repository(), rule)
+    print(f"✅ Regenerated {updated} schedules in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
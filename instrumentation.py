@@ -0,0 +1,277 @@
+"""
+Rerun-cost instrumentation for the Patient Services Streamlit app.
+
+Each script rerun gets a RerunProfile that records wall time per dashboard
+section, AI provider latency, response cache hits and misses, and the number
+of elements sent to the browser. Finished profiles are kept in session state
+for the opt-in debug sidebar panel and folded into process-wide aggregates.
+The aggregates can be logged as JSON lines (METRICS_LOG=true) and scraped in
+Prometheus text format from http://$METRICS_HOST:$METRICS_PORT/metrics
+(localhost by default).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger("patient_services.metrics")
+
+# Finished rerun profiles kept per session for the debug panel
+PROFILES_PER_SESSION = 20
+
+# Streamlit releases (major, minor) whose private ScriptRunContext._enqueue the element count wraps
+ELEMENT_COUNT_VERSIONS = ((1, 28), (1, 66))
+
+_local = threading.local()
+
+
+class RerunProfile:
+    __slots__ = ("started_at", "started_cpu", "sections", "counters", "elements", "total", "cpu")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.started_cpu = time.thread_time()
+        self.sections = {}  # name -> seconds
+        self.counters = {}  # name -> count
+        self.elements = None
+        self.total = None
+        self.cpu = None
+
+    def as_dict(self):
+        return {
+            "total_ms": round((self.total or 0) * 1000, 2),
+            "cpu_ms": round((self.cpu or 0) * 1000, 2),
+            "sections_ms": {name: round(seconds * 1000, 2) for name, seconds in self.sections.items()},
+            "counters": dict(self.counters),
+            "elements": self.elements,
+        }
+
+
+class MetricsRegistry:
+    """Process-wide totals across every session and rerun"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations = {}  # name -> [count, total seconds, max seconds]
+        self.counters = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            entry = self.durations.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {name: list(entry) for name, entry in self.durations.items()}, dict(self.counters)
+
+    def prometheus_text(self):
+        durations, counters = self.snapshot()
+        lines = [
+            "# HELP patient_services_section_seconds Wall time spent per app section or AI call",
+            "# TYPE patient_services_section_seconds summary",
+        ]
+        for name, (count, total, _) in sorted(durations.items()):
+            lines.append(f'patient_services_section_seconds_sum{{section="{name}"}} {total:.6f}')
+            lines.append(f'patient_services_section_seconds_count{{section="{name}"}} {count}')
+        lines.append("# HELP patient_services_section_seconds_max Slowest observation per section")
+        lines.append("# TYPE patient_services_section_seconds_max gauge")
+        for name, (_, _, longest) in sorted(durations.items()):
+            lines.append(f'patient_services_section_seconds_max{{section="{name}"}} {longest:.6f}')
+        lines.append("# HELP patient_services_events_total Counted app events")
+        lines.append("# TYPE patient_services_events_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'patient_services_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def current_profile():
+    return getattr(_local, "profile", None)
+
+
+def _streamlit_version():
+    try:
+        return tuple(int(part) for part in st.__version__.split(".")[:2])
+    except ValueError:
+        return None
+
+
+def _count_elements(profile):
+    """Count deltas (rendered elements) sent to the browser during this rerun
+
+    Streamlit has no public hook for outgoing messages, so this wraps the
+    private ScriptRunContext._enqueue, only on the releases it was checked
+    against; on any other the element count is left as None.
+    """
+    version = _streamlit_version()
+    if version is None or not ELEMENT_COUNT_VERSIONS[0] <= version <= ELEMENT_COUNT_VERSIONS[1]:
+        return
+    ctx = get_script_run_ctx()
+    if ctx is None or not callable(getattr(ctx, "_enqueue", None)):
+        return
+    original = getattr(ctx, "_unmetered_enqueue", None) or ctx._enqueue
+
+    def enqueue(msg):
+        if msg.WhichOneof("type") == "delta":
+            profile.elements += 1
+        original(msg)
+
+    profile.elements = 0
+    ctx._unmetered_enqueue = original
+    ctx._enqueue = enqueue
+
+
+def begin_rerun():
+    """Start profiling a script rerun; call once at the top of the script"""
+    profile = RerunProfile()
+    _local.profile = profile
+    _count_elements(profile)
+    _start_metrics_server()
+    return profile
+
+
+def end_rerun():
+    """Finish the current rerun's profile and publish it"""
+    profile = current_profile()
+    if profile is None:
+        return None
+    _local.profile = None
+    profile.total = time.perf_counter() - profile.started_at
+    profile.cpu = time.thread_time() - profile.started_cpu
+
+    REGISTRY.observe("rerun", profile.total)
+    REGISTRY.observe("rerun.cpu", profile.cpu)
+    REGISTRY.increment("reruns")
+    if profile.elements is not None:
+        REGISTRY.increment("elements", profile.elements)
+
+    history = st.session_state.setdefault("_rerun_profiles", [])
+    history.append(profile.as_dict())
+    del history[:-PROFILES_PER_SESSION]
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": "rerun", **profile.as_dict()}))
+    return profile
+
+
+@contextmanager
+def timed_section(name):
+    """Time a block (or, used as a decorator, a function) into the current rerun profile"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_duration(name, time.perf_counter() - started)
+
+
+def record_duration(name, seconds):
+    profile = current_profile()
+    if profile is not None:
+        profile.sections[name] = profile.sections.get(name, 0.0) + seconds
+    REGISTRY.observe(name, seconds)
+
+
+def count(name, amount=1):
+    profile = current_profile()
+    if profile is not None:
+        profile.counters[name] = profile.counters.get(name, 0) + amount
+    REGISTRY.increment(name, amount)
+
+
+def debug_panel_enabled():
+    """The debug panel is opt-in via PS_DEBUG_PANEL=true or ?debug=1 in the URL"""
+    if os.getenv("PS_DEBUG_PANEL", "").lower() in ("1", "true", "yes"):
+        return True
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+
+def render_debug_panel():
+    """Show recent rerun profiles and process-wide totals in the sidebar"""
+    profiles = st.session_state.get("_rerun_profiles", [])
+    with st.sidebar.expander("⏱️ Rerun timings", expanded=False):
+        if not profiles:
+            st.caption("No completed reruns yet.")
+            return
+        last = profiles[-1]
+        elements = "elements not counted" if last["elements"] is None else f"{last['elements']} elements"
+        st.caption(f"Last rerun: {last['total_ms']:.1f} ms ({last['cpu_ms']:.1f} ms CPU) • {elements}")
+        st.table([
+            {"section": name, "ms": ms}
+            for name, ms in sorted(last["sections_ms"].items(), key=lambda item: -item[1])
+        ])
+        if last["counters"]:
+            st.json(last["counters"])
+        durations, _ = REGISTRY.snapshot()
+        st.caption("Process averages")
+        st.table([
+            {"section": name, "avg ms": round(total / calls * 1000, 2), "max ms": round(longest * 1000, 2), "count": calls}
+            for name, (calls, total, longest) in sorted(durations.items())
+        ])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def _start_metrics_server():
+    """Serve Prometheus text on METRICS_PORT, once per process
+
+    Binds to localhost unless METRICS_HOST says otherwise (e.g. 0.0.0.0 for a scraper on another host).
+    """
+    global _server
+    port = os.getenv("METRICS_PORT")
+    host = os.getenv("METRICS_HOST", "127.0.0.1")
+    if not port or _server is not None:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Could not start metrics endpoint on %s:%s: %s", host, port, e)
+            _server = False
+            return
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+
+
+if os.getenv("METRICS_LOG", "").lower() in ("1", "true", "yes") and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
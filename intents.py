@@ -0,0 +1,157 @@
+"""
+Intent matching for the offline (demo mode) assistant.
+
+Intents are declared as data in DEMO_INTENTS. Every keyword of every intent
+is compiled into one regular expression with word boundaries, so a message
+is scanned once no matter how many intents exist. When several intents
+match, the highest priority wins; ties go to the intent declared first.
+"""
+
+import re
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    priority: int
+    keywords: tuple
+    response: str
+    patterns: tuple = ()  # raw regular expressions, used as-is
+
+    def render(self, message, user_context):
+        return self.response.format(
+            message=message,
+            name=user_context['name'],
+            first_name=user_context['name'].split(' ')[0],
+            next_infusion=user_context.get('nextInfusion', 'October 25, 2025'),
+        )
+
+
+class IntentMatcher:
+    """Classifies messages against an intent table in a single regex pass"""
+
+    def __init__(self, intents, fallback):
+        self.fallback = fallback
+        self._intents = {}
+        self._rank = {}
+        alternatives = []
+        for order, intent in enumerate(intents):
+            self._rank[intent.name] = (intent.priority, -order)
+            for keyword in intent.keywords:
+                alternatives.append((len(keyword), rf"\b{re.escape(keyword)}\b", intent))
+            for pattern in intent.patterns:
+                alternatives.append((len(pattern), pattern, intent))
+
+        # Longer alternatives first so "what is tysabri" wins over "what" at the same position
+        alternatives.sort(key=lambda alternative: -alternative[0])
+        groups = []
+        for index, (_, pattern, intent) in enumerate(alternatives):
+            group = f"k{index}"
+            self._intents[group] = intent
+            groups.append(f"(?P<{group}>{pattern})")
+        self._regex = re.compile("|".join(groups), re.IGNORECASE) if groups else None
+
+    def matches(self, message):
+        """Return every intent with a keyword in the message"""
+        if self._regex is None:
+            return []
+        found = {}
+        for match in self._regex.finditer(message):
+            intent = self._intents[match.lastgroup]
+            found[intent.name] = intent
+        return list(found.values())
+
+    def classify(self, message):
+        """Return the highest-priority matching intent, or the fallback"""
+        found = self.matches(message)
+        if not found:
+            return self.fallback
+        return max(found, key=lambda intent: self._rank[intent.name])
+
+
+DEMO_INTENTS = (
+    # Personal questions
+    Intent(
+        name="my_name",
+        priority=100,
+        keywords=("what is my name", "my name"),
+        response="Your name is {name}. I'm here to help you with your Tysabri treatment journey.",
+    ),
+    Intent(
+        name="who_am_i",
+        priority=100,
+        keywords=("who am i",),
+        response="I'm talking to {name}. You're a patient starting Tysabri treatment for MS. How can I help you today?",
+    ),
+    # Medical questions - specific symptoms outrank the general Tysabri overview
+    Intent(
+        name="side_effects",
+        priority=80,
+        keywords=("side effects", "side effect"),
+        response="Common side effects of Tysabri can include headache, fatigue, nausea, and sometimes mild flu-like symptoms, especially in the first few infusions. Most people tolerate it well, and side effects usually improve over time. Your healthcare team will monitor you closely for any concerns. Are you worried about any particular side effects?",
+    ),
+    Intent(
+        name="headache",
+        priority=85,
+        keywords=("headache", "headaches"),
+        response="Headaches can happen with Tysabri, especially after infusions. You can usually take acetaminophen (Tylenol) for relief. Stay hydrated and rest in a cool, dark room if needed. Most infusion-related headaches improve within 24-48 hours. Is this something you're experiencing?",
+    ),
+    Intent(
+        name="tysabri",
+        priority=60,
+        keywords=("what is tysabri", "tysabri", "natalizumab"),
+        response="Tysabri (natalizumab) is a medication used to treat relapsing-remitting multiple sclerosis. It's given as an IV infusion every 28 days and helps reduce MS inflammation and relapses. You'll be starting this treatment on {next_infusion}. Do you have any specific questions about how it works?",
+    ),
+    # Appointment questions
+    Intent(
+        name="appointment",
+        priority=70,
+        keywords=("appointment", "appointments", "when is my infusion", "next infusion"),
+        response="Your next infusion is scheduled for {next_infusion}. After that, you'll have infusions every 28 days. I can help you schedule future appointments or reschedule if needed. Would you like me to help you with anything specific about your appointment?",
+    ),
+    # Transportation
+    Intent(
+        name="transportation",
+        priority=70,
+        keywords=("transportation", "ride", "rides", "uber", "lyft"),
+        response="I can help you arrange transportation to your appointments! We can coordinate Uber or Lyft rides, medical transportation, or help you coordinate with family or friends. Just let me know your address and I can set up a ride for your {next_infusion} appointment. Would you like me to help arrange that now?",
+    ),
+    # Emotional support
+    Intent(
+        name="emotional_support",
+        priority=90,
+        keywords=("worried", "anxious", "anxiety", "scared", "nervous"),
+        response="It's completely normal to feel worried or anxious about starting a new treatment, especially with a new MS diagnosis. Many people feel this way. Tysabri is a very effective treatment, and your healthcare team will monitor you closely. You're taking the right steps by getting treatment early. Is there something specific that's worrying you? I'm here to listen and help.",
+    ),
+    # Greetings and thanks only win when nothing more specific was asked
+    Intent(
+        name="thanks",
+        priority=20,
+        keywords=("thank you", "thanks"),
+        response="You're very welcome, {first_name}! I'm glad I could help. Is there anything else you'd like to know about your treatment or MS?",
+    ),
+    Intent(
+        name="greeting",
+        priority=10,
+        keywords=("hello", "hi", "hey"),
+        response="Hello {first_name}! I'm your AI assistant for your Tysabri treatment journey. I can help you with questions about MS, your treatment, appointments, side effects, or anything else you're curious about. What would you like to know?",
+    ),
+    # General question fallback
+    Intent(
+        name="general_question",
+        priority=5,
+        keywords=("what", "how", "why", "when", "where"),
+        patterns=(r"\?",),
+        response="That's a great question, {first_name}. I want to make sure I give you the most accurate and helpful information. Could you provide a bit more detail about what specifically you'd like to know? I can help with questions about MS, Tysabri treatment, appointments, side effects, lifestyle, family, work, or any other concerns you might have.",
+    ),
+)
+
+FALLBACK_INTENT = Intent(
+    name="fallback",
+    priority=0,
+    keywords=(),
+    response="I understand you're asking about \"{message}\", {first_name}. I'm your AI assistant for your Tysabri treatment journey. I can help you with questions about MS, your medication, appointments, side effects, lifestyle, family, work, or anything else on your mind. Could you tell me more about what you'd like to know? I'm here to support you.",
+)
+
+DEMO_MATCHER = IntentMatcher(DEMO_INTENTS, FALLBACK_INTENT)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Persistent patient store for the Patient Services app.
+
+Patients and their infusion appointments live in an embedded SQLite database
+in WAL mode, so agent and patient sessions read concurrently while writes
+are appended. The agent queue is served by indexed queries on priority,
+next appointment and last contact instead of scanning in-memory dicts.
+Streamlit runs each rerun on a new thread, so the repository keeps one
+process-wide connection behind a lock rather than one per thread; it is
+opened once and reused by every rerun and session. The same database holds
+the append-only event log behind the agent dashboard metrics.
+
+Load synthetic patients for load testing:
+    python patient_store.py --synthetic 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from reference_data import SEED_PATIENTS
+
+PRIORITY_LABELS = {1: "High Priority", 2: "Medium Priority", 3: "Low Priority"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 2,
+    next_appointment TEXT,
+    last_contact TEXT,
+    concerns TEXT NOT NULL DEFAULT '[]',
+    diagnosis TEXT,
+    therapy TEXT,
+    location TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_patients_priority ON patients (priority, next_appointment);
+CREATE INDEX IF NOT EXISTS idx_patients_next_appointment ON patients (next_appointment);
+CREATE INDEX IF NOT EXISTS idx_patients_last_contact ON patients (last_contact);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    patient_id TEXT NOT NULL REFERENCES patients (patient_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    appointment_date TEXT NOT NULL,
+    center TEXT,
+    start_hour REAL,
+    PRIMARY KEY (patient_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments (appointment_date);
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    occurred_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    patient_id TEXT,
+    payload TEXT NOT NULL DEFAULT '{}'
+);
+"""
+
+# ORDER BY clauses for the agent queue, each backed by an index
+QUEUE_SORTS = {
+    "priority": "priority, next_appointment",
+    "next_appointment": "next_appointment",
+    "last_contact": "last_contact DESC",
+}
+
+PATIENT_COLUMNS = ("patient_id", "name", "priority", "next_appointment", "last_contact", "concerns", "diagnosis", "therapy", "location")
+
+
+def _row_to_patient(row):
+    patient = dict(zip(PATIENT_COLUMNS, row))
+    patient["concerns"] = json.loads(patient["concerns"])
+    patient["status"] = PRIORITY_LABELS.get(patient["priority"], "Medium Priority")
+    return patient
+
+
+class PatientRepository:
+    """Indexed access to patients and appointments in a SQLite WAL database"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._shared = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._shared.execute("PRAGMA journal_mode=WAL")
+        self._shared.execute("PRAGMA synchronous=NORMAL")
+        self._shared.execute("PRAGMA foreign_keys=ON")
+        with self._connection() as connection, connection:
+            connection.executescript(SCHEMA)
+            self._migrate(connection)
+
+    def _migrate(self, connection):
+        """Add columns introduced after a database file was created"""
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(appointments)")}
+        for column, kind in (("center", "TEXT"), ("start_hour", "REAL")):
+            if column not in columns:
+                connection.execute(f"ALTER TABLE appointments ADD COLUMN {column} {kind}")
+
+    @contextmanager
+    def _connection(self):
+        """Hold the shared connection for one query or transaction"""
+        with self._lock:
+            yield self._shared
+
+    def bulk_load(self, patients, batch_size=5000):
+        """Insert or update many patients in large transactions
+
+        An upsert rather than INSERT OR REPLACE: replacing deletes the row
+        first, and the foreign key cascade would delete its appointments.
+        """
+        updates = ", ".join(f"{column} = excluded.{column}" for column in PATIENT_COLUMNS[1:])
+        sql = (
+            f"INSERT INTO patients ({', '.join(PATIENT_COLUMNS)}) VALUES ({', '.join('?' * len(PATIENT_COLUMNS))}) "
+            f"ON CONFLICT (patient_id) DO UPDATE SET {updates}"
+        )
+        batch = []
+        loaded = 0
+        for patient in patients:
+            batch.append(tuple(
+                json.dumps(patient.get(column, [])) if column == "concerns" else patient.get(column)
+                for column in PATIENT_COLUMNS
+            ))
+            if len(batch) >= batch_size:
+                with self._connection() as connection, connection:
+                    connection.executemany(sql, batch)
+                loaded += len(batch)
+                batch = []
+        if batch:
+            with self._connection() as connection, connection:
+                connection.executemany(sql, batch)
+            loaded += len(batch)
+        return loaded
+
+    def count_patients(self):
+        with self._connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    def get_patient(self, patient_id):
+        with self._connection() as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        return _row_to_patient(row) if row else None
+
+    def query_patients(self, priority=None, name_contains=None, sort="priority", limit=10, offset=0):
+        """Return (patients, total) for one page of the filtered, sorted queue
+
+        Sorting follows the priority, next appointment and last contact
+        indexes, with rowid as a tie-breaker so pages are stable.
+        """
+        where = []
+        params = []
+        if priority is not None:
+            where.append("priority = ?")
+            params.append(priority)
+        if name_contains:
+            # Match % and _ in the search text literally
+            escaped = name_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("name LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        with self._connection() as connection:
+            total = connection.execute(f"SELECT COUNT(*) FROM patients{clause}", params).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients{clause} "
+                f"ORDER BY {QUEUE_SORTS[sort]}, rowid LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [_row_to_patient(row) for row in rows], total
+
+    def get_appointments(self, patient_id):
+        """Appointment dates for a patient as ISO strings, in order"""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT appointment_date FROM appointments WHERE patient_id = ? ORDER BY seq", (patient_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_bookings(self, patient_id):
+        """(date, center, start_hour) for each of a patient's appointments, in order"""
+        with self._connection() as connection:
+            return connection.execute(
+                "SELECT appointment_date, center, start_hour FROM appointments WHERE patient_id = ? ORDER BY seq", (patient_id,)
+            ).fetchall()
+
+    def iter_bookings(self):
+        """Yield (patient_id, date, center, start_hour) for every appointment booked at a center"""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT patient_id, appointment_date, center, start_hour FROM appointments WHERE center IS NOT NULL AND start_hour IS NOT NULL"
+            ).fetchall()
+        yield from rows
+
+    def save_appointments(self, patient_id, appointment_dates, center=None, start_hours=None):
+        """Replace a patient's appointment series and update their next appointment"""
+        start_hours = start_hours or [None] * len(appointment_dates)
+        with self._connection() as connection, connection:
+            connection.execute("DELETE FROM appointments WHERE patient_id = ?", (patient_id,))
+            connection.executemany(
+                "INSERT INTO appointments (patient_id, seq, appointment_date, center, start_hour) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (patient_id, seq, appointment, center, start_hour)
+                    for seq, (appointment, start_hour) in enumerate(zip(appointment_dates, start_hours))
+                ],
+            )
+            connection.execute(
+                "UPDATE patients SET next_appointment = ? WHERE patient_id = ?",
+                (min(appointment_dates) if appointment_dates else None, patient_id),
+            )
+
+    def iter_next_appointments(self, batch_size=50000):
+        """Yield (patient_ids, next_appointments) batches for patients with an appointment
+
+        Each batch is read separately (by rowid), so the caller can write
+        between batches without holding the connection.
+        """
+        after = 0
+        while True:
+            with self._connection() as connection:
+                rows = connection.execute(
+                    "SELECT rowid, patient_id, next_appointment FROM patients "
+                    "WHERE next_appointment IS NOT NULL AND rowid > ? ORDER BY rowid LIMIT ?",
+                    (after, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            rowids, patient_ids, starts = zip(*rows)
+            after = rowids[-1]
+            yield list(patient_ids), list(starts)
+
+    def save_appointments_bulk(self, patient_ids, schedules):
+        """Replace many patients' series in one transaction; schedules[i] belongs to patient_ids[i]
+
+        Each patient keeps their infusion center; chair times are booked again
+        the next time the schedule is loaded.
+        """
+        with self._connection() as connection, connection:
+            centers = dict(connection.execute("SELECT patient_id, center FROM appointments WHERE seq = 0 AND center IS NOT NULL"))
+            connection.executemany("DELETE FROM appointments WHERE patient_id = ?", [(patient_id,) for patient_id in patient_ids])
+            connection.executemany(
+                "INSERT INTO appointments (patient_id, seq, appointment_date, center) VALUES (?, ?, ?, ?)",
+                [
+                    (patient_id, seq, str(appointment), centers.get(patient_id))
+                    for patient_id, schedule in zip(patient_ids, schedules)
+                    for seq, appointment in enumerate(schedule)
+                ],
+            )
+            connection.executemany(
+                "UPDATE patients SET next_appointment = ? WHERE patient_id = ?",
+                [(str(min(schedule)), patient_id) for patient_id, schedule in zip(patient_ids, schedules)],
+            )
+
+    def record_contact(self, patient_id, contact_date=None):
+        contact_date = contact_date or date.today().isoformat()
+        with self._connection() as connection, connection:
+            connection.execute("UPDATE patients SET last_contact = ? WHERE patient_id = ?", (contact_date, patient_id))
+
+    def append_event(self, occurred_at, kind, patient_id=None, payload=None):
+        """Append one event to the log and return its id"""
+        with self._connection() as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO events (occurred_at, kind, patient_id, payload) VALUES (?, ?, ?, ?)",
+                (occurred_at, kind, patient_id, json.dumps(payload or {})),
+            )
+        return cursor.lastrowid
+
+    def iter_events(self, after_id=0):
+        """Yield (event_id, occurred_at, kind, patient_id, payload) in log order"""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT event_id, occurred_at, kind, patient_id, payload FROM events WHERE event_id > ? ORDER BY event_id",
+                (after_id,),
+            ).fetchall()
+        for event_id, occurred_at, kind, patient_id, payload in rows:
+            yield event_id, occurred_at, kind, patient_id, json.loads(payload)
+
+
+def synthetic_patients(count, start_index=1000, seed=7):
+    """Generate realistic-looking patients for load testing"""
+    rng = random.Random(seed)
+    first_names = ["Alex", "Jordan", "Priya", "Wei", "Fatima", "Luis", "Emma", "Noah", "Aisha", "Kenji"]
+    last_names = ["Nguyen", "Patel", "Johnson", "Kim", "Lopez", "Brown", "Cohen", "Okafor", "Silva", "Rossi"]
+    concerns = ["Insurance coverage", "Side effects", "Transportation", "Work accommodations",
+                "Infusion anxiety", "Copay assistance", "Scheduling conflicts", "Fatigue"]
+    cities = ["Palo Alto, CA", "San Jose, CA", "Oakland, CA", "Fremont, CA", "Mountain View, CA"]
+    base = date(2025, 10, 20)
+    for index in range(start_index, start_index + count):
+        yield {
+            "patient_id": f"PT-{index:06d}",
+            "name": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            "priority": rng.choice((1, 2, 2, 3, 3, 3)),
+            "next_appointment": (base + timedelta(days=rng.randint(0, 90))).isoformat(),
+            "last_contact": (base - timedelta(days=rng.randint(0, 60))).isoformat(),
+            "concerns": rng.sample(concerns, 2),
+            "diagnosis": "Relapsing-Remitting MS",
+            "therapy": "Tysabri",
+            "location": rng.choice(cities),
+        }
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_patient_repository():
+    """Return the process-wide repository, seeding an empty database with the demo caseload"""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            repository = PatientRepository(os.getenv("PATIENT_DB_PATH", os.path.join("data", "patients.sqlite3")))
+            if repository.count_patients() == 0:
+                repository.bulk_load(SEED_PATIENTS)
+            _repository = repository
+        return _repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Patient Services patient store")
+    parser.add_argument("--synthetic", type=int, default=0, help="load this many synthetic patients")
+    args = parser.parse_args()
+
+    repository = get_patient_repository()
+    if args.synthetic:
+        loaded = repository.bulk_load(synthetic_patients(args.synthetic))
+        print(f"✅ Loaded {loaded} synthetic patients")
+    print(f"📋 {repository.count_patients()} patients in {repository.db_path}")
+
+
+if __name__ == "__main__":
+    main()
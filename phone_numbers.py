@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Phone number normalization for WhatsApp links, imports and outreach.
+
+parse_phone() turns whatever was typed or imported ("(650) 123-4567",
+"+1 650.123.4567", "0044 20 7946 0958") into E.164 ("+16501234567"):
+separators are deleted with one str.translate() call and the rest is checked
+with a precompiled regex. Numbers without a + or 00 prefix must be North
+American (ten digits with an area code starting 2-9, optionally after a 1);
+anything longer needs its country code marked. Outcomes, including failure
+codes, are memoized per input, so reruns and rosters with repeated numbers
+don't parse anything twice. Failures are reported as a new PhoneNumberError
+per call, carrying a machine-readable code for import reports and a message
+for the UI.
+
+Normalize the phone column of a CSV roster:
+    python phone_numbers.py roster.csv --column phone --output normalized.csv
+"""
+
+import argparse
+import csv
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+
+NANP_COUNTRY_CODE = "1"
+
+# E.164 allows at most 15 digits including the country code
+MAX_DIGITS = 15
+MIN_INTERNATIONAL_DIGITS = 8
+
+# Separators between digit groups, including non-breaking spaces and Unicode dashes
+_SEPARATORS = str.maketrans("", "", " \t\u00a0.-/()‐‑‒–—−")
+_NUMBER = re.compile(r"(\+|00)?([0-9]+)")
+_NANP = re.compile(r"1?([2-9][0-9]{9})")
+
+# PhoneNumberError codes
+EMPTY = "empty"
+INVALID_CHARACTERS = "invalid_characters"
+TOO_SHORT = "too_short"
+TOO_LONG = "too_long"
+INVALID_COUNTRY_CODE = "invalid_country_code"
+INVALID_AREA_CODE = "invalid_area_code"
+MISSING_COUNTRY_CODE = "missing_country_code"
+
+
+class PhoneNumberError(ValueError):
+    """A phone number that can't be normalized, with a code saying why"""
+
+    def __init__(self, code, number, message):
+        super().__init__(message)
+        self.code = code
+        self.number = number
+
+
+@lru_cache(maxsize=65536)
+def _parse(text):
+    """(E.164 number, None, None) or (None, error code, message); memoized, so it holds no exceptions"""
+    compact = (text or "").strip().translate(_SEPARATORS)
+    if not compact:
+        return None, EMPTY, "no phone number entered"
+    match = _NUMBER.fullmatch(compact)
+    if match is None:
+        return None, INVALID_CHARACTERS, "phone numbers can only contain a leading +, digits, spaces, dashes, dots and brackets"
+    prefix, digits = match.groups()
+
+    if len(digits) > MAX_DIGITS:
+        return None, TOO_LONG, f"{len(digits)} digits is more than a phone number can have"
+    if prefix is None and len(digits) < 10:
+        return None, TOO_SHORT, f"{len(digits)} digits is too short (at least 10 needed)"
+    if prefix is not None and len(digits) < MIN_INTERNATIONAL_DIGITS:
+        return None, TOO_SHORT, f"{len(digits)} digits is too short for an international number"
+    if digits[0] == "0":
+        return None, INVALID_COUNTRY_CODE, "country codes don't start with 0"
+
+    # Ten digits without a country code, or 1 and ten digits, are North American
+    if (prefix is None and len(digits) == 10) or (len(digits) == 11 and digits[0] == NANP_COUNTRY_CODE):
+        nanp = _NANP.fullmatch(digits)
+        if nanp is None:
+            return None, INVALID_AREA_CODE, "US and Canadian area codes start with 2-9"
+        return f"+{NANP_COUNTRY_CODE}{nanp.group(1)}", None, None
+    if prefix is None:
+        # Can't tell a country code from a long local number without the prefix
+        return None, MISSING_COUNTRY_CODE, "numbers outside the US and Canada need a leading + or 00 and the country code"
+    # Anything else already carries its country code
+    return f"+{digits}", None, None
+
+
+def parse_phone(text):
+    """(E.164 number, None) for a valid phone number, else (None, PhoneNumberError)"""
+    number, code, message = _parse(text)
+    if code is not None:
+        return None, PhoneNumberError(code, text, message)
+    return number, None
+
+
+def normalize_phone(text):
+    """E.164 form of a phone number, raising PhoneNumberError if it isn't valid"""
+    number, error = parse_phone(text)
+    if error is not None:
+        raise error
+    return number
+
+
+def normalize_many(numbers):
+    """Normalize a roster: (E.164 numbers with None for invalid ones, {index: PhoneNumberError})"""
+    normalized = []
+    errors = {}
+    for index, (number, error) in enumerate(map(parse_phone, numbers)):
+        normalized.append(number)
+        if error is not None:
+            errors[index] = error
+    return normalized, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize the phone numbers in a CSV roster to E.164")
+    parser.add_argument("roster")
+    parser.add_argument("--column", default="phone")
+    parser.add_argument("--output", help="CSV to write with the column normalized (default: report only)")
+    args = parser.parse_args()
+
+    with open(args.roster, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if rows and args.column not in rows[0]:
+        sys.exit(f"❌ {args.roster} has no {args.column!r} column")
+
+    normalized, errors = normalize_many([row[args.column] for row in rows])
+    print(f"✅ {len(rows) - len(errors)} of {len(rows)} numbers normalized")
+    for code, total in Counter(error.code for error in errors.values()).most_common():
+        print(f"  {code}: {total}")
+    for index, error in list(errors.items())[:10]:
+        print(f"  row {index + 2}: {error.number!r} - {error}")
+
+    if args.output:
+        for row, number in zip(rows, normalized):
+            row[args.column] = number or ""
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [args.column])
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+System prompt construction for the Patient Services assistant.
+
+The prompt is assembled in order of how often each part changes: the static
+instructions come first and are byte-identical for every request, then a
+compact per-patient context block, then the current date. Keeping the
+stable parts at the front lets the provider's prompt caching reuse the
+shared prefix. Each part is built and token-counted once and reused, so a
+chat turn only pays for counting the date line and the new message.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a character estimate
+    tiktoken = None
+
+PROMPT_MODEL = "gpt-4"
+COMPLETION_PARAMS = {"model": PROMPT_MODEL, "max_tokens": 300, "temperature": 0.7}
+
+# Bump when the way build_chat_messages() lays out a prompt changes
+PROMPT_VERSION = 1
+
+# Chat format overhead per message (role and separators), per OpenAI's cookbook
+TOKENS_PER_MESSAGE = 4
+
+SYSTEM_INSTRUCTIONS = """You are an AI assistant for Biogen Patient Services, specifically helping patients with Multiple Sclerosis (MS) who are on Tysabri therapy. You are empathetic, knowledgeable, and supportive.
+
+Your role is to:
+1. Answer questions about MS, Tysabri treatment, side effects, appointments, and lifestyle
+2. Provide emotional support and reassurance
+3. Help with practical matters like transportation, insurance, and scheduling
+4. Be conversational and natural, like a knowledgeable friend who happens to be an expert
+5. Always prioritize patient safety and recommend contacting healthcare providers for medical concerns
+6. Keep responses concise but helpful (2-4 sentences typically)
+
+Important guidelines:
+- Be warm and empathetic
+- Use the patient's name naturally in conversation
+- Don't provide specific medical advice - refer to healthcare providers for that
+- Be encouraging about treatment and prognosis
+- Offer practical help when possible
+- If you don't know something, admit it and suggest who might know"""
+
+# (label, user_context key, default) for each line of the patient context block
+CONTEXT_LINES = (
+    ("Name", "name", None),
+    ("Role", "role", None),
+    ("Diagnosis", "diagnosis", "Relapsing-Remitting MS"),
+    ("Therapy", "therapy", "Tysabri"),
+    ("Diagnosis Date", "diagnosisDate", "October 20, 2025"),
+    ("Next Infusion", "nextInfusion", "October 25, 2025"),
+    ("Location", "location", "Palo Alto, CA"),
+)
+
+
+@lru_cache(maxsize=1)
+def prompt_fingerprint():
+    """Short hash of everything besides the question that shapes an answer
+
+    Covers the instructions, patient context layout, PROMPT_VERSION and
+    completion parameters; cached answers are stored under it, so changing
+    any of these retires the old answers.
+    """
+    payload = json.dumps([PROMPT_VERSION, SYSTEM_INSTRUCTIONS, CONTEXT_LINES, COMPLETION_PARAMS], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(PROMPT_MODEL)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def count_tokens(text):
+    """Token count for a piece of text (about 4 characters per token without tiktoken)"""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def _context_version(user_context):
+    return tuple(user_context.get(key, default) for _, key, default in CONTEXT_LINES)
+
+
+@lru_cache(maxsize=1024)
+def _patient_block(version):
+    lines = ["Patient Context:"]
+    for (label, _, _), value in zip(CONTEXT_LINES, version):
+        lines.append(f"- {label}: {value}")
+    return "\n".join(lines)
+
+
+def patient_context_block(user_context):
+    """Compact patient context, built once per patient and context version"""
+    return _patient_block(_context_version(user_context))
+
+
+def build_chat_messages(message, user_context, history=None, summary=None, today=None, grounding=None):
+    """Return (messages, prompt_tokens) for a chat completion request
+
+    `history` is a list of earlier {"role", "content"} turns and `summary` an
+    optional one-line recap of turns too old to send in full. Both come after
+    the cached prefix. `grounding` is curated reference text for this question
+    (see faq_retrieval.py), sent just before it.
+    """
+    today = today or datetime.now()
+    patient_block = patient_context_block(user_context)
+    date_line = f"Current Date: {today.strftime('%B %d, %Y')}"
+
+    messages = [
+        {"role": "system", "content": SYSTEM_INSTRUCTIONS},
+        {"role": "system", "content": f"{patient_block}\n{date_line}"},
+    ]
+    prompt_tokens = count_tokens(SYSTEM_INSTRUCTIONS) + count_tokens(patient_block) + count_tokens(date_line)
+
+    if summary:
+        messages.append({"role": "system", "content": summary})
+        prompt_tokens += count_tokens(summary)
+    for turn in history or ():
+        messages.append(turn)
+        prompt_tokens += count_tokens(turn["content"])
+
+    if grounding:
+        messages.append({"role": "system", "content": grounding})
+        prompt_tokens += count_tokens(grounding)
+
+    messages.append({"role": "user", "content": message})
+    prompt_tokens += count_tokens(message) + TOKENS_PER_MESSAGE * len(messages)
+    return messages, prompt_tokens
@@ -0,0 +1,121 @@
+"""
+Reference data for the Patient Services Streamlit app.
+
+Streamlit re-executes streamlit_app.py on every interaction, but this module
+is imported once per process, so these literals are built only once.
+"""
+
+# Patient context data
+PATIENT_CONTEXT = {
+    "patientId": "SP-2025-001",
+    "name": "Sarah Parker",
+    "role": "patient",
+    "diagnosis": "Relapsing-Remitting MS",
+    "therapy": "Tysabri",
+    "diagnosisDate": "October 20, 2025",
+    "nextInfusion": "October 25, 2025",
+    "location": "Palo Alto, CA"
+}
+
+AGENT_CONTEXT = {
+    "name": "Cindy Smith",
+    "role": "agent",
+    "department": "Patient Services",
+    "experience": "5 years",
+    "specializations": ["MS Treatment", "Tysabri Support", "Patient Education"]
+}
+
+# Local infusion centers; coordinates feed the nearest-center search (center_search.py)
+INFUSION_CENTERS = [
+    {
+        "name": "Palo Alto Infusion Center",
+        "address": "456 University Ave, Palo Alto, CA 94301",
+        "lat": 37.447,
+        "lon": -122.161,
+        "rating": "4.8",
+        "phone": "(650) 123-4567",
+        "hours": "Mon-Fri 8AM-6PM",
+        "chairs": 8
+    },
+    {
+        "name": "Stanford Medical Center",
+        "address": "300 Pasteur Dr, Stanford, CA 94305",
+        "lat": 37.4334,
+        "lon": -122.1756,
+        "rating": "4.9",
+        "phone": "(650) 723-4000",
+        "hours": "Mon-Fri 7AM-7PM",
+        "chairs": 12
+    },
+    {
+        "name": "Mountain View Infusion Clinic",
+        "address": "789 Castro St, Mountain View, CA 94041",
+        "lat": 37.3904,
+        "lon": -122.081,
+        "rating": "4.6",
+        "phone": "(650) 987-6543",
+        "hours": "Mon-Fri 9AM-5PM",
+        "chairs": 6
+    },
+    {
+        "name": "Redwood City Medical Center",
+        "address": "123 Veterans Blvd, Redwood City, CA 94063",
+        "lat": 37.487,
+        "lon": -122.223,
+        "rating": "4.7",
+        "phone": "(650) 555-0123",
+        "hours": "Mon-Fri 8AM-6PM",
+        "chairs": 10
+    }
+]
+
+# Demo caseload loaded into an empty patient store (dates are ISO so they sort)
+SEED_PATIENTS = [
+    {
+        "patient_id": "SP-2025-001",
+        "name": "Sarah Parker",
+        "priority": 1,
+        "next_appointment": "2025-10-25",
+        "last_contact": "2025-10-21",
+        "concerns": ["New diagnosis anxiety", "Treatment expectations"],
+        "diagnosis": "Relapsing-Remitting MS",
+        "therapy": "Tysabri",
+        "location": "Palo Alto, CA"
+    },
+    {
+        "patient_id": "JS-2025-002",
+        "name": "John Smith",
+        "priority": 2,
+        "next_appointment": "2025-11-15",
+        "last_contact": "2025-10-20",
+        "concerns": ["Insurance coverage", "Side effects"],
+        "diagnosis": "Relapsing-Remitting MS",
+        "therapy": "Tysabri",
+        "location": "San Jose, CA"
+    },
+    {
+        "patient_id": "MG-2025-003",
+        "name": "Maria Garcia",
+        "priority": 3,
+        "next_appointment": "2025-11-22",
+        "last_contact": "2025-10-19",
+        "concerns": ["Transportation", "Work accommodations"],
+        "diagnosis": "Relapsing-Remitting MS",
+        "therapy": "Tysabri",
+        "location": "Redwood City, CA"
+    }
+]
+
+# Days infusion centers are closed; scheduled infusions move to the next open day
+CLINIC_HOLIDAYS = (
+    "2025-11-27", "2025-12-25", "2026-01-01", "2026-05-25",
+    "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25",
+)
+
+# Agent "Quick Test Scenarios" for exercising the AI assistant
+TEST_SCENARIOS = [
+    "Tell me about Tysabri side effects",
+    "I'm feeling anxious about my treatment",
+    "Can you help with transportation?",
+    "When is my next appointment?"
+]
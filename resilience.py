@@ -0,0 +1,102 @@
+"""
+Failure handling for calls to AI providers.
+
+CircuitBreaker stops sending traffic to a provider after repeated failures:
+it opens, rejects calls instantly for a cool-down period, then lets a single
+probe through (half-open) and closes again once that probe succeeds.
+RetryBudget caps retries process-wide to a fraction of requests, so retries
+cannot multiply the load on a provider that is already struggling, and
+backoff_delay spreads the retries that are allowed with full jitter.
+"""
+
+import random
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by consecutive failures"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        """Current state, reporting an open breaker whose cool-down is over as half-open"""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Whether a call may go ahead; in half-open state only one probe at a time is let through"""
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class RetryBudget:
+    """Token bucket allowing retries for a fraction of requests plus a small steady reserve"""
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, window=10.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(min_per_second * window, 1.0)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._balance = self.capacity
+        self._refilled_at = clock()
+
+    def deposit(self):
+        """Credit one request's share of retries"""
+        with self._lock:
+            self._balance = min(self._balance + self.ratio, self.capacity)
+
+    def withdraw(self):
+        """Spend one retry if the budget allows it"""
+        with self._lock:
+            now = self._clock()
+            self._balance = min(self._balance + (now - self._refilled_at) * self.min_per_second, self.capacity)
+            self._refilled_at = now
+            if self._balance < 1.0:
+                return False
+            self._balance -= 1.0
+            return True
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0):
+    """Full-jitter exponential backoff before retry number `attempt` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
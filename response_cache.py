@@ -0,0 +1,251 @@
+"""
+Response cache for the Patient Services AI assistant.
+
+Answers are keyed on the normalized question, the patient context fields
+that feed the system prompt and a namespace: the prompt fingerprint (system
+instructions, prompt version, model and completion parameters). A disk tier
+written under another namespace is cleared when it is opened, so a prompt or
+model change never serves answers written for the old one. A small in-memory LRU tier sits in front of a
+SQLite tier on disk, so common questions survive app restarts. Both tiers
+expire entries after a TTL. When the exact key misses, an optional
+SemanticCache (semantic_cache.py) returns the answer to a paraphrase of the
+question asked in the same patient context.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from prompts import prompt_fingerprint
+from semantic_cache import SemanticCache, patient_key
+
+# user_context fields that shape the system prompt, and therefore the answer
+CONTEXT_FIELDS = ("patientId", "name", "role", "diagnosis", "therapy", "diagnosisDate", "nextInfusion", "location")
+
+# Changing any of these for a patient invalidates everything cached for them
+VERSION_FIELDS = ("diagnosis", "nextInfusion")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_message(message):
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    message = _WHITESPACE.sub(" ", message.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", message)
+
+
+def make_cache_key(message, user_context, namespace=""):
+    """Stable key for a question asked in a given patient context under a prompt namespace"""
+    context = {field: user_context.get(field) for field in CONTEXT_FIELDS}
+    payload = json.dumps([namespace, normalize_message(message), context], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _context_version(user_context):
+    return json.dumps([user_context.get(field) for field in VERSION_FIELDS])
+
+
+class ResponseCache:
+    """LRU + TTL memory cache backed by an optional SQLite file"""
+
+    def __init__(self, max_entries=512, ttl_seconds=3600, db_path=None, semantic=None, namespace=""):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.semantic = semantic
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.semantic_hits = 0
+        self._entries = OrderedDict()  # key -> (patient, response, created_at)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                patient TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_patient ON responses (patient);
+            CREATE TABLE IF NOT EXISTS patient_versions (
+                patient TEXT PRIMARY KEY,
+                version TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        stored = self._db.execute("SELECT value FROM cache_meta WHERE name = 'namespace'").fetchone()
+        if stored is None or stored[0] != self.namespace:
+            # Answers written for another prompt or model can never be hit again
+            self._db.execute("DELETE FROM responses")
+            self._db.execute("INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('namespace', ?)", (self.namespace,))
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._versions = dict(self._db.execute("SELECT patient, version FROM patient_versions"))
+        self._db.commit()
+
+    def _check_version(self, user_context):
+        # Caller holds the lock
+        patient = patient_key(user_context)
+        version = _context_version(user_context)
+        previous = self._versions.get(patient)
+        if previous == version:
+            return
+        if previous is not None:
+            self._invalidate(patient)
+        self._versions[patient] = version
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO patient_versions (patient, version) VALUES (?, ?)",
+                (patient, version),
+            )
+            self._db.commit()
+
+    def _remember(self, key, patient, response, created_at):
+        # Caller holds the lock
+        self._entries[key] = (patient, response, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, message, user_context):
+        """Return the cached response, or None on a miss"""
+        key = make_cache_key(message, user_context, self.namespace)
+        now = time.time()
+        with self._lock:
+            self._check_version(user_context)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[2] < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT patient, response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if now - row[2] < self.ttl_seconds:
+                        self._remember(key, *row)
+                        if self.semantic is not None:
+                            # Answers from before a restart match paraphrases again
+                            self.semantic.set(message, user_context, row[1])
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return row[1]
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            if self.semantic is not None:
+                match = self.semantic.get(message, user_context)
+                if match is not None:
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    return match[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, message, user_context, response):
+        """Store a response for this question and patient context"""
+        if not response:
+            return
+        key = make_cache_key(message, user_context, self.namespace)
+        patient = patient_key(user_context)
+        created_at = time.time()
+        with self._lock:
+            self._check_version(user_context)
+            self._remember(key, patient, response, created_at)
+            if self.semantic is not None:
+                self.semantic.set(message, user_context, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, patient, response, created_at) VALUES (?, ?, ?, ?)",
+                    (key, patient, response, created_at),
+                )
+                self._db.commit()
+
+    def _invalidate(self, patient):
+        # Caller holds the lock
+        stale = [key for key, entry in self._entries.items() if entry[0] == patient]
+        for key in stale:
+            del self._entries[key]
+        if self.semantic is not None:
+            self.semantic.invalidate_patient(patient)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE patient = ?", (patient,))
+            self._db.commit()
+
+    def invalidate_patient(self, patient):
+        """Drop every cached response for a patient (their patientId, or name without one)"""
+        with self._lock:
+            self._invalidate(patient)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "semantic_hits": self.semantic_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+        if self.semantic is not None:
+            stats["semantic"] = self.semantic.stats()
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, configured from the environment
+
+    AI_SEMANTIC_CACHE_SIMILARITY (default 0.9) is the similarity a paraphrase
+    needs to reuse an answer; AI_SEMANTIC_CACHE_ENTRIES (default 2048, 0 turns
+    paraphrase matching off) bounds the questions indexed for it.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            ttl_seconds = float(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+            semantic_entries = int(os.getenv("AI_SEMANTIC_CACHE_ENTRIES", "2048"))
+            semantic = None
+            if semantic_entries > 0:
+                semantic = SemanticCache(
+                    CONTEXT_FIELDS,
+                    threshold=float(os.getenv("AI_SEMANTIC_CACHE_SIMILARITY", "0.9")),
+                    max_entries=semantic_entries,
+                    ttl_seconds=ttl_seconds,
+                )
+            _cache = ResponseCache(
+                max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "512")),
+                ttl_seconds=ttl_seconds,
+                db_path=os.getenv("AI_CACHE_PATH", os.path.join(".cache", "ai_responses.sqlite3")) or None,
+                semantic=semantic,
+                namespace=prompt_fingerprint(),
+            )
+        return _cache
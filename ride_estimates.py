@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Ride time and fare estimates for trips to infusion centers.
+
+estimate_matrix() prices every origin x center pair for every service tier
+and departure hour in one vectorized pass: road miles come from great-circle
+distance times a detour factor, drive time from an average speed scaled by
+the traffic at that hour, and fares from each tier's rate card scaled by the
+surge at that hour. A round trip adds the ride home, leaving after the
+infusion at its own hour's traffic and surge. The app asks for one origin at
+a time through RideEstimator, which snaps the pickup to a small grid cell and
+caches the estimates per cell, so reruns and nearby pickups reuse them.
+
+Time a large matrix:
+    python ride_estimates.py --origins 200 --centers 2000
+"""
+
+import argparse
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from center_search import haversine_miles
+from slot_allocator import INFUSION_DURATION_HOURS
+
+TIERS = ("UberX", "Comfort", "XL")
+# Per tier: base fare, booking fee, per mile, per minute, minimum fare, minutes until pickup
+TIER_RATES = np.array([
+    [1.50, 2.75, 1.10, 0.25, 8.00, 4.0],
+    [2.20, 2.75, 1.45, 0.32, 10.00, 6.0],
+    [3.00, 2.75, 1.95, 0.40, 12.00, 8.0],
+])
+
+# Roads are longer than the great-circle distance
+DETOUR_FACTOR = 1.3
+AVERAGE_MPH = 25.0
+
+# Drive-time and fare multipliers by hour of day (0-23)
+TRAFFIC_BY_HOUR = np.array([0.85] * 6 + [1.1, 1.4, 1.45, 1.2] + [1.0] * 5 + [1.3, 1.5, 1.5, 1.2] + [1.0] * 2 + [0.9] * 3)
+SURGE_BY_HOUR = np.array([1.1] * 5 + [1.0] * 2 + [1.2, 1.25, 1.1] + [1.0] * 6 + [1.2, 1.3, 1.2] + [1.0] * 3 + [1.15] * 2)
+
+# The ride home leaves once the infusion and observation are over
+RETURN_AFTER_HOURS = math.ceil(INFUSION_DURATION_HOURS) + 1
+
+# Pickups within the same cell share cached estimates (about a third of a mile)
+ORIGIN_CELL_DEGREES = 0.005
+
+
+def estimate_matrix(origin_lats, origin_lons, center_lats, center_lons, hours):
+    """Road miles (origins x centers) and minutes and fares (origins x centers x tiers x hours)
+
+    Coordinates are in degrees; hours are departure hours of day.
+    """
+    origin_lats, origin_lons = np.radians(np.asarray(origin_lats, dtype=float)), np.radians(np.asarray(origin_lons, dtype=float))
+    center_lats, center_lons = np.radians(np.asarray(center_lats, dtype=float)), np.radians(np.asarray(center_lons, dtype=float))
+    hours = np.asarray(hours, dtype=int) % 24
+    miles = haversine_miles(origin_lats[:, None], origin_lons[:, None], center_lats[None, :], center_lons[None, :]) * DETOUR_FACTOR
+
+    base, fee, per_mile, per_minute, minimum, pickup_wait = (TIER_RATES[:, column][None, None, :, None] for column in range(TIER_RATES.shape[1]))
+    drive = (miles / AVERAGE_MPH * 60)[:, :, None, None] * TRAFFIC_BY_HOUR[hours][None, None, None, :]
+    minutes = drive + pickup_wait
+    fares = np.maximum(base + fee + per_mile * miles[:, :, None, None] + per_minute * drive, minimum) * SURGE_BY_HOUR[hours]
+    return miles, minutes, fares
+
+
+@dataclass(frozen=True)
+class TripEstimates:
+    """Estimates from one pickup to a list of centers; minutes and fares are centers x tiers"""
+    centers: tuple
+    hour: int
+    miles: np.ndarray
+    minutes: np.ndarray
+    fares: np.ndarray
+    return_minutes: np.ndarray
+    return_fares: np.ndarray
+
+    def trip(self, index, tier="UberX", round_trip=False):
+        """(minutes, fare) to one center for a tier, including the ride home for a round trip"""
+        column = TIERS.index(tier)
+        minutes, fare = self.minutes[index, column], self.fares[index, column]
+        if round_trip:
+            minutes, fare = minutes + self.return_minutes[index, column], fare + self.return_fares[index, column]
+        return float(minutes), float(fare)
+
+    def order(self, by="fare", tier="UberX", round_trip=False):
+        """Center indices ranked by "miles", "minutes" or "fare" for a tier"""
+        if by == "miles":
+            return np.argsort(self.miles, kind="stable")
+        column = TIERS.index(tier)
+        values = self.fares[:, column] if by == "fare" else self.minutes[:, column]
+        if round_trip:
+            values = values + (self.return_fares[:, column] if by == "fare" else self.return_minutes[:, column])
+        return np.argsort(values, kind="stable")
+
+
+class RideEstimator:
+    """Per-origin-cell cache of trip estimates"""
+
+    def __init__(self, max_entries=1024, cell_degrees=ORIGIN_CELL_DEGREES):
+        self.max_entries = max_entries
+        self.cell_degrees = cell_degrees
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def estimate(self, lat, lon, centers, hour):
+        """TripEstimates from a pickup (degrees) to centers (dicts with lat/lon) leaving at `hour`"""
+        cell = (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+        key = (cell, tuple(center["name"] for center in centers), hour % 24)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        # Estimate from the middle of the cell so every pickup in it gets the same answer
+        origin_lat, origin_lon = ((index + 0.5) * self.cell_degrees for index in cell)
+        miles, minutes, fares = estimate_matrix(
+            [origin_lat], [origin_lon],
+            [center["lat"] for center in centers], [center["lon"] for center in centers],
+            [hour, hour + RETURN_AFTER_HOURS],
+        )
+        estimates = TripEstimates(
+            tuple(centers), hour % 24, miles[0],
+            minutes[0, :, :, 0], fares[0, :, :, 0], minutes[0, :, :, 1], fares[0, :, :, 1],
+        )
+        with self._lock:
+            self._entries[key] = estimates
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return estimates
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_ride_estimator():
+    """Return the process-wide estimator (cache size: RIDE_ESTIMATE_CACHE_ENTRIES, default 1024)"""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = RideEstimator(max_entries=int(os.getenv("RIDE_ESTIMATE_CACHE_ENTRIES", "1024")))
+        return _estimator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the ride estimate matrix")
+    parser.add_argument("--origins", type=int, default=200)
+    parser.add_argument("--centers", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    origins = rng.uniform((25.0, -124.5), (49.0, -67.0), (args.origins, 2))
+    centers = rng.uniform((25.0, -124.5), (49.0, -67.0), (args.centers, 2))
+    hours = np.arange(24)
+
+    started = time.perf_counter()
+    miles, minutes, fares = estimate_matrix(origins[:, 0], origins[:, 1], centers[:, 0], centers[:, 1], hours)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {fares.size} estimates ({args.origins} origins x {args.centers} centers x {len(TIERS)} tiers x {len(hours)} hours) in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate question cache for the Patient Services AI assistant.
+
+The exact-match response cache misses paraphrases ("what's tysabri?", "What
+is Tysabri", "tell me about tysabri"). Every answered question is embedded
+locally (signed feature hashing of content words, word pairs and character
+trigrams, so different forms of a word still overlap) and kept in a float32
+matrix per patient context, since an answer written for one patient's
+diagnosis and schedule can't be reused for another. A new question is
+scored against its partition with one matrix-vector product, and the
+closest previous answer is reused when the cosine similarity clears the
+threshold. Entries are bounded
+across all partitions with least-recently-used eviction, and the similarity
+of every hit is recorded so the threshold can be checked against real
+traffic.
+
+Score some pairs of questions:
+    python semantic_cache.py "what's tysabri?" "tell me about tysabri" "can I drink wine on tysabri"
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from faq_retrieval import tokenize
+from instrumentation import count
+
+EMBEDDING_DIMENSIONS = 1024
+
+# Content words and word pairs carry the meaning; trigrams give partial credit for related word forms
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.25
+
+# Recent hits kept for reviewing match quality
+HIT_LOG_SIZE = 200
+
+
+def _features(text):
+    terms = tokenize(text)
+    for term in terms:
+        yield term, WORD_WEIGHT
+        if " " not in term:
+            padded = f"<{term}>"
+            for start in range(len(padded) - 2):
+                yield "#" + padded[start:start + 3], TRIGRAM_WEIGHT
+
+
+def embed(text, dimensions=EMBEDDING_DIMENSIONS):
+    """Unit-length hashed feature vector for a question (all zeros if it has no content words)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, weight in _features(text):
+        hashed = zlib.crc32(feature.encode("utf-8"))
+        vector[hashed % dimensions] += weight if hashed & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def patient_key(user_context):
+    """Stable identity of the patient a context belongs to (patientId, else name)"""
+    return user_context.get("patientId") or user_context.get("name", "")
+
+
+def context_partition(user_context, fields):
+    """Partition key for the patient context fields that shape an answer"""
+    payload = json.dumps({field: user_context.get(field) for field in fields}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Partition:
+    """Vectors and entry ids for one patient context, in a buffer that doubles as it fills"""
+
+    def __init__(self, patient, dimensions):
+        self.patient = patient
+        self.ids = []
+        self._buffer = np.zeros((8, dimensions), dtype=np.float32)
+
+    @property
+    def vectors(self):
+        return self._buffer[:len(self.ids)]
+
+    def add(self, entry_id, vector):
+        if len(self.ids) == len(self._buffer):
+            self._buffer = np.vstack([self._buffer, np.zeros_like(self._buffer)])
+        self._buffer[len(self.ids)] = vector
+        self.ids.append(entry_id)
+
+    def remove(self, entry_id):
+        # Move the last row into the gap
+        row = self.ids.index(entry_id)
+        last = len(self.ids) - 1
+        self._buffer[row] = self._buffer[last]
+        self.ids[row] = self.ids[last]
+        self.ids.pop()
+
+
+class SemanticCache:
+    """Per-context vector index of answered questions with LRU + TTL eviction"""
+
+    def __init__(self, fields, threshold=0.9, max_entries=2048, ttl_seconds=86400, dimensions=EMBEDDING_DIMENSIONS):
+        self.fields = fields
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.dimensions = dimensions
+        self.hits = 0
+        self.misses = 0
+        self.recent_hits = deque(maxlen=HIT_LOG_SIZE)  # (similarity, question, cached question)
+        self._partitions = {}
+        self._entries = OrderedDict()  # id -> (partition key, question, response, created_at)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def get(self, message, user_context):
+        """(response, similarity) of the closest cached question above the threshold, or None"""
+        vector = embed(message, self.dimensions)
+        key = context_partition(user_context, self.fields)
+        now = time.time()
+        with self._lock:
+            partition = self._partitions.get(key)
+            while partition is not None and partition.ids and vector.any():
+                scores = partition.vectors @ vector
+                row = int(np.argmax(scores))
+                similarity = float(scores[row])
+                if similarity < self.threshold:
+                    break
+                entry_id = partition.ids[row]
+                _, question, response, created_at = self._entries[entry_id]
+                if now - created_at >= self.ttl_seconds:
+                    # Expired: drop it and look for the next closest
+                    self._remove(entry_id)
+                    partition = self._partitions.get(key)
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                self.recent_hits.append((similarity, message, question))
+                count("ai.semantic_hit")
+                return response, similarity
+            self.misses += 1
+            return None
+
+    def set(self, message, user_context, response):
+        """Index an answered question under its patient context"""
+        vector = embed(message, self.dimensions)
+        if not response or not vector.any():
+            return
+        key = context_partition(user_context, self.fields)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is not None and partition.ids:
+                # A repeat of an indexed question refreshes it rather than adding a row
+                row = int(np.argmax(partition.vectors @ vector))
+                if float(partition.vectors[row] @ vector) >= 0.999:
+                    self._remove(partition.ids[row])
+            if key not in self._partitions:
+                self._partitions[key] = _Partition(patient_key(user_context), self.dimensions)
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (key, message, response, time.time())
+            self._partitions[key].add(entry_id, vector)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        # Caller holds the lock
+        key = self._entries.pop(entry_id)[0]
+        partition = self._partitions[key]
+        partition.remove(entry_id)
+        if not partition.ids:
+            del self._partitions[key]
+
+    def invalidate_patient(self, patient):
+        """Drop every indexed question for a patient"""
+        with self._lock:
+            for key, partition in list(self._partitions.items()):
+                if partition.patient == patient:
+                    for entry_id in partition.ids:
+                        del self._entries[entry_id]
+                    del self._partitions[key]
+
+    def stats(self):
+        with self._lock:
+            similarities = [similarity for similarity, _, _ in self.recent_hits]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "partitions": len(self._partitions),
+                "mean_similarity": sum(similarities) / len(similarities) if similarities else None,
+                "min_similarity": min(similarities) if similarities else None,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show cosine similarity between questions")
+    parser.add_argument("questions", nargs="+")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    vectors = np.vstack([embed(question) for question in args.questions])
+    scores = vectors @ vectors.T
+    for first, second in itertools.combinations(range(len(args.questions)), 2):
+        similarity = float(scores[first, second])
+        verdict = "hit" if similarity >= args.threshold else "miss"
+        print(f"{similarity:.2f} {verdict:4}  {args.questions[first]!r} ~ {args.questions[second]!r}")
+
+
+if __name__ == "__main__":
+    main()
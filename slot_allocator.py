@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Chair-capacity-aware infusion slot allocator.
+
+Each center keeps an occupancy index of booked chairs per day and per
+30-minute slot within its opening hours (parsed from records such as
+"Mon-Fri 8AM-6PM"), held as one numpy array. An infusion occupies a chair
+for INFUSION_DURATION_HOURS, so a start time is free when every slot it
+covers has a chair left. Alongside the occupancy, each center keeps a
+sorted index of the open days that still have a free start. Conflict checks
+touch only the slots of one infusion, and "next available slot" is a bisect
+into that index plus one vectorized scan of a single day. Both stay in
+milliseconds whatever the booking horizon, so they can run inside a
+Streamlit rerun.
+
+Days are bookable from BOOKING_EPOCH until BOOKING_HORIZON_DAYS after
+today; the grid grows as that window rolls forward. Dates outside it raise
+OutsideBookingHorizon rather than a capacity error.
+
+Time bulk placement of synthetic patients:
+    python slot_allocator.py --patients 5000
+"""
+
+import argparse
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import date as calendar_date
+
+import numpy as np
+
+from infusion_schedule import as_dates, bulk_appointment_series, parse_clinic_hours
+from reference_data import CLINIC_HOLIDAYS, INFUSION_CENTERS
+
+# Tysabri infusions take about an hour, followed by an hour of observation
+INFUSION_DURATION_HOURS = 2.0
+SLOT_MINUTES = 30
+
+# Bookable days: from the start of the demo data until three years after today
+BOOKING_EPOCH = "2025-01-01"
+BOOKING_HORIZON_DAYS = 3 * 365
+
+
+class SlotUnavailable(ValueError):
+    """No chair is free for the requested infusion"""
+
+
+class OutsideBookingHorizon(SlotUnavailable):
+    """The requested date is before BOOKING_EPOCH or too far in the future to book"""
+
+
+@dataclass(frozen=True)
+class Booking:
+    center: str
+    date: np.datetime64
+    start_hour: float
+    patient_id: str = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "date", np.datetime64(self.date, "D"))
+
+    @property
+    def time_label(self):
+        hour, minutes = int(self.start_hour), round(self.start_hour % 1 * 60)
+        return f"{hour % 12 or 12}:{minutes:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+class CenterCalendar:
+    """Occupancy index for one infusion center"""
+
+    def __init__(self, name, hours, chairs, epoch, horizon_days, holidays, clock=calendar_date.today):
+        weekmask, open_hour, close_hour = parse_clinic_hours(hours)
+        self.name = name
+        self.chairs = chairs
+        self.epoch = np.datetime64(epoch, "D")
+        self.horizon_days = horizon_days
+        self.open_slot = round(open_hour * 60 / SLOT_MINUTES)
+        self.duration_slots = round(INFUSION_DURATION_HOURS * 60 / SLOT_MINUTES)
+        self._weekmask = weekmask
+        self._holidays = as_dates(holidays)
+        self._clock = clock
+        self._slots_per_day = round(close_hour * 60 / SLOT_MINUTES) - self.open_slot
+        self.booked = np.zeros((0, max(self._slots_per_day, 0)), dtype=np.int16)
+        self._open_days = np.zeros(0, dtype=bool)
+        # Open days with at least one free start, ascending
+        self._available = []
+        self._grow(self._last_day())
+
+    def _last_day(self):
+        """Index of the last bookable day, BOOKING_HORIZON_DAYS after today"""
+        today = np.datetime64(self._clock(), "D")
+        return int((today - self.epoch).astype(int)) + self.horizon_days
+
+    def _grow(self, last_day):
+        """Extend the grid through `last_day`; new days are empty"""
+        start = len(self.booked)
+        if last_day < start:
+            return
+        days = self.epoch + np.arange(start, last_day + 1)
+        open_days = np.is_busday(days, weekmask=self._weekmask, holidays=self._holidays)
+        self.booked = np.vstack([self.booked, np.zeros((len(days), self.booked.shape[1]), dtype=np.int16)])
+        self._open_days = np.concatenate([self._open_days, open_days])
+        if self._slots_per_day >= self.duration_slots:
+            self._available.extend((start + np.flatnonzero(open_days)).tolist())
+
+    def _day_index(self, date):
+        """Grid row for a date, raising OutsideBookingHorizon outside the bookable window"""
+        day = int((np.datetime64(date, "D") - self.epoch).astype(int))
+        last_day = self._last_day()
+        if not 0 <= day <= last_day:
+            raise OutsideBookingHorizon(
+                f"{np.datetime64(date, 'D')} is outside the booking horizon "
+                f"({self.epoch} to {self.epoch + last_day})"
+            )
+        self._grow(last_day)
+        return day
+
+    def _slot(self, start_hour):
+        return round(start_hour * 60 / SLOT_MINUTES) - self.open_slot
+
+    def _hour(self, slot):
+        return (slot + self.open_slot) * SLOT_MINUTES / 60
+
+    def _free_starts(self, day):
+        """Start slots on `day` whose whole infusion window has a chair free"""
+        if self.booked.shape[1] < self.duration_slots:
+            return np.empty(0, dtype=np.intp)
+        windows = np.lib.stride_tricks.sliding_window_view(self.booked[day], self.duration_slots)
+        return np.flatnonzero(windows.max(axis=1) < self.chairs)
+
+    def _refresh(self, day):
+        """Keep the available-day index in step with the day's occupancy"""
+        index = bisect_left(self._available, day)
+        listed = index < len(self._available) and self._available[index] == day
+        has_room = self._open_days[day] and len(self._free_starts(day)) > 0
+        if listed and not has_room:
+            del self._available[index]
+        elif has_room and not listed:
+            insort(self._available, day)
+
+    def is_free(self, date, start_hour):
+        try:
+            day = self._day_index(date)
+        except OutsideBookingHorizon:
+            return False
+        slot = self._slot(start_hour)
+        if not self._open_days[day] or slot < 0 or slot + self.duration_slots > self.booked.shape[1]:
+            return False
+        return bool(self.booked[day, slot:slot + self.duration_slots].max() < self.chairs)
+
+    def next_available(self, on_or_after):
+        """(date, start_hour) of the earliest free infusion on or after a date, or None"""
+        day = self._day_index(on_or_after)
+        index = bisect_left(self._available, day)
+        if index == len(self._available):
+            return None
+        day = self._available[index]
+        return self.epoch + day, self._hour(int(self._free_starts(day)[0]))
+
+    def book(self, date, start_hour):
+        day, slot = self._day_index(date), self._slot(start_hour)
+        if not self.is_free(date, start_hour):
+            raise SlotUnavailable(f"No chair free at {self.name} on {np.datetime64(date, 'D')} at {start_hour:g}h")
+        self.booked[day, slot:slot + self.duration_slots] += 1
+        self._refresh(day)
+
+    def release(self, date, start_hour):
+        day = int((np.datetime64(date, "D") - self.epoch).astype(int))
+        if not 0 <= day < len(self.booked):
+            # Never booked in the grid (e.g. loaded from outside the window)
+            return
+        slot = self._slot(start_hour)
+        window = self.booked[day, slot:slot + self.duration_slots]
+        np.maximum(window - 1, 0, out=window)
+        self._refresh(day)
+
+    def load(self, dates, start_hours):
+        """Add many existing bookings at once, e.g. when the process starts"""
+        self._grow(self._last_day())
+        days = (as_dates(dates) - self.epoch).astype(int)
+        slots = np.round(np.asarray(start_hours, dtype=float) * 60 / SLOT_MINUTES).astype(int) - self.open_slot
+        keep = (days >= 0) & (days < len(self.booked)) & (slots >= 0) & (slots + self.duration_slots <= self.booked.shape[1])
+        days, slots = days[keep], slots[keep]
+        covered = slots[:, None] + np.arange(self.duration_slots)
+        np.add.at(self.booked, (np.repeat(days[:, None], self.duration_slots, axis=1), covered), 1)
+        for day in np.unique(days).tolist():
+            self._refresh(day)
+
+
+class SlotAllocator:
+    """Chair bookings across all infusion centers, shared by every session"""
+
+    def __init__(self, centers=INFUSION_CENTERS, epoch=BOOKING_EPOCH, horizon_days=BOOKING_HORIZON_DAYS, holidays=CLINIC_HOLIDAYS,
+                 clock=calendar_date.today):
+        self._lock = threading.RLock()
+        self._calendars = {
+            center["name"]: CenterCalendar(center["name"], center["hours"], center["chairs"], epoch, horizon_days, holidays, clock)
+            for center in centers
+        }
+        self._by_patient = {}  # patient_id -> [Booking]
+
+    def _calendar(self, center):
+        try:
+            return self._calendars[center]
+        except KeyError:
+            raise SlotUnavailable(f"Unknown infusion center: {center}")
+
+    def is_free(self, center, date, start_hour):
+        with self._lock:
+            return self._calendar(center).is_free(date, start_hour)
+
+    def next_available(self, center, on_or_after):
+        """Earliest free infusion at a center as a Booking (without reserving it), or None"""
+        with self._lock:
+            slot = self._calendar(center).next_available(on_or_after)
+        return Booking(center, *slot) if slot else None
+
+    def book(self, center, date, start_hour=None, patient_id=None):
+        """Reserve a chair; without start_hour, take the first free start that day"""
+        with self._lock:
+            calendar = self._calendar(center)
+            if start_hour is None:
+                slot = calendar.next_available(date)
+                if slot is None or slot[0] != np.datetime64(date, "D"):
+                    raise SlotUnavailable(f"No chair free at {center} on {np.datetime64(date, 'D')}")
+                start_hour = slot[1]
+            calendar.book(date, start_hour)
+            booking = Booking(center, np.datetime64(date, "D"), start_hour, patient_id)
+            if patient_id is not None:
+                self._by_patient.setdefault(patient_id, []).append(booking)
+            return booking
+
+    def place_series(self, center, dates, patient_id=None):
+        """Book each nominal date, moving it to the next day with a free chair if needed
+
+        Either the whole series is booked or, on SlotUnavailable, none of it.
+        """
+        bookings = []
+        with self._lock:
+            calendar = self._calendar(center)
+            earliest = None
+            try:
+                for date in as_dates(dates).tolist():
+                    date = np.datetime64(date, "D")
+                    if earliest is not None and date < earliest:
+                        date = earliest
+                    slot = calendar.next_available(date)
+                    if slot is None:
+                        raise SlotUnavailable(f"No chair free at {center} on or after {date}")
+                    calendar.book(*slot)
+                    bookings.append(Booking(center, slot[0], slot[1], patient_id))
+                    earliest = slot[0] + 1
+            except SlotUnavailable:
+                for booking in bookings:
+                    calendar.release(booking.date, booking.start_hour)
+                raise
+            if patient_id is not None:
+                self._by_patient.setdefault(patient_id, []).extend(bookings)
+        return bookings
+
+    def bulk_place(self, center, patient_ids, schedules):
+        """Place many patients' series (rows of `schedules`) at one center"""
+        return {patient_id: self.place_series(center, schedule, patient_id) for patient_id, schedule in zip(patient_ids, schedules)}
+
+    def reschedule_patient(self, center, dates, patient_id):
+        """Move a patient's series to new dates, keeping the old bookings if the new ones do not fit"""
+        with self._lock:
+            previous = self._by_patient.pop(patient_id, [])
+            for booking in previous:
+                self._calendars[booking.center].release(booking.date, booking.start_hour)
+            try:
+                return self.place_series(center, dates, patient_id)
+            except SlotUnavailable:
+                for booking in previous:
+                    self._calendars[booking.center].book(booking.date, booking.start_hour)
+                self._by_patient[patient_id] = previous
+                raise
+
+    def release_patient(self, patient_id):
+        """Free every chair held by a patient, e.g. before rescheduling them"""
+        with self._lock:
+            for booking in self._by_patient.pop(patient_id, []):
+                self._calendars[booking.center].release(booking.date, booking.start_hour)
+
+    def load(self, bookings):
+        """Seed the index from stored bookings"""
+        by_center = {}
+        for booking in bookings:
+            by_center.setdefault(booking.center, []).append(booking)
+        with self._lock:
+            for center, center_bookings in by_center.items():
+                if center not in self._calendars:
+                    continue
+                self._calendars[center].load([b.date for b in center_bookings], [b.start_hour for b in center_bookings])
+                for booking in center_bookings:
+                    if booking.patient_id is not None:
+                        self._by_patient.setdefault(booking.patient_id, []).append(booking)
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_slot_allocator():
+    """Return the process-wide allocator, seeded with the bookings in the patient store"""
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            from patient_store import get_patient_repository
+
+            allocator = SlotAllocator()
+            allocator.load(
+                Booking(center, np.datetime64(date, "D"), start_hour, patient_id)
+                for patient_id, date, center, start_hour in get_patient_repository().iter_bookings()
+            )
+            _allocator = allocator
+        return _allocator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time bulk infusion placement and slot queries")
+    parser.add_argument("--patients", type=int, default=5000, help="synthetic patients, spread across all centers")
+    args = parser.parse_args()
+
+    allocator = SlotAllocator()
+    centers = [center["name"] for center in INFUSION_CENTERS]
+    rng = np.random.default_rng(7)
+    starts = np.datetime64("2025-10-20") + rng.integers(0, 28, args.patients)
+    schedules = bulk_appointment_series(starts)
+    patient_ids = np.array([f"PT-{index:06d}" for index in range(args.patients)])
+
+    started = time.perf_counter()
+    for index, center in enumerate(centers):
+        allocator.bulk_place(center, patient_ids[index::len(centers)], schedules[index::len(centers)])
+    placed = time.perf_counter() - started
+    print(f"✅ Placed {schedules.size} infusions for {args.patients} patients in {placed:.2f}s")
+
+    started = time.perf_counter()
+    for offset in range(1000):
+        allocator.next_available(centers[offset % len(centers)], np.datetime64("2025-10-20") + offset % 365)
+    print(f"⏱️ next_available: {(time.perf_counter() - started):.3f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
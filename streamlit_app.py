@@ -1,19 +1,85 @@
 import streamlit as st
-import openai
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 import json
+import html
 import urllib.parse
 
-# Helper function for generating appointments
-def generate_appointments(start_date_str="2025-10-25", count=6):
-    """Generate a list of appointment dates spaced 28 days apart"""
-    start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-    appointments = []
-    for i in range(count):
-        appointment_date = start_date + timedelta(days=28 * i)
-        appointments.append(appointment_date.strftime("%Y-%m-%d"))
-    return appointments
+from ai_client import get_api_key
+from ai_router import key_problem
+from assistant import answer, answer_many, answer_stream, demo_response, get_service, parse_scenarios
+from chat_memory import ChatMemory
+from response_cache import get_response_cache
+from app_assets import APP_CSS, HEADER_HTML
+from infusion_schedule import INFUSION_INTERVAL_DAYS, appointment_series, as_dates, reschedule_series, to_iso
+from slot_allocator import Booking, SlotUnavailable, get_slot_allocator
+from center_search import NEARBY_CENTER_COUNT, distance_miles, get_center_index
+from ride_estimates import TIERS as RIDE_TIERS, get_ride_estimator
+from geocoding import PRECISION_LABELS, STREET_APPROX, locate
+from phone_numbers import parse_phone
+from reference_data import AGENT_CONTEXT, INFUSION_CENTERS, PATIENT_CONTEXT, TEST_SCENARIOS
+from patient_store import PRIORITY_LABELS, get_patient_repository
+from dashboard_metrics import CHAT_TURN, CONTACT, FEEDBACK, PRIOR_AUTH, PRIOR_AUTH_STATUSES, SCHEDULE_CHANGE, dashboard_snapshot, prior_auth_status, record_event
+from instrumentation import begin_rerun, debug_panel_enabled, end_rerun, render_debug_panel, timed_section
+
+# Profile this rerun's sections, AI calls and element count
+begin_rerun()
+
+def _book_series(patient_id, appointments, center):
+    """Reserve chairs for a series at a center and persist the booked dates and times"""
+    bookings = get_slot_allocator().reschedule_patient(center, appointments, patient_id)
+    get_patient_repository().save_appointments(
+        patient_id,
+        to_iso([booking.date for booking in bookings]),
+        center,
+        [booking.start_hour for booking in bookings],
+    )
+    st.session_state.appointments = as_dates([booking.date for booking in bookings])
+    st.session_state.appointment_bookings = bookings
+
+def load_appointments(patient_id):
+    """Load a patient's bookings into session state, booking the default series on first visit"""
+    rows = get_patient_repository().get_bookings(patient_id)
+    if not rows or rows[0][2] is None:
+        # New patient, or dates without chair times (e.g. after a batch regenerate)
+        center = rows[0][1] if rows and rows[0][1] else INFUSION_CENTERS[0]["name"]
+        _book_series(patient_id, [date for date, _, _ in rows] or appointment_series(), center)
+        return
+    st.session_state.appointments = as_dates([date for date, _, _ in rows])
+    st.session_state.appointment_bookings = [Booking(center, date, start_hour, patient_id) for date, center, start_hour in rows]
+
+def save_appointments(patient_id, appointments, center):
+    """Book and persist a patient's appointments so the agent view sees the change"""
+    _book_series(patient_id, appointments, center)
+    record_event(SCHEDULE_CHANGE, patient_id, appointments=len(appointments), center=center)
+
+def format_infusion_date(value):
+    """Format a booked date as e.g. October 27, 2025"""
+    day = as_dates(value).item()
+    return f"{day:%B} {day.day}, {day.year}"
+
+def patient_session_context():
+    """The demo patient's context with nextInfusion taken from their booked series
+
+    A copy per session: PATIENT_CONTEXT is shared by every session. Prompts,
+    demo replies and response cache keys all read nextInfusion, so a changed
+    booking also invalidates the patient's cached answers.
+    """
+    if 'appointment_bookings' not in st.session_state:
+        try:
+            load_appointments(PATIENT_CONTEXT["patientId"])
+        except SlotUnavailable:
+            # The scheduling section reports this when it is opened
+            return PATIENT_CONTEXT
+    return dict(PATIENT_CONTEXT, nextInfusion=format_infusion_date(st.session_state.appointments[0]))
+
+def format_display_date(iso_date):
+    """Format a stored YYYY-MM-DD date as e.g. Oct 25, 2025"""
+    try:
+        return datetime.strptime(iso_date, "%Y-%m-%d").strftime("%b %d, %Y")
+    except (TypeError, ValueError):
+        return iso_date or "Not scheduled"
 
 # Page configuration
 st.set_page_config(
@@ -24,317 +90,30 @@ st.set_page_config(
 )
 
 # Custom CSS with Biogen brand colors and elegant styling
-st.markdown("""
-<style>
-    /* Import Biogen font */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Global styles */
-    .stApp {
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Main header with Biogen blue gradient - Mobile optimized */
-    .main-header {
-        background: linear-gradient(135deg, #003366 0%, #0066cc 50%, #0080ff 100%);
-        padding: 1.5rem 1rem;
-        border-radius: 10px;
-        color: white;
-        text-align: center;
-        margin-bottom: 1rem;
-        box-shadow: 0 4px 16px rgba(0, 102, 204, 0.2);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .main-header h1 {
-        font-size: 1.8rem;
-        font-weight: 700;
-        margin-bottom: 0.25rem;
-        text-shadow: 0 2px 4px rgba(0, 0, 0, 0.3);
-    }
-    
-    .main-header p {
-        font-size: 1rem;
-        font-weight: 300;
-        opacity: 0.9;
-        margin: 0;
-    }
-    
-    /* Mobile responsive adjustments */
-    @media (max-width: 768px) {
-        .main-header {
-            padding: 1rem 0.75rem;
-            margin-bottom: 0.75rem;
-        }
-        
-        .main-header h1 {
-            font-size: 1.5rem;
-        }
-        
-        .main-header p {
-            font-size: 0.9rem;
-        }
-    }
-    
-    /* Patient card with elegant blue gradient - Compact */
-    .user-card {
-        background: linear-gradient(135deg, #e6f3ff 0%, #cce7ff 50%, #b3d9ff 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: #003366;
-        margin-bottom: 0.75rem;
-        border-left: 5px solid #0066cc;
-        box-shadow: 0 4px 16px rgba(0, 102, 204, 0.1);
-    }
-    
-    .user-card h2 {
-        color: #003366;
-        font-weight: 600;
-        margin-bottom: 0.5rem;
-        font-size: 1.2rem;
-    }
-    
-    /* Agent card with professional green gradient - Compact */
-    .agent-card {
-        background: linear-gradient(135deg, #f0f8f0 0%, #e0f0e0 50%, #d0e8d0 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: #2d5a2d;
-        margin-bottom: 0.75rem;
-        border-left: 5px solid #4a7c4a;
-        box-shadow: 0 4px 16px rgba(74, 124, 74, 0.1);
-    }
-    
-    .agent-card h2 {
-        color: #2d5a2d;
-        font-weight: 600;
-        margin-bottom: 1rem;
-    }
-    
-    /* Chat messages with Biogen styling */
-    .chat-message {
-        padding: 1.25rem;
-        border-radius: 15px;
-        margin: 0.75rem 0;
-        font-size: 1rem;
-        line-height: 1.6;
-    }
-    
-    .user-message {
-        background: linear-gradient(135deg, #0066cc 0%, #0080ff 100%);
-        color: white;
-        margin-left: 25%;
-        box-shadow: 0 4px 12px rgba(0, 102, 204, 0.3);
-    }
-    
-    .ai-message {
-        background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
-        color: #333;
-        margin-right: 25%;
-        border: 2px solid #e6f3ff;
-        box-shadow: 0 4px 12px rgba(0, 102, 204, 0.1);
-    }
-    
-    /* Metric cards with Biogen styling */
-    .metric-card {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 15px;
-        box-shadow: 0 4px 20px rgba(0, 102, 204, 0.1);
-        text-align: center;
-        margin: 0.75rem;
-        border: 1px solid #e6f3ff;
-        transition: transform 0.2s ease, box-shadow 0.2s ease;
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(0, 102, 204, 0.15);
-    }
-    
-    .metric-card h3 {
-        color: #0066cc;
-        font-size: 2rem;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-    }
-    
-    .metric-card p {
-        color: #666;
-        font-weight: 500;
-        margin: 0;
-    }
-    
-    /* Sidebar styling */
-    .css-1d391kg {
-        background: linear-gradient(180deg, #f8f9fa 0%, #ffffff 100%);
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        background: linear-gradient(135deg, #0066cc 0%, #0080ff 100%);
-        color: white;
-        border: none;
-        border-radius: 10px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 12px rgba(0, 102, 204, 0.3);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(0, 102, 204, 0.4);
-    }
-    
-    /* Input styling */
-    .stTextInput > div > div > input {
-        border: 2px solid #e6f3ff;
-        border-radius: 10px;
-        padding: 0.75rem;
-        font-size: 1rem;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: #0066cc;
-        box-shadow: 0 0 0 3px rgba(0, 102, 204, 0.1);
-    }
-    
-    /* Select box styling */
-    .stSelectbox > div > div {
-        border: 2px solid #e6f3ff;
-        border-radius: 10px;
-    }
-    
-    /* Success/Error messages */
-    .stSuccess {
-        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-        border: 1px solid #4a7c4a;
-        border-radius: 10px;
-    }
-    
-    .stError {
-        background: linear-gradient(135deg, #f8d7da 0%, #f5c6cb 100%);
-        border: 1px solid #dc3545;
-        border-radius: 10px;
-    }
-    
-    /* Journey tracker styling */
-    .journey-step {
-        background: linear-gradient(135deg, #e6f3ff 0%, #f0f8ff 100%);
-        border: 2px solid #0066cc;
-        border-radius: 10px;
-        padding: 0.75rem;
-        margin: 0.5rem 0;
-        text-align: center;
-    }
-    
-    /* Quick action buttons */
-    .quick-action {
-        background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
-        border: 2px solid #e6f3ff;
-        border-radius: 15px;
-        padding: 1.5rem;
-        text-align: center;
-        transition: all 0.3s ease;
-        cursor: pointer;
-    }
-    
-    .quick-action:hover {
-        border-color: #0066cc;
-        background: linear-gradient(135deg, #e6f3ff 0%, #f0f8ff 100%);
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(0, 102, 204, 0.15);
-    }
-    
-    /* Mobile-specific improvements */
-    @media (max-width: 768px) {
-        .stApp {
-            padding: 0.5rem;
-        }
-        
-        .user-card, .agent-card {
-            padding: 1rem;
-            margin-bottom: 1rem;
-        }
-        
-        .metric-card {
-            padding: 1rem;
-            margin: 0.5rem;
-        }
-        
-        .journey-step {
-            padding: 1rem;
-            margin: 0.5rem 0;
-        }
-        
-        .chat-message {
-            padding: 1rem;
-            margin: 0.5rem 0;
-        }
-        
-        .user-message {
-            margin-left: 15%;
-        }
-        
-        .ai-message {
-            margin-right: 15%;
-        }
-        
-        /* Sidebar improvements for mobile */
-        .css-1d391kg {
-            padding: 0.5rem;
-        }
-        
-        /* Button improvements for mobile */
-        .stButton > button {
-            padding: 0.75rem 1rem;
-            font-size: 14px;
-        }
-        
-        /* Input improvements for mobile */
-        .stTextInput > div > div > input {
-            padding: 0.75rem;
-            font-size: 16px; /* Prevents zoom on iOS */
-        }
-        
-        /* Date input improvements for mobile */
-        .stDateInput > div > div > input {
-            padding: 0.75rem;
-            font-size: 16px;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+with timed_section("app.css"):
+    st.markdown(APP_CSS, unsafe_allow_html=True)
 
-# Initialize OpenAI client
+# Initialize AI providers
 def init_openai():
-    # Try to get API key from environment variable first
-    api_key = os.getenv('OPENAI_API_KEY')
-    
-    # If not found in environment, try Streamlit secrets
-    if not api_key:
-        try:
-            api_key = st.secrets['openai']['api_key']
-        except:
-            pass
-    
-    if not api_key:
-        st.error("⚠️ OpenAI API key not found. Please set the OPENAI_API_KEY environment variable or configure it in Streamlit secrets.")
-        return None
-    
-    try:
-        # Test the API key with a simple call
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
-        # Don't make an actual API call here, just validate the key format
-        if not api_key.startswith('sk-proj-'):
-            st.error("⚠️ Invalid API key format. Please check your OpenAI API key.")
-            return None
-        return True
-    except Exception as e:
-        st.error(f"Error initializing OpenAI: {e}")
-        return None
+    """Return the shared provider router, or None if no AI provider is configured
+    
+    A configuration problem is reported once per session rather than on every call.
+    """
+    router = get_service()
+    if router is not None:
+        return router
+    
+    problem = key_problem(get_api_key())
+    if problem and st.session_state.get('ai_setup_problem') != problem:
+        st.session_state.ai_setup_problem = problem
+        st.error(f"⚠️ {problem}")
+    return None
+
+def warn_once(text):
+    """Show a fallback warning unless this session was already shown the same one"""
+    if st.session_state.get('last_ai_warning') != text:
+        st.session_state.last_ai_warning = text
+        st.warning(text)
 
 # Initialize session state
 if 'user_role' not in st.session_state:
@@ -342,150 +121,87 @@ if 'user_role' not in st.session_state:
 if 'user_name' not in st.session_state:
     st.session_state.user_name = None
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatMemory()
 if 'openai_initialized' not in st.session_state:
     st.session_state.openai_initialized = False
 
-# Patient context data
-PATIENT_CONTEXT = {
-    "name": "Sarah Parker",
-    "role": "patient",
-    "diagnosis": "Relapsing-Remitting MS",
-    "therapy": "Tysabri",
-    "diagnosisDate": "October 20, 2025",
-    "nextInfusion": "October 25, 2025",
-    "location": "Palo Alto, CA"
+# Render AI replies token by token in the patient chat (set AI_STREAMING=false to disable)
+STREAM_AI_RESPONSES = os.getenv('AI_STREAMING', 'true').lower() not in ('0', 'false', 'no')
+
+# Input tokens spent on earlier chat turns sent with each message
+HISTORY_TOKEN_BUDGET = int(os.getenv('AI_HISTORY_TOKENS', '1000'))
+
+# Chat messages shown per page in the patient chat
+CHAT_PAGE_SIZE = 10
+
+# Patients per page in the agent queue
+AGENT_QUEUE_PAGE_SIZE = 10
+
+# Agent queue sort options, mapped to patient_store.QUEUE_SORTS
+QUEUE_SORT_LABELS = {
+    "priority": "Priority",
+    "next_appointment": "Next appointment",
+    "last_contact": "Most recent contact",
 }
 
-AGENT_CONTEXT = {
-    "name": "Cindy Smith",
-    "role": "agent",
-    "department": "Patient Services",
-    "experience": "5 years",
-    "specializations": ["MS Treatment", "Tysabri Support", "Patient Education"]
+# Ride pick-up times offered in the transportation section (None = now)
+RIDE_HOURS = [None] + list(range(6, 21))
+CENTER_SORT_LABELS = {
+    "miles": "Distance",
+    "minutes": "Trip time",
+    "fare": "Price",
 }
 
-# AI Response Generation
-def generate_ai_response(message, user_context, provider="openai"):
-    """Generate AI response using OpenAI or fallback to demo mode"""
-    
-    # Try OpenAI first if available
-    if provider == "openai" and init_openai():
-        try:
-            # Get API key from environment or secrets
-            api_key = os.getenv('OPENAI_API_KEY')
-            if not api_key:
-                try:
-                    api_key = st.secrets['openai']['api_key']
-                except:
-                    return generate_demo_response(message, user_context)
-            
-            system_prompt = f"""You are an AI assistant for Biogen Patient Services, specifically helping patients with Multiple Sclerosis (MS) who are on Tysabri therapy. You are empathetic, knowledgeable, and supportive.
 
-Patient Context:
-- Name: {user_context['name']}
-- Role: {user_context['role']}
-- Diagnosis: {user_context.get('diagnosis', 'Relapsing-Remitting MS')}
-- Therapy: {user_context.get('therapy', 'Tysabri')}
-- Diagnosis Date: {user_context.get('diagnosisDate', 'October 20, 2025')}
-- Next Infusion: {user_context.get('nextInfusion', 'October 25, 2025')}
-- Location: {user_context.get('location', 'Palo Alto, CA')}
-- Current Date: {datetime.now().strftime('%B %d, %Y')}
+def format_ride_hour(hour):
+    return "Now" if hour is None else f"{hour % 12 or 12}:00 {'AM' if hour < 12 else 'PM'}"
 
-Your role is to:
-1. Answer questions about MS, Tysabri treatment, side effects, appointments, and lifestyle
-2. Provide emotional support and reassurance
-3. Help with practical matters like transportation, insurance, and scheduling
-4. Be conversational and natural, like a knowledgeable friend who happens to be an expert
-5. Always prioritize patient safety and recommend contacting healthcare providers for medical concerns
-6. Keep responses concise but helpful (2-4 sentences typically)
+# AI Response Generation
+@timed_section("ai.generate_ai_response")
+def generate_ai_response(message, user_context, provider="auto", stream=False, history=None):
+    """Generate AI response through the provider router or fallback to demo mode
+    
+    provider="auto" routes to the fastest healthy provider; "demo" skips them.
+    
+    With stream=True a generator of text chunks is returned instead of a string,
+    so the caller can render tokens as they arrive. `history` is the ChatMemory
+    of earlier turns; a token-budgeted window of it is sent with the message.
+    """
+    
+    # answer() and answer_stream() cover FAQ matches, the response cache, the providers and demo mode
+    service = init_openai() if provider != "demo" else None
+    summary, recent_turns = history.context_window(HISTORY_TOKEN_BUDGET) if history else (None, [])
+    if not stream:
+        result = answer(message, user_context, service, recent_turns, summary)
+        report_ai_result(result, service)
+        return result.text
+    return render_answer_stream(answer_stream(message, user_context, service, recent_turns, summary), service)
 
-Important guidelines:
-- Be warm and empathetic
-- Use the patient's name naturally in conversation
-- Don't provide specific medical advice - refer to healthcare providers for that
-- Be encouraging about treatment and prognosis
-- Offer practical help when possible
-- If you don't know something, admit it and suggest who might know"""
+def render_answer_stream(reply, service):
+    """Yield an AnswerStream's text chunks, then report how it was answered"""
+    yield from reply
+    report_ai_result(reply.result, service)
 
-            from openai import OpenAI
-            client = OpenAI(api_key=api_key)
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                max_tokens=300,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            st.warning(f"OpenAI API error: {e}. Using demo mode instead.")
-            return generate_demo_response(message, user_context)
-    
-    # Fallback to demo mode
-    return generate_demo_response(message, user_context)
+def report_ai_result(result, service):
+    """Record prompt size and surface a provider fallback or broken-off reply to the user"""
+    if result.prompt_tokens:
+        st.session_state.last_prompt_tokens = result.prompt_tokens
+    if result.incomplete:
+        # Keep what the patient has already seen rather than swapping in a canned reply
+        st.warning(f"{result.error}. The response may be incomplete.")
+    elif result.error:
+        warn_once(f"{result.error}. Using demo mode instead.")
+    elif service is not None:
+        st.session_state.last_ai_warning = None
 
 def generate_demo_response(message, user_context):
     """Generate demo response for when OpenAI is not available"""
-    user_name = user_context['name'].split(' ')[0]
-    lower_message = message.lower().strip()
-    
-    # Personal questions
-    if 'what is my name' in lower_message or 'my name' in lower_message:
-        return f"Your name is {user_context['name']}. I'm here to help you with your Tysabri treatment journey."
-    
-    if 'who am i' in lower_message:
-        return f"I'm talking to {user_context['name']}. You're a patient starting Tysabri treatment for MS. How can I help you today?"
-    
-    # Medical questions
-    if 'what is tysabri' in lower_message or 'tysabri' in lower_message:
-        return f"Tysabri (natalizumab) is a medication used to treat relapsing-remitting multiple sclerosis. It's given as an IV infusion every 28 days and helps reduce MS inflammation and relapses. You'll be starting this treatment on October 25, 2025. Do you have any specific questions about how it works?"
-    
-    if 'side effects' in lower_message:
-        return f"Common side effects of Tysabri can include headache, fatigue, nausea, and sometimes mild flu-like symptoms, especially in the first few infusions. Most people tolerate it well, and side effects usually improve over time. Your healthcare team will monitor you closely for any concerns. Are you worried about any particular side effects?"
-    
-    if 'headache' in lower_message:
-        return f"Headaches can happen with Tysabri, especially after infusions. You can usually take acetaminophen (Tylenol) for relief. Stay hydrated and rest in a cool, dark room if needed. Most infusion-related headaches improve within 24-48 hours. Is this something you're experiencing?"
-    
-    # Appointment questions
-    if 'appointment' in lower_message or 'when is my infusion' in lower_message:
-        return f"Your next infusion is scheduled for October 25, 2025. After that, you'll have infusions every 28 days. I can help you schedule future appointments or reschedule if needed. Would you like me to help you with anything specific about your appointment?"
-    
-    # Transportation
-    if 'transportation' in lower_message or 'ride' in lower_message:
-        return f"I can help you arrange transportation to your appointments! We can coordinate Uber or Lyft rides, medical transportation, or help you coordinate with family or friends. Just let me know your address and I can set up a ride for your October 25th appointment. Would you like me to help arrange that now?"
-    
-    # Emotional support
-    if any(word in lower_message for word in ['worried', 'anxious', 'scared', 'nervous']):
-        return f"It's completely normal to feel worried or anxious about starting a new treatment, especially with a new MS diagnosis. Many people feel this way. Tysabri is a very effective treatment, and your healthcare team will monitor you closely. You're taking the right steps by getting treatment early. Is there something specific that's worrying you? I'm here to listen and help."
-    
-    # Greetings
-    if any(word in lower_message for word in ['hello', 'hi', 'hey']):
-        return f"Hello {user_name}! I'm your AI assistant for your Tysabri treatment journey. I can help you with questions about MS, your treatment, appointments, side effects, or anything else you're curious about. What would you like to know?"
-    
-    if 'thank you' in lower_message or 'thanks' in lower_message:
-        return f"You're very welcome, {user_name}! I'm glad I could help. Is there anything else you'd like to know about your treatment or MS?"
-    
-    # General fallback
-    if any(word in lower_message for word in ['?', 'what', 'how', 'why', 'when', 'where']):
-        return f"That's a great question, {user_name}. I want to make sure I give you the most accurate and helpful information. Could you provide a bit more detail about what specifically you'd like to know? I can help with questions about MS, Tysabri treatment, appointments, side effects, lifestyle, family, work, or any other concerns you might have."
-    
-    # Final fallback
-    return f"I understand you're asking about \"{message}\", {user_name}. I'm your AI assistant for your Tysabri treatment journey. I can help you with questions about MS, your medication, appointments, side effects, lifestyle, family, work, or anything else on your mind. Could you tell me more about what you'd like to know? I'm here to support you."
+    return demo_response(message, user_context)
 
 # Main App
 def main():
     # Header
-    st.markdown("""
-    <div class="main-header">
-        <h1>🏥 Patient Services</h1>
-        <p>AI powered Patient Support System</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
     
     # Login Section
     if st.session_state.user_role is None:
@@ -497,19 +213,19 @@ def main():
             if st.button("👤 Login as Patient (Sarah Parker)", use_container_width=True):
                 st.session_state.user_role = "patient"
                 st.session_state.user_name = PATIENT_CONTEXT["name"]
-                st.session_state.chat_history = []
+                st.session_state.chat_history = ChatMemory()
                 st.rerun()
         
         with col2:
             if st.button("👩‍💼 Login as Agent (Cindy Smith)", use_container_width=True):
                 st.session_state.user_role = "agent"
                 st.session_state.user_name = AGENT_CONTEXT["name"]
-                st.session_state.chat_history = []
+                st.session_state.chat_history = ChatMemory()
                 st.rerun()
     
     else:
         # User is logged in
-        user_context = PATIENT_CONTEXT if st.session_state.user_role == "patient" else AGENT_CONTEXT
+        user_context = patient_session_context() if st.session_state.user_role == "patient" else AGENT_CONTEXT
         
         # Sidebar
         with st.sidebar:
@@ -535,19 +251,70 @@ def main():
             if st.button("🚪 Logout", use_container_width=True):
                 st.session_state.user_role = None
                 st.session_state.user_name = None
-                st.session_state.chat_history = []
+                st.session_state.chat_history = ChatMemory()
                 st.rerun()
         
+        if debug_panel_enabled():
+            render_debug_panel()
+        
         # Main Content
         if st.session_state.user_role == "patient":
             show_patient_dashboard(user_context)
         else:
             show_agent_dashboard(user_context)
 
+def render_chat_message(role, content, container=None):
+    """Render a single chat bubble"""
+    container = container or st
+    if role == "user":
+        container.markdown(f"""
+        <div class="chat-message user-message">
+            <strong>You:</strong> {content}
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        container.markdown(f"""
+        <div class="chat-message ai-message">
+            <strong>AI:</strong> {content}
+        </div>
+        """, unsafe_allow_html=True)
+
+def render_streaming_response(chunks):
+    """Render AI text live in a chat bubble as chunks arrive and return the full text"""
+    placeholder = st.empty()
+    render_chat_message("assistant", "▌", placeholder)
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        render_chat_message("assistant", text + "▌", placeholder)
+    text = text.strip()
+    render_chat_message("assistant", text, placeholder)
+    return text
+
 def show_patient_dashboard(user_context):
     """Display patient dashboard"""
     
     # Welcome Section - Compact
+    render_patient_welcome(user_context)
+    
+    # Treatment Journey - Compact
+    render_treatment_journey(user_context)
+    
+    # AI Chat Section - Compact
+    render_patient_chat(user_context)
+    
+    # Quick Actions - Compact
+    render_quick_actions(user_context)
+    
+    # Transportation Section
+    render_transportation()
+    
+    # Scheduling Section
+    render_scheduling(user_context)
+
+@timed_section("patient.welcome")
+def render_patient_welcome(user_context):
+    """Greeting card with the patient's therapy and next infusion"""
     st.markdown(f"""
     <div class="user-card">
         <h2>Welcome back, {user_context['name'].split(' ')[0]}!</h2>
@@ -555,8 +322,10 @@ def show_patient_dashboard(user_context):
         <p>Next infusion: <strong>{user_context['nextInfusion']}</strong></p>
     </div>
     """, unsafe_allow_html=True)
-    
-    # Treatment Journey - Compact
+
+@timed_section("patient.journey")
+def render_treatment_journey(user_context):
+    """Milestones of the patient's treatment so far"""
     st.markdown("### 🗺️ Treatment Journey")
     
     journey_col1, journey_col2, journey_col3 = st.columns(3)
@@ -578,30 +347,31 @@ def show_patient_dashboard(user_context):
         """, unsafe_allow_html=True)
     
     with journey_col3:
-        st.markdown("""
+        st.markdown(f"""
         <div class="journey-step">
             <h5 style="color: #0066cc; font-weight: 600; margin-bottom: 0.5rem; font-size: 1rem;">📅 First Infusion</h5>
-            <p style="color: #666; margin: 0; font-size: 0.9rem;">October 25, 2025</p>
+            <p style="color: #666; margin: 0; font-size: 0.9rem;">{user_context['nextInfusion']}</p>
         </div>
         """, unsafe_allow_html=True)
-    
-    # AI Chat Section - Compact
+
+@timed_section("patient.chat")
+def render_patient_chat(user_context):
+    """Chat history, question box and reply ratings"""
     st.markdown("### 🤖 AI Agent")
     
-    # Display chat history
-    for message in st.session_state.chat_history:
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="chat-message user-message">
-                <strong>You:</strong> {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message ai-message">
-                <strong>AI:</strong> {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
+    # Display the latest page of chat history; older pages load on demand
+    chat_history = st.session_state.chat_history
+    visible_count = st.session_state.get('chat_visible_count', CHAT_PAGE_SIZE)
+    if len(chat_history) > visible_count:
+        if st.button(f"⬆️ Show earlier messages ({len(chat_history) - visible_count} more)", key="chat_show_earlier"):
+            st.session_state.chat_visible_count = visible_count + CHAT_PAGE_SIZE
+            st.rerun()
+    for turn in chat_history.latest(visible_count):
+        render_chat_message(turn.role, turn.content)
+    
+    # The last fallback notice stays up until a provider answers again
+    if st.session_state.get('last_ai_warning'):
+        st.caption(f"⚠️ {st.session_state.last_ai_warning}")
     
     # Chat input
     user_input = st.text_input("Ask me anything about MS, Tysabri, appointments, or your treatment:", placeholder="e.g., What is Tysabri?")
@@ -609,26 +379,38 @@ def show_patient_dashboard(user_context):
     if st.button("Ask Patient Services AI Agent", use_container_width=True):
         if user_input:
             # Add user message to history
-            st.session_state.chat_history.append({
-                "role": "user",
-                "content": user_input,
-                "timestamp": datetime.now()
-            })
-            
-            # Generate AI response
-            with st.spinner("AI is thinking..."):
-                ai_response = generate_ai_response(user_input, user_context)
-            
-            # Add AI response to history
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": ai_response,
-                "timestamp": datetime.now()
-            })
-            
+            # Generate AI response with the conversation so far as context
+            if STREAM_AI_RESPONSES:
+                render_chat_message("user", user_input)
+                ai_response = render_streaming_response(
+                    generate_ai_response(user_input, user_context, stream=True, history=chat_history)
+                )
+            else:
+                with st.spinner("AI is thinking..."):
+                    ai_response = generate_ai_response(user_input, user_context, history=chat_history)
+        
+            # Add both turns to history
+            chat_history.append("user", user_input)
+            chat_history.append("assistant", ai_response)
+            record_event(CHAT_TURN, user_context["patientId"])
+        
             st.rerun()
-    
-    # Quick Actions - Compact
+
+    # One rating per assistant reply feeds the agents' satisfaction score
+    if len(chat_history) and st.session_state.get('rated_turns') != len(chat_history):
+        col_helpful, col_unhelpful, _ = st.columns([1, 1, 4])
+        with col_helpful:
+            helpful = st.button("👍 Helpful", key="feedback_helpful")
+        with col_unhelpful:
+            unhelpful = st.button("👎 Not helpful", key="feedback_unhelpful")
+        if helpful or unhelpful:
+            record_event(FEEDBACK, user_context["patientId"], helpful=helpful)
+            st.session_state.rated_turns = len(chat_history)
+            st.rerun()
+
+@timed_section("patient.actions")
+def render_quick_actions(user_context):
+    """Contact, transportation and scheduling buttons"""
     st.markdown("### 🚀 Actions")
     
     col1, col2, col3 = st.columns(3)
@@ -636,31 +418,26 @@ def show_patient_dashboard(user_context):
     with col1:
         if st.button("📞 Contact Your Rep", use_container_width=True):
             st.session_state.show_whatsapp = True
-        
+            get_patient_repository().record_contact(user_context["patientId"])
+            record_event(CONTACT, user_context["patientId"], initiated_by="patient")
+    
         if st.session_state.get('show_whatsapp', False):
             col_patient, col_agent = st.columns(2)
-            
+        
             with col_patient:
                 patient_phone = st.text_input("Your phone number:", key="patient_phone", placeholder="+1 555 123-4567")
-            
+        
             with col_agent:
                 agent_phone = st.text_input("Agent's phone number:", key="agent_phone", placeholder="+1 555 987-6543", value="+1 555 987-6543")
-            
-            if patient_phone and agent_phone and len(patient_phone.replace('+', '').replace('-', '').replace(' ', '')) >= 10 and len(agent_phone.replace('+', '').replace('-', '').replace(' ', '')) >= 10:
-                # Clean phone numbers
-                clean_patient_phone = patient_phone.replace('+', '').replace('-', '').replace(' ', '')
-                clean_agent_phone = agent_phone.replace('+', '').replace('-', '').replace(' ', '')
-                
-                if not clean_patient_phone.startswith('1') and len(clean_patient_phone) == 10:
-                    clean_patient_phone = '1' + clean_patient_phone
-                if not clean_agent_phone.startswith('1') and len(clean_agent_phone) == 10:
-                    clean_agent_phone = '1' + clean_agent_phone
-                
+        
+            patient_number, patient_phone_error = parse_phone(patient_phone)
+            agent_number, agent_phone_error = parse_phone(agent_phone)
+            if patient_number and agent_number:
                 # Create WhatsApp message
-                message = f"Hi Cindy! This is Sarah Parker (Patient ID: SP-2025-001). I have some questions about my Tysabri therapy. My number is {patient_phone}. Thank you for your support! 💙"
+                message = f"Hi Cindy! This is Sarah Parker (Patient ID: SP-2025-001). I have some questions about my Tysabri therapy. My number is {patient_number}. Thank you for your support! 💙"
                 encoded_message = urllib.parse.quote(message)
-                whatsapp_url = f"https://wa.me/{clean_agent_phone}?text={encoded_message}"
-                
+                whatsapp_url = f"https://wa.me/{agent_number.lstrip('+')}?text={encoded_message}"
+            
                 # Create a clickable link that actually works
                 st.markdown(f"""
                 <div style="text-align: center; margin: 15px 0;">
@@ -679,22 +456,30 @@ def show_patient_dashboard(user_context):
                     </a>
                 </div>
                 """, unsafe_allow_html=True)
-                
+            
                 st.success("✅ WhatsApp link generated! Click the green button above to start chatting with your agent.")
                 st.info(f"📱 This will open WhatsApp and send a message to {agent_phone}")
             elif patient_phone or agent_phone:
-                st.error("❌ Please enter valid phone numbers for both fields (at least 10 digits each)")
+                for label, error in (("Your phone number", patient_phone_error), ("Agent's phone number", agent_phone_error)):
+                    if error is not None:
+                        st.error(f"❌ {label}: {error}")
             else:
                 st.info("Please enter both your phone number and the agent's phone number to generate the WhatsApp link.")
     
     with col2:
         if st.button("🚗 Request Transportation", use_container_width=True):
             st.session_state.show_transportation = True
-    
-    # Transportation Section
+
+    with col3:
+        if st.button("📅 Schedule Appointment", use_container_width=True):
+            st.session_state.show_scheduling = True
+
+@timed_section("patient.transportation")
+def render_transportation():
+    """Nearby centers, ride estimates and Uber booking"""
     if st.session_state.get('show_transportation', False):
         st.markdown("### 🚗 Transportation Assistance")
-        
+    
         # Starting address input
         st.markdown("**Enter your starting address:**")
         starting_address = st.text_input(
@@ -702,112 +487,100 @@ def show_patient_dashboard(user_context):
             placeholder="e.g., 123 Main St, Palo Alto, CA 94301",
             key="starting_address"
         )
-        
+    
         if starting_address:
-            # Simulate AI finding nearby infusion centers
-            st.markdown("**🤖 AI is finding nearby infusion centers...**")
-            
-            # Simulated infusion centers (in a real app, this would use geocoding APIs)
+            located = locate(starting_address)
+            if located is None:
+                st.warning("📍 We couldn't place that address, so these centers are near your home city. Adding a ZIP code helps.")
+                located = locate(PATIENT_CONTEXT["location"])
+            else:
+                st.caption(f"📍 Pickup located by {PRECISION_LABELS[located.precision]}")
+                if located.precision == STREET_APPROX:
+                    st.caption("Your street name didn't match exactly, so the closest spelling was used. Please check the address.")
+            pickup = located.point
+        
+            col_when, col_sort, col_return = st.columns(3)
+            with col_when:
+                ride_hour = st.selectbox("Pick-up time", RIDE_HOURS, format_func=format_ride_hour, key="ride_hour")
+            with col_sort:
+                center_sort = st.selectbox("Sort centers by", list(CENTER_SORT_LABELS), format_func=CENTER_SORT_LABELS.get, key="center_sort")
+            with col_return:
+                round_trip = st.checkbox("Include ride home", key="ride_round_trip")
+            hour = datetime.now().hour if ride_hour is None else ride_hour
+        
+            nearest = get_center_index().nearest(*pickup, k=NEARBY_CENTER_COUNT)
+            estimates = get_ride_estimator().estimate(*pickup, [center for center, _ in nearest], hour)
             nearby_centers = [
-                {
-                    "name": "Palo Alto Infusion Center",
-                    "address": "456 University Ave, Palo Alto, CA 94301",
-                    "distance": "2.3 miles",
-                    "rating": "4.8",
-                    "phone": "(650) 123-4567",
-                    "hours": "Mon-Fri 8AM-6PM"
-                },
-                {
-                    "name": "Stanford Medical Center",
-                    "address": "300 Pasteur Dr, Stanford, CA 94305",
-                    "distance": "3.1 miles", 
-                    "rating": "4.9",
-                    "phone": "(650) 723-4000",
-                    "hours": "Mon-Fri 7AM-7PM"
-                },
-                {
-                    "name": "Mountain View Infusion Clinic",
-                    "address": "789 Castro St, Mountain View, CA 94041",
-                    "distance": "4.7 miles",
-                    "rating": "4.6",
-                    "phone": "(650) 987-6543",
-                    "hours": "Mon-Fri 9AM-5PM"
-                },
-                {
-                    "name": "Redwood City Medical Center",
-                    "address": "123 Veterans Blvd, Redwood City, CA 94063",
-                    "distance": "6.2 miles",
-                    "rating": "4.7",
-                    "phone": "(650) 555-0123",
-                    "hours": "Mon-Fri 8AM-6PM"
-                }
+                dict(nearest[index][0], distance_miles=nearest[index][1], trip=estimates.trip(index, round_trip=round_trip))
+                for index in estimates.order(center_sort, round_trip=round_trip).tolist()
             ]
-            
+        
             st.markdown("**📍 Nearby Infusion Centers:**")
-            
+        
             # Display centers with selection
             selected_center = None
             for i, center in enumerate(nearby_centers):
                 col_name, col_distance, col_select = st.columns([3, 1, 1])
-                
+            
                 with col_name:
                     st.markdown(f"""
                     <div style="background: #f8f9fa; padding: 1rem; border-radius: 8px; margin: 0.5rem 0; border-left: 4px solid #0066cc;">
                         <strong>{center['name']}</strong><br>
-                        <small style="color: #666;">{center['address']}</small><br>
-                        <small style="color: #666;">⭐ {center['rating']} • 📞 {center['phone']}</small><br>
-                        <small style="color: #666;">🕒 {center['hours']}</small>
+                        <small style="color: #666;">{center.get('address', '')}</small><br>
+                        <small style="color: #666;">⭐ {center.get('rating') or 'Not rated'} • 📞 {center.get('phone') or 'No phone listed'}</small><br>
+                        <small style="color: #666;">🕒 {center.get('hours') or 'Call for hours'}</small>
                     </div>
                     """, unsafe_allow_html=True)
-                
+            
                 with col_distance:
-                    st.markdown(f"**{center['distance']}**")
-                
+                    minutes, fare = center['trip']
+                    st.markdown(f"**{center['distance_miles']:.1f} miles**  \n~{minutes:.0f} min • ${fare:.2f}")
+            
                 with col_select:
                     if st.button(f"Select", key=f"select_center_{i}"):
                         selected_center = center
                         st.session_state.selected_center = center
                         st.success(f"✅ Selected: {center['name']}")
-            
+        
             # Uber booking section
             if selected_center or 'selected_center' in st.session_state:
                 center = selected_center or st.session_state.selected_center
-                
+                # The stored selection keeps the distance from the pickup it was chosen for
+                center = dict(center, distance_miles=distance_miles(*pickup, center))
+            
                 st.markdown("---")
                 st.markdown(f"### 🚗 Book Uber Ride to {center['name']}")
-                
+            
                 col_from, col_to = st.columns(2)
-                
+            
                 with col_from:
                     st.markdown(f"**From:** {starting_address}")
-                
+            
                 with col_to:
-                    st.markdown(f"**To:** {center['address']}")
-                
-                # Trip details
-                st.markdown("**Trip Details:**")
+                    st.markdown(f"**To:** {center.get('address') or center['name']}")
+            
+                # Trip details for every tier, from the cached estimate for this pickup
+                trip = get_ride_estimator().estimate(*pickup, [center], hour)
+                tier_trips = {tier: trip.trip(0, tier, round_trip) for tier in RIDE_TIERS}
+                st.markdown(f"**Trip Details ({format_ride_hour(ride_hour)}{', round trip' if round_trip else ''}):**")
                 col_distance, col_time, col_price = st.columns(3)
-                
+            
                 with col_distance:
-                    st.metric("Distance", center['distance'])
-                
+                    st.metric("Distance", f"{center['distance_miles']:.1f} miles")
+            
                 with col_time:
-                    # Simulate estimated time based on distance
-                    estimated_time = "8-12 min" if float(center['distance'].split()[0]) < 3 else "12-18 min"
-                    st.metric("Est. Time", estimated_time)
-                
+                    st.metric("Est. Time", f"{tier_trips['UberX'][0]:.0f} min")
+            
                 with col_price:
-                    # Simulate price estimation
-                    base_price = 8.50 if float(center['distance'].split()[0]) < 3 else 12.75
-                    st.metric("Est. Price", f"${base_price:.2f}")
-                
+                    st.metric("Est. Price", f"${tier_trips['UberX'][1]:.2f}")
+            
                 # Uber booking options
                 st.markdown("**Choose Uber Service:**")
                 col_uberx, col_comfort, col_xl = st.columns(3)
-                
+            
                 with col_uberx:
-                    if st.button("🚗 UberX", use_container_width=True):
-                        uber_url = f"https://m.uber.com/ul/?action=setPickup&pickup[latitude]=37.4419&pickup[longitude]=-122.1430&dropoff[latitude]=37.4419&dropoff[longitude]=-122.1430&dropoff[nickname]={center['name']}"
+                    if st.button(f"🚗 UberX • ${tier_trips['UberX'][1]:.2f}", use_container_width=True):
+                        uber_url = f"https://m.uber.com/ul/?action=setPickup&pickup[latitude]={pickup[0]}&pickup[longitude]={pickup[1]}&dropoff[latitude]={center['lat']}&dropoff[longitude]={center['lon']}&dropoff[nickname]={urllib.parse.quote(center['name'])}"
                         st.markdown(f"""
                         <div style="text-align: center; margin: 15px 0;">
                             <a href="{uber_url}" target="_blank" style="
@@ -825,68 +598,89 @@ def show_patient_dashboard(user_context):
                         </div>
                         """, unsafe_allow_html=True)
                         st.success("✅ UberX ride requested! The Uber app will open with your trip details.")
-                
+            
                 with col_comfort:
-                    if st.button("🚙 Uber Comfort", use_container_width=True):
+                    if st.button(f"🚙 Uber Comfort • ${tier_trips['Comfort'][1]:.2f}", use_container_width=True):
                         st.info("💡 Uber Comfort provides newer cars with extra legroom - perfect for medical appointments!")
-                
+            
                 with col_xl:
-                    if st.button("🚐 UberXL", use_container_width=True):
+                    if st.button(f"🚐 UberXL • ${tier_trips['XL'][1]:.2f}", use_container_width=True):
                         st.info("💡 UberXL offers larger vehicles - ideal if you need assistance or extra space!")
-                
+            
                 # Additional options
                 st.markdown("**Additional Options:**")
                 col_schedule, col_roundtrip = st.columns(2)
-                
+            
                 with col_schedule:
                     if st.button("📅 Schedule for Later", use_container_width=True):
-                        st.info("💡 Schedule your ride for a specific time - great for planned appointments!")
-                
+                        st.info("💡 Choose a pick-up time above to see prices for a planned ride - great for planned appointments!")
+            
                 with col_roundtrip:
                     if st.button("🔄 Round Trip", use_container_width=True):
-                        st.info("💡 Book a round trip to ensure you have a ride home after your infusion!")
-                
+                        _, return_fare = trip.trip(0, round_trip=True)
+                        st.info(f"💡 Book a round trip to ensure you have a ride home after your infusion! UberX both ways: about ${return_fare:.2f}")
+            
                 # Reset selection
                 if st.button("🔄 Choose Different Center"):
                     if 'selected_center' in st.session_state:
                         del st.session_state.selected_center
                     st.rerun()
-        
+    
         else:
             st.info("📍 Please enter your starting address to find nearby infusion centers.")
-    
-    with col3:
-        if st.button("📅 Schedule Appointment", use_container_width=True):
-            st.session_state.show_scheduling = True
-    
-    # Scheduling Section
+
+@timed_section("patient.scheduling")
+def render_scheduling(user_context):
+    """The patient's infusion appointments and schedule changes"""
     if st.session_state.get('show_scheduling', False):
         st.markdown("### 📅 Infusion Scheduling")
-        
+    
         # Initialize appointments if not exists
-        if 'appointments' not in st.session_state:
-            st.session_state.appointments = generate_appointments()
-        
-        st.markdown("**Your Next 6 Infusion Appointments (Every 28 Days):**")
-        
+        if 'appointment_bookings' not in st.session_state:
+            try:
+                load_appointments(user_context["patientId"])
+            except SlotUnavailable as e:
+                st.error(f"❌ We couldn't book your infusions: {e}")
+                return
+        bookings = st.session_state.appointment_bookings
+
+        # Infusion center, with its next open chair
+        center_names = [center["name"] for center in INFUSION_CENTERS]
+        current_center = bookings[0].center
+        # A stored center that has left the catalogue shows the first one instead
+        center_index = center_names.index(current_center) if current_center in center_names else 0
+        center = st.selectbox("Infusion center:", center_names, index=center_index, key="infusion_center")
+        try:
+            next_slot = get_slot_allocator().next_available(center, datetime.now().date())
+        except SlotUnavailable:
+            next_slot = None
+        if next_slot is not None:
+            st.caption(f"Next open chair at {center}: {next_slot.date.item().strftime('%B %d, %Y')} at {next_slot.time_label}")
+        if center != current_center and st.button(f"🏥 Move my infusions to {center}"):
+            try:
+                save_appointments(user_context["patientId"], st.session_state.appointments, center)
+                st.success(f"✅ Your infusions are now booked at {center}.")
+                st.rerun()
+            except SlotUnavailable as e:
+                st.error(f"❌ {e}")
+    
+        st.markdown(f"**Your Next 6 Infusion Appointments (Every 28 Days) at {current_center}:**")
+    
         # Display appointments with edit capability
-        for i, appointment in enumerate(st.session_state.appointments):
+        for i, booking in enumerate(bookings):
+            appointment = booking.date.item()
             col_date, col_edit, col_status = st.columns([3, 1, 1])
-            
+        
             with col_date:
-                try:
-                    appointment_dt = datetime.strptime(appointment, "%Y-%m-%d")
-                    st.write(f"**Appointment {i+1}:** {appointment_dt.strftime('%B %d, %Y')} ({appointment_dt.strftime('%A')})")
-                except ValueError:
-                    st.write(f"**Appointment {i+1}:** {appointment} (Invalid Date)")
-            
+                st.write(f"**Appointment {i+1}:** {appointment.strftime('%B %d, %Y')} ({appointment.strftime('%A')}) at {booking.time_label}")
+        
             with col_edit:
                 if st.button("✏️", key=f"edit_{i}", help="Edit this appointment"):
                     try:
                         st.session_state.edit_appointment = int(i)
                     except (ValueError, TypeError):
                         st.session_state.edit_appointment = 0
-            
+        
             with col_status:
                 if i == 0:
                     st.success("Next")
@@ -894,23 +688,16 @@ def show_patient_dashboard(user_context):
                     st.info("Upcoming")
                 else:
                     st.write("Scheduled")
-        
+    
         # Edit appointment modal
         if 'edit_appointment' in st.session_state and st.session_state.edit_appointment is not None:
             try:
                 appointment_index = int(st.session_state.edit_appointment)
                 st.markdown("---")
                 st.markdown(f"### ✏️ Edit Appointment {appointment_index + 1}")
-                
+            
                 if appointment_index < len(st.session_state.appointments):
-                    current_date = st.session_state.appointments[appointment_index]
-                    
-                    try:
-                        current_date_obj = datetime.strptime(current_date, "%Y-%m-%d").date()
-                    except ValueError:
-                        # Fallback to a default date if current date is invalid
-                        current_date_obj = datetime(2025, 10, 25).date()
-                        st.warning(f"⚠️ Invalid date format found: {current_date}. Using default date.")
+                    current_date_obj = st.session_state.appointments[appointment_index].item()
                 else:
                     st.error("❌ Invalid appointment index. Please try again.")
                     st.session_state.edit_appointment = None
@@ -921,242 +708,303 @@ def show_patient_dashboard(user_context):
                 st.session_state.edit_appointment = None
                 st.rerun()
                 return
-            
+        
             new_date = st.date_input(
                 "Select new date:",
                 value=current_date_obj,
                 key=f"new_date_{appointment_index}",
                 help="Select any date. Appointments will adjust to maintain 28-day intervals."
             )
-            
+        
             col_save, col_cancel = st.columns(2)
             with col_save:
                 if st.button("💾 Save Changes", key="save_appointment"):
                     try:
-                        # Calculate new start date
-                        new_start = new_date
-                        new_appointments = []
-                        for i in range(6):
-                            appointment_date = new_start + timedelta(days=28 * i)
-                            new_appointments.append(appointment_date.strftime("%Y-%m-%d"))
-                        
-                        st.session_state.appointments = new_appointments
+                        save_appointments(user_context["patientId"], appointment_series(new_date), current_center)
                         st.session_state.edit_appointment = None
                         st.success("✅ Appointments updated! All future appointments adjusted to maintain 28-day intervals.")
                         st.rerun()
                     except Exception as e:
                         st.error(f"❌ Error updating appointments: {str(e)}")
                         st.info("Please try again or contact support if the issue persists.")
-            
+        
             with col_cancel:
                 if st.button("❌ Cancel", key="cancel_appointment"):
                     st.session_state.edit_appointment = None
                     st.rerun()
-        
+    
         # Custom date selection for extended intervals
         st.markdown("---")
         st.markdown("### 📅 Custom Date Selection")
         st.markdown("**Need to schedule an appointment more than 28 days apart?**")
-        
-        # Safe date calculation for custom date input
-        try:
-            if 'appointments' in st.session_state and st.session_state.appointments:
-                last_appointment = datetime.strptime(st.session_state.appointments[-1], "%Y-%m-%d").date()
-                default_custom_date = last_appointment + timedelta(days=28)
-            else:
-                # Fallback to a default date if appointments not initialized
-                default_custom_date = datetime(2025, 10, 25).date() + timedelta(days=28)
-        except (ValueError, KeyError, IndexError):
-            # Additional fallback in case of any date parsing issues
-            default_custom_date = datetime(2025, 11, 22).date()
-        
+    
+        # Default to one interval after the last scheduled infusion
+        default_custom_date = (st.session_state.appointments[-1] + INFUSION_INTERVAL_DAYS).item()
+    
         custom_date = st.date_input(
             "Select custom date:",
             value=default_custom_date,
             key="custom_date",
             help="This will create a new appointment at your selected date, and subsequent appointments will be 28 days from this date."
         )
-        
+    
         if st.button("📅 Schedule Custom Appointment"):
             try:
                 # Ensure appointments are initialized
-                if 'appointments' not in st.session_state:
-                    st.session_state.appointments = generate_appointments()
-                
-                # Add custom appointment and regenerate future ones
-                custom_appointments = []
-                for app in st.session_state.appointments:
-                    try:
-                        app_date = datetime.strptime(app, "%Y-%m-%d").date()
-                        if app_date < custom_date:
-                            custom_appointments.append(app)
-                    except ValueError:
-                        # Skip invalid dates
-                        continue
-                
-                custom_appointments.append(custom_date.strftime("%Y-%m-%d"))
-                
-                # Generate remaining appointments from custom date
-                remaining_count = 6 - len(custom_appointments)
-                for i in range(remaining_count):
-                    next_date = custom_date + timedelta(days=28 * (i + 1))
-                    custom_appointments.append(next_date.strftime("%Y-%m-%d"))
-                
-                st.session_state.appointments = custom_appointments[:6]
+                if 'appointment_bookings' not in st.session_state:
+                    load_appointments(user_context["patientId"])
+            
+                # Keep earlier appointments and continue the series from the custom date
+                save_appointments(user_context["patientId"], reschedule_series(st.session_state.appointments, custom_date), current_center)
                 st.success(f"✅ Custom appointment scheduled for {custom_date.strftime('%B %d, %Y')}! Future appointments adjusted.")
                 st.rerun()
-                
+            
             except Exception as e:
                 st.error(f"❌ Error scheduling appointment: {str(e)}")
                 st.info("Please try again or contact support if the issue persists.")
-        
+    
         # Reset appointments button
         if st.button("🔄 Reset to Default Schedule"):
-            st.session_state.appointments = generate_appointments()
-            st.success("✅ Appointments reset to default 28-day schedule starting October 25, 2025.")
-            st.rerun()
+            try:
+                save_appointments(user_context["patientId"], appointment_series(), current_center)
+                st.success(f"✅ Appointments reset to the default 28-day schedule from {format_infusion_date(st.session_state.appointments[0])}.")
+                st.rerun()
+            except SlotUnavailable as e:
+                st.error(f"❌ {e}")
+
+def record_prior_auth(patient_id):
+    """Log an agent's prior authorization update from the queue selector, including a reset to "Not started" (None)"""
+    record_event(PRIOR_AUTH, patient_id, status=st.session_state[f"prior_auth_{patient_id}"])
+
+def render_queue_patient(info):
+    """Detail widgets for the one patient an agent has opened in the queue"""
+    patient = info['name']
+    patient_id = info['patient_id']
+    st.markdown(f"#### 👤 {patient} - {info['status']}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**Next Appointment:** {format_display_date(info['next_appointment'])}")
+        st.write(f"**Last Contact:** {format_display_date(info['last_contact'])}")
+    with col2:
+        st.write(f"**Key Concerns:** {', '.join(info['concerns'])}")
+        current_status = prior_auth_status(patient_id)
+        auth_options = [None] + list(PRIOR_AUTH_STATUSES)
+        st.selectbox(
+            "Prior authorization",
+            auth_options,
+            index=auth_options.index(current_status) if current_status in auth_options else 0,
+            format_func=lambda status: "Not started" if status is None else status.capitalize(),
+            key=f"prior_auth_{patient_id}",
+            on_change=record_prior_auth,
+            args=(patient_id,),
+        )
+
+    # WhatsApp contact button
+    st.markdown("---")
+    col_btn1, col_btn2 = st.columns(2)
+    with col_btn1:
+        if st.button(f"📞 Contact {patient.split()[0]}", key=f"contact_{patient_id}"):
+            st.session_state[f'show_agent_whatsapp_{patient_id}'] = True
+            get_patient_repository().record_contact(patient_id)
+            record_event(CONTACT, patient_id, initiated_by="agent")
+
+    if st.session_state.get(f'show_agent_whatsapp_{patient_id}', False):
+        phone_input = st.text_input(f"Enter {patient}'s phone number:", key=f"phone_{patient_id}", placeholder="+1 555 123-4567")
+        phone_number, phone_error = parse_phone(phone_input)
+        if phone_number:
+            # Create WhatsApp message
+            message = f"Hi {patient.split()[0]}! This is Cindy from Biogen Patient Services. I'm calling to check on your Tysabri treatment. How are you feeling today? We're here to support you every step of the way! 💙"
+            encoded_message = urllib.parse.quote(message)
+            whatsapp_url = f"https://wa.me/{phone_number.lstrip('+')}?text={encoded_message}"
+
+            st.markdown(f"""
+            <div style="text-align: center; margin: 10px 0;">
+                <a href="{whatsapp_url}" target="_blank" style="
+                    background: linear-gradient(135deg, #25D366 0%, #128C7E 100%);
+                    color: white;
+                    padding: 10px 20px;
+                    text-decoration: none;
+                    border-radius: 20px;
+                    font-weight: 600;
+                    display: inline-block;
+                    box-shadow: 0 4px 12px rgba(37, 211, 102, 0.3);
+                    font-size: 14px;
+                ">
+                    💬 Open WhatsApp Chat
+                </a>
+            </div>
+            """, unsafe_allow_html=True)
+
+            st.success("✅ WhatsApp link generated! Click the button above to start chatting.")
+            st.info(f"📱 This will open WhatsApp and send a message to {patient}")
+        elif phone_input:
+            st.error(f"❌ Please enter a valid phone number: {phone_error}")
+        else:
+            st.info("Please enter the patient's phone number to generate the WhatsApp link.")
+
+    with col_btn2:
+        if st.button(f"📋 View Details", key=f"details_{patient_id}"):
+            st.info(f"Detailed patient information for {patient} would be displayed here in a real system.")
 
 def show_agent_dashboard(user_context):
     """Display agent dashboard"""
     
+    repository = get_patient_repository()
+    # One snapshot, so the welcome card and the metric cards agree
+    metrics = dashboard_snapshot()
+
     # Welcome Section
+    render_agent_welcome(user_context, metrics)
+    
+    # Metrics
+    render_dashboard_metrics(metrics)
+    
+    # Patient Queue
+    render_patient_queue(repository)
+    
+    # AI Testing Section
+    render_ai_testing()
+
+@timed_section("agent.welcome")
+def render_agent_welcome(user_context, metrics):
+    """Greeting card with the agent's caseload"""
     st.markdown(f"""
     <div class="agent-card">
         <h2>Welcome back, {user_context['name'].split(' ')[0]}!</h2>
         <p><strong>Department:</strong> {user_context['department']} • <strong>Experience:</strong> {user_context['experience']}</p>
-        <p>You have <strong>3 active patients</strong> today. AI is handling routine questions while you focus on complex cases.</p>
+        <p>You have <strong>{metrics['active_patients']} active patients</strong> today. AI is handling routine questions while you focus on complex cases.</p>
     </div>
     """, unsafe_allow_html=True)
-    
-    # Metrics
+
+@timed_section("agent.metrics")
+def render_dashboard_metrics(metrics):
+    """Headline cards from the dashboard event stream"""
     st.markdown("### 📊 Dashboard Metrics")
     
+    satisfaction = "—" if metrics['satisfaction'] is None else f"{metrics['satisfaction']:.0%}"
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
-            <h3 style="color: #0066cc; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">12</h3>
+            <h3 style="color: #0066cc; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">{metrics['active_patients']}</h3>
             <p style="color: #666; font-weight: 500; margin: 0; font-size: 1rem;">Active Patients</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
-            <h3 style="color: #4a7c4a; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">8</h3>
+            <h3 style="color: #4a7c4a; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">{metrics['calls_today']}</h3>
             <p style="color: #666; font-weight: 500; margin: 0; font-size: 1rem;">Calls Today</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
-            <h3 style="color: #ff6b35; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">2</h3>
+            <h3 style="color: #ff6b35; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">{metrics['pending_prior_auths']}</h3>
             <p style="color: #666; font-weight: 500; margin: 0; font-size: 1rem;">Pending Prior Auths</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
-            <h3 style="color: #28a745; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">92%</h3>
+            <h3 style="color: #28a745; font-size: 2.5rem; font-weight: 700; margin-bottom: 0.5rem;">{satisfaction}</h3>
             <p style="color: #666; font-weight: 500; margin: 0; font-size: 1rem;">Satisfaction Score</p>
         </div>
         """, unsafe_allow_html=True)
-    
-    # Patient Queue
+
+@timed_section("agent.queue")
+def render_patient_queue(repository):
+    """Filtered, paged patient queue with the opened patient's details"""
     st.markdown("### 👥 Active Patients")
     
-    patient_data = {
-        "Sarah Parker": {
-            "status": "High Priority",
-            "next_appointment": "Oct 25, 2025",
-            "last_contact": "Oct 21, 2025",
-            "concerns": ["New diagnosis anxiety", "Treatment expectations"]
-        },
-        "John Smith": {
-            "status": "Medium Priority", 
-            "next_appointment": "Nov 15, 2025",
-            "last_contact": "Oct 20, 2025",
-            "concerns": ["Insurance coverage", "Side effects"]
-        },
-        "Maria Garcia": {
-            "status": "Low Priority",
-            "next_appointment": "Nov 22, 2025", 
-            "last_contact": "Oct 19, 2025",
-            "concerns": ["Transportation", "Work accommodations"]
-        }
-    }
-    
-    for patient, info in patient_data.items():
-        with st.expander(f"👤 {patient} - {info['status']}"):
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write(f"**Next Appointment:** {info['next_appointment']}")
-                st.write(f"**Last Contact:** {info['last_contact']}")
-            with col2:
-                st.write(f"**Key Concerns:** {', '.join(info['concerns'])}")
-            
-            # WhatsApp contact button
-            st.markdown("---")
-            col_btn1, col_btn2 = st.columns(2)
-            with col_btn1:
-                if st.button(f"📞 Contact {patient.split()[0]}", key=f"contact_{patient}"):
-                    st.session_state[f'show_agent_whatsapp_{patient}'] = True
-            
-            if st.session_state.get(f'show_agent_whatsapp_{patient}', False):
-                phone_input = st.text_input(f"Enter {patient}'s phone number:", key=f"phone_{patient}", placeholder="+1 555 123-4567")
-                if phone_input and len(phone_input.replace('+', '').replace('-', '').replace(' ', '')) >= 10:
-                    # Clean phone number
-                    clean_phone = phone_input.replace('+', '').replace('-', '').replace(' ', '')
-                    if not clean_phone.startswith('1') and len(clean_phone) == 10:
-                        clean_phone = '1' + clean_phone
-                    
-                    # Create WhatsApp message
-                    message = f"Hi {patient.split()[0]}! This is Cindy from Biogen Patient Services. I'm calling to check on your Tysabri treatment. How are you feeling today? We're here to support you every step of the way! 💙"
-                    encoded_message = urllib.parse.quote(message)
-                    whatsapp_url = f"https://wa.me/{clean_phone}?text={encoded_message}"
-                    
-                    st.markdown(f"""
-                    <div style="text-align: center; margin: 10px 0;">
-                        <a href="{whatsapp_url}" target="_blank" style="
-                            background: linear-gradient(135deg, #25D366 0%, #128C7E 100%);
-                            color: white;
-                            padding: 10px 20px;
-                            text-decoration: none;
-                            border-radius: 20px;
-                            font-weight: 600;
-                            display: inline-block;
-                            box-shadow: 0 4px 12px rgba(37, 211, 102, 0.3);
-                            font-size: 14px;
-                        ">
-                            💬 Open WhatsApp Chat
-                        </a>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.success("✅ WhatsApp link generated! Click the button above to start chatting.")
-                    st.info(f"📱 This will open WhatsApp and send a message to {patient}")
-                elif phone_input:
-                    st.error("❌ Please enter a valid phone number (at least 10 digits)")
-                else:
-                    st.info("Please enter the patient's phone number to generate the WhatsApp link.")
-            
-            with col_btn2:
-                if st.button(f"📋 View Details", key=f"details_{patient}"):
-                    st.info(f"Detailed patient information for {patient} would be displayed here in a real system.")
-    
-    # AI Testing Section
+    status_col, sort_col, search_col = st.columns(3)
+    with status_col:
+        priority = st.selectbox("Status", [None] + list(PRIORITY_LABELS), format_func=lambda level: "All" if level is None else PRIORITY_LABELS[level], key="queue_status")
+    with sort_col:
+        sort_key = st.selectbox("Sort by", list(QUEUE_SORT_LABELS), format_func=QUEUE_SORT_LABELS.get, key="queue_sort")
+    with search_col:
+        name_filter = st.text_input("Search by name", key="queue_search").strip()
+
+    # Start from the first page whenever the filters change
+    filters = (priority, sort_key, name_filter)
+    if st.session_state.get('queue_filters') != filters:
+        st.session_state.queue_filters = filters
+        st.session_state.queue_page = 0
+    page = st.session_state.get('queue_page', 0)
+
+    query = dict(priority=priority, name_contains=name_filter or None, sort=sort_key, limit=AGENT_QUEUE_PAGE_SIZE)
+    patients, total = repository.query_patients(offset=page * AGENT_QUEUE_PAGE_SIZE, **query)
+    if not patients and page > 0:
+        # The queue shrank under the stored page: show the last page instead
+        page = max(total - 1, 0) // AGENT_QUEUE_PAGE_SIZE
+        st.session_state.queue_page = page
+        patients, total = repository.query_patients(offset=page * AGENT_QUEUE_PAGE_SIZE, **query)
+
+    if not patients:
+        st.info("No patients match these filters.")
+    else:
+        # The whole page is one element; only the opened patient gets widgets
+        rows = "".join(
+            f"<tr><td>{html.escape(info['name'])}</td><td>{info['status']}</td>"
+            f"<td>{format_display_date(info['next_appointment'])}</td>"
+            f"<td>{format_display_date(info['last_contact'])}</td>"
+            f"<td>{html.escape(', '.join(info['concerns']))}</td></tr>"
+            for info in patients
+        )
+        st.markdown(f"""
+        <table style="width: 100%;">
+            <tr><th>Patient</th><th>Status</th><th>Next Appointment</th><th>Last Contact</th><th>Key Concerns</th></tr>
+            {rows}
+        </table>
+        """, unsafe_allow_html=True)
+
+        page_count = (total + AGENT_QUEUE_PAGE_SIZE - 1) // AGENT_QUEUE_PAGE_SIZE
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("⬅️ Previous", key="queue_prev", disabled=page == 0):
+                st.session_state.queue_page = page - 1
+                st.rerun()
+        with col_page:
+            first = page * AGENT_QUEUE_PAGE_SIZE + 1
+            st.caption(f"Showing {first}-{first + len(patients) - 1} of {total} patients • page {page + 1} of {page_count}")
+        with col_next:
+            if st.button("Next ➡️", key="queue_next", disabled=page + 1 >= page_count):
+                st.session_state.queue_page = page + 1
+                st.rerun()
+
+        patients_by_id = {info['patient_id']: info for info in patients}
+        opened = st.selectbox(
+            "Open patient",
+            [None] + list(patients_by_id),
+            format_func=lambda patient_id: "Select a patient..." if patient_id is None else patients_by_id[patient_id]['name'],
+            key=f"queue_open_{page}",
+        )
+        if opened is not None:
+            render_queue_patient(patients_by_id[opened])
+
+@timed_section("agent.ai_testing")
+def render_ai_testing():
+    """Cache stats, quick tests and scenario set runs"""
     st.markdown("### 🤖 AI Testing & Support")
     
     # Test different scenarios
-    test_scenarios = [
-        "Tell me about Tysabri side effects",
-        "I'm feeling anxious about my treatment",
-        "Can you help with transportation?",
-        "When is my next appointment?"
-    ]
+    test_scenarios = TEST_SCENARIOS
+    
+    cache_stats = get_response_cache().stats()
+    cache_caption = f"Response cache: {cache_stats['hits']} hits • {cache_stats['misses']} misses • {cache_stats['hit_rate']:.0%} hit rate"
+    semantic_stats = cache_stats.get("semantic")
+    if semantic_stats and semantic_stats["mean_similarity"] is not None:
+        cache_caption += (
+            f" • {cache_stats['semantic_hits']} paraphrase hits"
+            f" (similarity {semantic_stats['mean_similarity']:.2f} mean, {semantic_stats['min_similarity']:.2f} min)"
+        )
+    st.caption(cache_caption)
+    if 'last_prompt_tokens' in st.session_state:
+        st.caption(f"Last prompt: {st.session_state.last_prompt_tokens} input tokens")
     
     st.markdown("**Quick Test Scenarios:**")
     for scenario in test_scenarios:
@@ -1165,5 +1013,54 @@ def show_agent_dashboard(user_context):
                 response = generate_ai_response(scenario, PATIENT_CONTEXT)
             st.success(f"**Response:** {response}")
 
+    # Run a whole scenario set concurrently to regression-test prompt changes
+    st.markdown("**Run a Scenario Set:**")
+    uploaded = st.file_uploader(
+        "Upload scenarios (.txt one per line, .json list, or .jsonl with a \"message\" field)",
+        type=["txt", "json", "jsonl"],
+        key="scenario_file",
+    )
+    scenario_set = test_scenarios
+    if uploaded is not None:
+        try:
+            scenario_set = parse_scenarios(uploaded.getvalue().decode("utf-8"), uploaded.name)
+            st.caption(f"{len(scenario_set)} scenarios loaded from {uploaded.name}")
+        except (ValueError, TypeError, UnicodeDecodeError) as e:
+            st.error(f"❌ Could not read {uploaded.name}: {e}")
+            scenario_set = []
+
+    bypass_answers = st.checkbox("Send every scenario to the model (skip FAQ and cached answers)", key="scenario_bypass")
+    if st.button(f"▶️ Run All ({len(scenario_set)} scenarios)", key="run_all_scenarios", disabled=not scenario_set):
+        with st.spinner("Running scenarios..."):
+            started = time.perf_counter()
+            results = answer_many(scenario_set, PATIENT_CONTEXT, init_openai(), use_cache=not bypass_answers, use_faq=not bypass_answers)
+            st.session_state.scenario_run = {
+                "elapsed": time.perf_counter() - started,
+                "rows": [
+                    {
+                        "Scenario": scenario,
+                        "Backend": result.backend,
+                        "Latency (ms)": round(result.latency * 1000),
+                        "Prompt tokens": result.prompt_tokens,
+                        "Completion tokens": result.completion_tokens,
+                        "Response": result.text,
+                        "Note": result.error or "",
+                    }
+                    for scenario, result in zip(scenario_set, results)
+                ],
+            }
+
+    if 'scenario_run' in st.session_state:
+        run = st.session_state.scenario_run
+        backends = {}
+        for row in run['rows']:
+            backends[row['Backend']] = backends.get(row['Backend'], 0) + 1
+        answered_by = ", ".join(f"{count} by {backend}" for backend, count in sorted(backends.items()))
+        st.caption(f"Ran {len(run['rows'])} scenarios in {run['elapsed']:.1f}s • answered {answered_by}")
+        st.dataframe(run['rows'], use_container_width=True, hide_index=True)
+
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        end_rerun()
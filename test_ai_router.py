@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for provider ranking, failover and the resilience primitives
+"""
+
+import pytest
+
+from ai_router import PRIOR_LATENCY_SECONDS, Provider, ProviderRouter, ProvidersFailed, ProviderStats
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProvider(Provider):
+    def __init__(self, name, reply=None, error=None):
+        self.name = name
+        self.reply = reply or f"{name} answer"
+        self.error = error
+        self.calls = 0
+
+    def service(self):
+        return self
+
+    def complete(self, messages, **params):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.reply
+
+
+def make_router(*providers, **options):
+    return ProviderRouter(providers={provider.name: provider for provider in providers}, **options)
+
+
+def test_fastest_provider_goes_first_unless_another_is_preferred():
+    router = make_router(FakeProvider("slow"), FakeProvider("fast"))
+    for _ in range(3):
+        router.record("slow", 4.0, True)
+        router.record("fast", 0.5, True)
+    assert [provider.name for provider in router.ranked()] == ["fast", "slow"]
+    assert [provider.name for provider in router.ranked(prefer="slow")] == ["slow", "fast"]
+
+
+def test_complete_fails_over_to_the_next_provider():
+    broken = FakeProvider("broken", error=ValueError("down"))
+    backup = FakeProvider("backup")
+    router = make_router(broken, backup)
+    assert router.complete([], prefer="broken") == ("backup", "backup answer")
+    assert (broken.calls, backup.calls) == (1, 1)
+    assert router.stats()["broken"]["error_rate"] == 1.0
+
+
+def test_every_provider_failing_raises():
+    router = make_router(FakeProvider("first", error=ValueError("down")), FakeProvider("second", error=ValueError("busy")))
+    with pytest.raises(ProvidersFailed, match="first: down; second: busy"):
+        router.complete([])
+    with pytest.raises(ProvidersFailed, match="no AI provider"):
+        make_router().complete([])
+
+
+def test_provider_requires_service():
+    class Incomplete(Provider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_unsampled_provider_gets_a_neutral_prior():
+    assert ProviderStats().expected_latency == pytest.approx(PRIOR_LATENCY_SECONDS)
+    router = make_router(FakeProvider("fast"), FakeProvider("new"), FakeProvider("slow"))
+    for _ in range(5):
+        router.record("fast", 0.5, True)
+        router.record("slow", 6.0, True)
+    assert [provider.name for provider in router.ranked()] == ["fast", "new", "slow"]
+
+
+def test_error_rate_weighs_against_a_fast_provider():
+    router = make_router(FakeProvider("flaky"), FakeProvider("steady"))
+    for _ in range(4):
+        router.record("flaky", 0.4, True)
+        router.record("flaky", 0.1, False)
+        router.record("flaky", 0.1, False)
+        router.record("steady", 1.0, True)
+    # Without weighting the flaky provider's 0.4s mean would win
+    assert [provider.name for provider in router.ranked()] == ["steady", "flaky"]
+
+
+def test_provider_that_only_failed_ranks_last():
+    router = make_router(FakeProvider("broken"), FakeProvider("new"))
+    router.record("broken", 0.01, False)
+    assert [provider.name for provider in router.ranked()] == ["new", "broken"]
+
+
+def test_preferred_provider_goes_first_and_open_circuits_last():
+    router = make_router(FakeProvider("first"), FakeProvider("second"), FakeProvider("third"), failure_threshold=1)
+    router.breaker("first").record_failure()
+    assert [provider.name for provider in router.ranked(prefer="third")] == ["third", "second", "first"]
+
+
+def test_fails_over_and_rejects_once_every_circuit_is_open():
+    broken = FakeProvider("broken", error=ValueError("bad request"))
+    backup = FakeProvider("backup")
+    router = make_router(broken, backup, failure_threshold=1)
+    assert router.complete([], prefer="broken") == ("backup", "backup answer")
+    assert router.breaker("broken").state == OPEN
+
+    backup.error = ValueError("down")
+    with pytest.raises(ProvidersFailed):
+        router.complete([])
+    calls = broken.calls + backup.calls
+    with pytest.raises(ProvidersFailed, match="circuit open"):
+        router.complete([])
+    assert broken.calls + backup.calls == calls and not router.accepting()
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow()  # one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+
+def test_retry_budget_caps_retries_and_refills():
+    clock = Clock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0.1, window=10, clock=clock)
+    assert budget.withdraw() and not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw() and not budget.withdraw()
+    clock.now = 10
+    assert budget.withdraw()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for request coalescing in the asynchronous AI service
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_client import get_client_settings
+from ai_service import AIService
+from benchmarks.fake_openai_server import DEFAULT_REPLY, start_fake_server
+
+MESSAGES = [{"role": "user", "content": "What is Tysabri?"}]
+
+
+@pytest.fixture
+def server():
+    server = start_fake_server(latency=0.3, token_delay=0.005)
+    yield server
+    server.shutdown()
+
+
+def make_service(server):
+    settings = dict(get_client_settings(), base_url=server.base_url, max_retries=0)
+    return AIService(lambda: ("sk-proj-test", settings), name="ai-service-test")
+
+
+def read_stream(service, messages=MESSAGES):
+    return "".join(service.stream(messages, model="gpt-test"))
+
+
+def test_identical_concurrent_completions_share_one_call(server):
+    service = make_service(server)
+    with ThreadPoolExecutor(4) as pool:
+        replies = list(pool.map(lambda _: service.complete(MESSAGES, model="gpt-test"), range(4)))
+    assert {reply.choices[0].message.content for reply in replies} == {DEFAULT_REPLY}
+    assert server.request_count == 1
+
+
+def test_identical_concurrent_streams_share_one_call(server):
+    service = make_service(server)
+    with ThreadPoolExecutor(4) as pool:
+        replies = list(pool.map(lambda _: read_stream(service), range(4)))
+    assert [reply.strip() for reply in replies] == [DEFAULT_REPLY] * 4
+    assert server.request_count == 1
+
+
+def test_different_streams_are_not_shared(server):
+    service = make_service(server)
+    other = [{"role": "user", "content": "Can I travel?"}]
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda messages: read_stream(service, messages), [MESSAGES, other]))
+    assert server.request_count == 2
+
+
+def test_caller_that_stops_early_leaves_the_stream_to_the_others(server):
+    service = make_service(server)
+    with ThreadPoolExecutor(2) as pool:
+        full = pool.submit(read_stream, service)
+        first = pool.submit(lambda: next(iter(service.stream(MESSAGES, model="gpt-test"))))
+        assert first.result() and full.result().strip() == DEFAULT_REPLY
+    assert server.request_count == 1
+    # Once finished, the same request starts a new call
+    assert read_stream(service).strip() == DEFAULT_REPLY
+    assert server.request_count == 2
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the Streamlit-free answer path
+"""
+
+from types import SimpleNamespace
+
+import assistant
+from ai_router import ProvidersFailed
+from assistant import answer, answer_many, answer_stream
+from reference_data import PATIENT_CONTEXT
+from response_cache import ResponseCache
+
+FAQ_QUESTION = "What is Tysabri?"
+
+
+class FakeRouter:
+    def __init__(self, chunks=("model ", "answer"), error=None):
+        self.calls = 0
+        self.chunks = chunks
+        self.error = error
+
+    def accepting(self):
+        return True
+
+    def complete(self, messages, **params):
+        self.calls += 1
+        message = SimpleNamespace(content="model answer")
+        return "fake", SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    def open_stream(self, messages, **params):
+        self.calls += 1
+        if self.error is not None and not self.chunks:
+            raise self.error
+        return "fake", self._chunks()
+
+    def _chunks(self):
+        yield from self.chunks
+        if self.error is not None:
+            raise self.error
+
+
+def test_faq_answers_without_calling_the_model():
+    router = FakeRouter()
+    result = answer(FAQ_QUESTION, PATIENT_CONTEXT, router, use_cache=False)
+    assert result.backend == "faq" and router.calls == 0
+
+
+def test_use_faq_false_reaches_the_model():
+    router = FakeRouter()
+    result = answer(FAQ_QUESTION, PATIENT_CONTEXT, router, use_cache=False, use_faq=False)
+    assert (result.backend, result.text) == ("fake", "model answer") and router.calls == 1
+
+
+def test_answer_many_passes_use_faq_through():
+    router = FakeRouter()
+    results = answer_many([FAQ_QUESTION, FAQ_QUESTION], PATIENT_CONTEXT, router, max_workers=2, use_cache=False, use_faq=False)
+    assert [result.backend for result in results] == ["fake", "fake"] and router.calls == 2
+
+
+def test_stream_yields_model_chunks_and_caches_the_reply(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(assistant, "get_response_cache", lambda: cache)
+    router = FakeRouter()
+    reply = answer_stream("Can I drive home afterwards?", PATIENT_CONTEXT, router, use_faq=False)
+    assert list(reply) == ["model ", "answer"]
+    assert (reply.result.backend, reply.result.text, reply.result.error) == ("fake", "model answer", None)
+    # The next ask of the same question is served from the cache, streamed or not
+    assert answer("Can I drive home afterwards?", PATIENT_CONTEXT, router, use_faq=False).backend == "cache"
+    assert list(answer_stream("Can I drive home afterwards?", PATIENT_CONTEXT, router, use_faq=False)) == ["model answer"]
+    assert router.calls == 1
+
+
+def test_stream_answers_faq_questions_in_one_chunk():
+    router = FakeRouter()
+    reply = answer_stream(FAQ_QUESTION, PATIENT_CONTEXT, router, use_cache=False)
+    assert len(list(reply)) == 1 and reply.result.backend == "faq" and router.calls == 0
+
+
+def test_stream_falls_back_to_demo_before_any_output():
+    router = FakeRouter(chunks=(), error=ProvidersFailed("fake: timed out"))
+    reply = answer_stream("Can I drive home afterwards?", PATIENT_CONTEXT, router, use_cache=False, use_faq=False)
+    chunks = list(reply)
+    assert reply.result.backend == "demo" and chunks == [reply.result.text]
+    assert reply.result.error == "AI providers unavailable (fake: timed out)" and not reply.result.incomplete
+
+
+def test_stream_keeps_partial_text_and_skips_the_cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(assistant, "get_response_cache", lambda: cache)
+    router = FakeRouter(chunks=("model ",), error=RuntimeError("connection reset"))
+    reply = answer_stream("Can I drive home afterwards?", PATIENT_CONTEXT, router, use_faq=False)
+    assert list(reply) == ["model "]
+    assert reply.result.incomplete and reply.result.text == "model"
+    assert reply.result.error == "AI provider error: connection reset"
+    assert cache.get("Can I drive home afterwards?", PATIENT_CONTEXT) is None
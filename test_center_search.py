@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for loading center catalogues and nearest-center search
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from center_search import CenterIndex, distance_miles, haversine_miles, load_centers, synthetic_centers
+
+
+def test_catalogue_with_only_coordinates_gets_empty_card_fields(tmp_path):
+    path = tmp_path / "centers.csv"
+    path.write_text("name,lat,lon\nNorth,37.45,-122.16\nSouth,37.39,-122.08\n")
+    centers = load_centers(str(path))
+    assert [center["name"] for center in centers] == ["North", "South"]
+    assert all(center[field] == "" for center in centers for field in ("address", "rating", "phone", "hours"))
+    assert isinstance(centers[0]["lat"], float)
+
+
+def test_catalogue_without_coordinates_is_rejected(tmp_path):
+    path = tmp_path / "centers.csv"
+    path.write_text("name,lat,lon\nNorth,37.45,\n")
+    with pytest.raises(ValueError, match="center 1 has no lon"):
+        load_centers(str(path))
+
+
+def test_nearest_distances_match_distance_miles():
+    centers = [{"name": "Near", "lat": 37.45, "lon": -122.16}, {"name": "Far", "lat": 37.78, "lon": -122.42}]
+    nearest = CenterIndex(centers).nearest(37.44, -122.15, k=2)
+    assert [center["name"] for center, _ in nearest] == ["Near", "Far"]
+    for center, miles in nearest:
+        assert miles == pytest.approx(distance_miles(37.44, -122.15, center))
+
+
+def test_haversine_matches_a_known_distance():
+    # One degree of latitude along a meridian is 1/360 of the Earth's circumference
+    miles = haversine_miles(math.radians(37.0), math.radians(-122.0), np.radians([38.0, 37.0]), np.radians([-122.0, -122.0]))
+    assert miles.tolist() == pytest.approx([2 * math.pi * 3958.8 / 360, 0.0])
+
+
+def test_grid_queries_match_a_full_scan():
+    centers = synthetic_centers(2000)
+    index = CenterIndex(centers)
+    lats = np.radians([center["lat"] for center in centers])
+    lons = np.radians([center["lon"] for center in centers])
+    for lat, lon, radius in ((37.4, -122.1, 150), (40.7, -74.0, 60), (47.6, -122.3, 400)):
+        miles = haversine_miles(math.radians(lat), math.radians(lon), lats, lons)
+        expected = sorted(int(i) for i in np.flatnonzero(miles <= radius))
+        found = sorted(centers.index(center) for center, _ in index.within(lat, lon, radius))
+        assert found == expected
+        nearest = index.nearest(lat, lon, k=7)
+        assert [distance for _, distance in nearest] == pytest.approx(sorted(miles.tolist())[:7])
+
+
+def test_nearest_respects_max_miles():
+    centers = [{"name": "Near", "lat": 37.45, "lon": -122.16}, {"name": "Far", "lat": 40.71, "lon": -74.0}]
+    index = CenterIndex(centers)
+    assert [center["name"] for center, _ in index.nearest(37.44, -122.15, k=2, max_miles=100)] == ["Near"]
+    assert len(index.nearest(37.44, -122.15, k=2)) == 2
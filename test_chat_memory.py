@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded patient chat memory
+"""
+
+from chat_memory import SUMMARY_SNIPPET_CHARS, ChatMemory
+from prompts import TOKENS_PER_MESSAGE, count_tokens
+
+
+def conversation(memory, questions):
+    for question in questions:
+        memory.append("user", question)
+        memory.append("assistant", f"Answer to {question}")
+    return memory
+
+
+def cost(text):
+    return count_tokens(text) + TOKENS_PER_MESSAGE
+
+
+def test_ring_buffer_keeps_the_newest_turns():
+    memory = conversation(ChatMemory(max_turns=4), ["one", "two", "three"])
+    assert [turn.content for turn in memory] == ["two", "Answer to two", "three", "Answer to three"]
+    assert len(memory) == 6
+
+
+def test_latest_reads_back_into_the_capped_archive():
+    memory = conversation(ChatMemory(max_turns=2, max_archived=3), ["one", "two", "three"])
+    assert [turn.content for turn in memory.latest(1)] == ["Answer to three"]
+    assert [turn.content for turn in memory.latest(4)] == ["two", "Answer to two", "three", "Answer to three"]
+    # "one" and its answer fell off the end of the archive
+    assert [turn.content for turn in memory.latest(10)] == ["Answer to one", "two", "Answer to two", "three", "Answer to three"]
+    assert len(memory) == 5
+
+
+def test_window_fits_the_budget_and_summarizes_the_rest():
+    memory = conversation(ChatMemory(max_turns=4, max_summary_topics=8), ["one", "two", "three"])
+    budget = cost("three") + cost("Answer to three")
+    summary, messages = memory.context_window(budget)
+    assert messages == [{"role": "user", "content": "three"}, {"role": "assistant", "content": "Answer to three"}]
+    # "one" from the archive, "two" from the buffer but over budget
+    assert summary == "Earlier in this conversation the patient asked about: one; two"
+    assert memory.context_window(10_000) == ("Earlier in this conversation the patient asked about: one",
+                                            [{"role": turn.role, "content": turn.content} for turn in memory])
+
+
+def test_window_never_starts_with_an_orphan_reply():
+    memory = conversation(ChatMemory(), ["a question with quite a few words in it", "short"])
+    budget = cost("Answer to a question with quite a few words in it") + cost("short") + cost("Answer to short")
+    summary, messages = memory.context_window(budget)
+    assert [message["content"] for message in messages] == ["short", "Answer to short"]
+    assert summary.endswith("a question with quite a few words in it")
+
+
+def test_summary_keeps_the_latest_topics_as_short_snippets():
+    long_question = "word " * SUMMARY_SNIPPET_CHARS
+    memory = conversation(ChatMemory(max_turns=2, max_summary_topics=2), ["one", "two", long_question, "last"])
+    summary, _ = memory.context_window(10_000)
+    topics = summary.split(": ", 1)[1].split("; ")
+    assert topics[0] == "two"
+    assert len(topics[1]) == SUMMARY_SNIPPET_CHARS and topics[1].endswith("…")
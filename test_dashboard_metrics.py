@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental agent dashboard aggregates
+"""
+
+import time
+
+from dashboard_metrics import CONTACT, FEEDBACK, PRIOR_AUTH, DashboardMetrics
+from patient_store import PatientRepository
+
+
+def make_log(tmp_path):
+    return PatientRepository(str(tmp_path / "events.sqlite3"))
+
+
+def snapshot(metrics, repository):
+    return metrics.snapshot(repository.iter_events, max_age=0)
+
+
+def test_contacts_count_once_per_patient_per_day(tmp_path):
+    repository = make_log(tmp_path)
+    metrics = DashboardMetrics()
+    now = time.time()
+    for _ in range(3):
+        repository.append_event(now, CONTACT, "PT-1", {"initiated_by": "patient"})
+    repository.append_event(now, CONTACT, "PT-1", {"initiated_by": "agent"})
+    repository.append_event(now, CONTACT, "PT-2", {"initiated_by": "agent"})
+    repository.append_event(now - 2 * 86400, CONTACT, "PT-3", {"initiated_by": "agent"})
+    assert snapshot(metrics, repository)["calls_today"] == 2
+    repository.append_event(now, CONTACT, "PT-2", {"initiated_by": "patient"})
+    assert snapshot(metrics, repository)["calls_today"] == 2
+    assert snapshot(metrics, repository)["active_patients"] == 3
+
+
+def test_prior_auth_reset_to_not_started_clears_pending(tmp_path):
+    repository = make_log(tmp_path)
+    metrics = DashboardMetrics()
+    now = time.time()
+    repository.append_event(now, PRIOR_AUTH, "PT-1", {"status": "pending"})
+    repository.append_event(now, PRIOR_AUTH, "PT-2", {"status": "pending"})
+    assert snapshot(metrics, repository)["pending_prior_auths"] == 2
+    repository.append_event(now, PRIOR_AUTH, "PT-1", {"status": None})
+    repository.append_event(now, PRIOR_AUTH, "PT-2", {"status": "approved"})
+    assert snapshot(metrics, repository)["pending_prior_auths"] == 0
+    assert metrics.prior_auth_status("PT-1") is None
+    assert metrics.prior_auth_status("PT-2") == "approved"
+
+
+def test_satisfaction_from_feedback(tmp_path):
+    repository = make_log(tmp_path)
+    metrics = DashboardMetrics()
+    assert snapshot(metrics, repository)["satisfaction"] is None
+    for helpful in (True, True, False, True):
+        repository.append_event(time.time(), FEEDBACK, "PT-1", {"helpful": helpful})
+    assert snapshot(metrics, repository)["satisfaction"] == 0.75
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Tests for reading and checkpointing batch evaluation questions
+"""
+
+from evaluate_assistant import load_checkpoint, read_questions
+
+
+def test_records_without_a_message_are_skipped_and_reported(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text(
+        '{"id": "a", "message": "What is Tysabri?"}\n'
+        '{"id": "b"}\n'
+        "\n"
+        '{"message": "   "}\n'
+        '{"message": "Can I travel?", "user_context": {"name": "Ana"}}\n'
+    )
+    skipped = []
+    questions = list(read_questions(str(path), skipped))
+    assert [(question_id, message) for question_id, message, _ in questions] == [("a", "What is Tysabri?"), ("5", "Can I travel?")]
+    assert questions[1][2]["name"] == "Ana"
+    assert skipped == [2, 4]
+
+
+def test_checkpoint_drops_a_torn_final_line(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text('{"id": "a"}\n{"id": "b"}\n{"id": "c", "ans')
+    assert load_checkpoint(str(path)) == {"a", "b"}
+    assert path.read_text() == '{"id": "a"}\n{"id": "b"}\n'
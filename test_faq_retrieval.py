@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for curated FAQ retrieval and its answer / ground / skip tiers
+"""
+
+import pytest
+
+from faq_retrieval import FaqIndex, thresholds
+
+INDEX = FaqIndex()
+
+SAFETY_QUERIES = [
+    "I have a headache, a stiff neck and fever",
+    "I have a headache after my infusion and a stiff neck and fever",
+    "what can i take for a headache with a fever and stiff neck",
+    "headaches after tysabri and confusion",
+    "I feel anxious and want to hurt myself",
+    "i feel anxious and suicidal",
+    "i am scared of the infusion, i want to die",
+]
+
+
+@pytest.fixture
+def default_thresholds(monkeypatch):
+    monkeypatch.delenv("FAQ_DIRECT_SIMILARITY", raising=False)
+    monkeypatch.delenv("FAQ_GROUNDING_SIMILARITY", raising=False)
+    return thresholds()
+
+
+def test_default_thresholds_and_overrides(default_thresholds, monkeypatch):
+    assert default_thresholds == (0.9, 0.3)
+    monkeypatch.setenv("FAQ_DIRECT_SIMILARITY", "0.95")
+    assert thresholds() == (0.95, 0.3)
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("What's Tysabri?", "tysabri"),
+    ("Tell me about natalizumab", "tysabri"),
+    ("How long does the infusion take?", "infusion_length"),
+    ("I have a headache after my infusion", "headache"),
+    ("i feel anxious", "emotional_support"),
+])
+def test_close_phrasings_clear_the_direct_threshold(question, intent):
+    match = INDEX.search(question)
+    assert match.entry.intent.name == intent and match.score >= 0.9
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("can I drink alcohol on tysabri", "tysabri"),
+    ("I have a headache", "headache"),
+    ("is it safe to take tysabri when pregnant", "tysabri"),
+])
+def test_related_questions_fall_in_the_grounding_band(question, intent):
+    match = INDEX.search(question)
+    assert match.entry.intent.name == intent and 0.3 <= match.score < 0.9
+
+
+def test_unrelated_questions_score_below_grounding():
+    assert INDEX.search("where can I park my car").score < 0.3
+    assert INDEX.search("").score == 0
+
+
+def test_unseen_words_dilute_the_match():
+    assert INDEX.search("can I drink alcohol on tysabri").score < INDEX.search("tysabri").score
+
+
+@pytest.mark.parametrize("question, action", [
+    ("What's Tysabri?", "answer"),
+    ("can I drink alcohol on tysabri", "ground"),
+    ("where can I park my car", "skip"),
+])
+def test_action_follows_the_thresholds(question, action, default_thresholds):
+    assert INDEX.search(question).action(*default_thresholds) == action
+
+
+@pytest.mark.parametrize("question", SAFETY_QUERIES)
+def test_safety_questions_stay_below_the_direct_threshold(question):
+    # Compound questions are diluted by their extra symptoms
+    assert INDEX.search(question).score < 0.9
+
+
+@pytest.mark.parametrize("question", SAFETY_QUERIES)
+def test_safety_questions_never_get_a_canned_answer(question, default_thresholds):
+    match = INDEX.search(question)
+    assert match.red_flag
+    assert match.action(*default_thresholds) != "answer"
+    # Not even if the direct threshold is tuned down
+    assert match.action(0.5, 0.3) != "answer"
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for offline address normalization and the street-typo cache
+"""
+
+from geocoding import (
+    DEFAULT_GAZETTEER, DEFAULT_STREETS, STREET, STREET_APPROX, ZIP, Gazetteer, Geocoder, normalize_address,
+    street_typo_match,
+)
+
+
+def make_geocoder():
+    return Geocoder(Gazetteer(DEFAULT_GAZETTEER, DEFAULT_STREETS))
+
+
+def test_normalizes_abbreviations_units_and_zip_plus_four():
+    address = normalize_address("12 North Main Street Apt 4, Mountain View, California 94041-1234")
+    assert address.key == "12 n main st, mountain view, ca 94041"
+    # "Ct" is a street type here, not Connecticut
+    assert normalize_address("1 Hamilton Ct, Palo Alto").street == "hamilton ct"
+
+
+def test_known_street_resolves_at_street_precision():
+    result = make_geocoder().locate("1 Lytton Ave, Palo Alto, CA 94301")
+    assert result.precision == STREET
+
+
+def test_typo_in_street_name_is_marked_approximate():
+    geocoder = make_geocoder()
+    exact = geocoder.locate("1 Lytton Ave, Palo Alto, CA 94301")
+    typo = geocoder.locate("1 Lyton Ave, Palo Alto, CA 94301")
+    assert typo.point == exact.point and typo.precision == STREET_APPROX
+    assert geocoder.stats()["fuzzy_hits"] == 1
+
+
+def test_different_streets_are_not_reused():
+    geocoder = make_geocoder()
+    lytton = geocoder.locate("1 Lytton Ave, Palo Alto, CA 94301")
+    for other in ("1 Dayton Ave, Palo Alto, CA 94301", "1 Hutton Ave, Palo Alto, CA 94301"):
+        result = geocoder.locate(other)
+        assert result.precision == ZIP and result.point != lytton.point
+    assert geocoder.stats()["fuzzy_hits"] == 0
+
+
+def test_different_street_type_or_house_number_is_not_reused():
+    geocoder = make_geocoder()
+    geocoder.locate("1 Hamilton Ave, Palo Alto, CA 94301")
+    assert geocoder.locate("1 Hamilton Ct, Palo Alto, CA 94301").precision == ZIP
+    assert geocoder.locate("2 Hamiltn Ave, Palo Alto, CA 94301").precision == STREET_APPROX
+    assert geocoder.stats()["fuzzy_hits"] == 0
+
+
+def test_street_typo_match_rules():
+    streets = ["lytton ave", "hamilton ave", "main st", "university ave"]
+    assert street_typo_match("lytton ave", streets) is None  # exact, not a typo
+    assert street_typo_match("lyttno ave", streets) == "lytton ave"  # transposition
+    assert street_typo_match("univeristy ave", streets) == "university ave"
+    assert street_typo_match("mian st", streets) is None  # short names are never fuzzed
+    assert street_typo_match("lytton st", streets) is None
+    # Ambiguous: one edit from both
+    assert street_typo_match("hatton ave", ["hutton ave", "hatten ave"]) is None
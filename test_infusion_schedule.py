@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized infusion schedule engine
+"""
+
+import numpy as np
+import pytest
+
+from infusion_schedule import (
+    RecurrenceRule, appointment_series, bulk_appointment_series, parse_clinic_hours, regenerate_all, reschedule_series,
+    to_iso,
+)
+from patient_store import PatientRepository, synthetic_patients
+
+EVERY_DAY = RecurrenceRule(holidays=())
+WEEKDAYS_ONLY = RecurrenceRule.for_clinic("Mon-Fri 8AM-6PM", holidays=())
+
+
+def test_parse_clinic_hours():
+    assert parse_clinic_hours("Mon-Fri 8AM-6PM") == ("1111100", 8.0, 18.0)
+    assert parse_clinic_hours("Mon,Wed,Fri 7:30AM-12PM") == ("1010100", 7.5, 12.0)
+    # Ranges can wrap past Sunday
+    assert parse_clinic_hours("Sat-Mon 9AM-1PM")[0] == "1000011"
+    with pytest.raises(ValueError):
+        parse_clinic_hours("weekdays, mornings")
+
+
+def test_series_every_interval_days():
+    series = to_iso(appointment_series("2025-10-25", EVERY_DAY))
+    assert series == ["2025-10-25", "2025-11-22", "2025-12-20", "2026-01-17", "2026-02-14", "2026-03-14"]
+
+
+def test_closed_day_shifts_only_that_infusion():
+    # 2025-10-25 is a Saturday, so only the dates that land on weekends move
+    series = to_iso(appointment_series("2025-10-25", WEEKDAYS_ONLY))
+    assert series[:2] == ["2025-10-27", "2025-11-24"]
+    skip = RecurrenceRule(holidays=(), skip_dates=("2025-11-22",))
+    assert to_iso(appointment_series("2025-10-25", skip)) == [
+        "2025-10-25", "2025-11-23", "2025-12-20", "2026-01-17", "2026-02-14", "2026-03-14",
+    ]
+
+
+def test_bulk_matches_one_at_a_time():
+    starts = ["2025-10-25", "2025-12-24", "2026-01-01"]
+    bulk = bulk_appointment_series(starts, WEEKDAYS_ONLY)
+    assert bulk.shape == (3, WEEKDAYS_ONLY.count)
+    for start, row in zip(starts, bulk):
+        assert np.array_equal(row, appointment_series(start, WEEKDAYS_ONLY))
+
+
+def test_reschedule_keeps_earlier_dates_and_series_length():
+    series = appointment_series("2025-10-25", EVERY_DAY)
+    moved = to_iso(reschedule_series(series, "2025-12-18", EVERY_DAY))
+    assert moved[:2] == ["2025-10-25", "2025-11-22"]
+    assert moved[2:] == ["2025-12-18", "2026-01-15", "2026-02-12", "2026-03-12"]
+    assert len(to_iso(reschedule_series(series, "2025-10-01", EVERY_DAY))) == EVERY_DAY.count
+
+
+def test_regenerate_all_updates_every_patient(tmp_path):
+    repository = PatientRepository(str(tmp_path / "patients.sqlite3"))
+    repository.bulk_load(synthetic_patients(30))
+    assert regenerate_all(repository, WEEKDAYS_ONLY, batch_size=7) == 30
+    weekdays = [np.is_busday(start, weekmask=WEEKDAYS_ONLY.weekmask)
+                for patient_ids, starts in repository.iter_next_appointments(batch_size=10) for start in starts]
+    assert len(weekdays) == 30 and all(weekdays)
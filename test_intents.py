@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the demo-mode intent matcher
+"""
+
+import pytest
+
+from intents import DEMO_MATCHER, FALLBACK_INTENT, Intent, IntentMatcher
+
+CONTEXT = {"name": "Sarah Johnson", "nextInfusion": "October 25, 2025"}
+
+
+def classify(message):
+    return DEMO_MATCHER.classify(message).name
+
+
+@pytest.mark.parametrize("message", ["Is this normal", "Can I eat anything beforehand", "My hip hurts", "Which chair"])
+def test_keywords_inside_other_words_do_not_match(message):
+    # "hi" in "this", "hip" and "Which"; "hey"/"ride" nowhere as words
+    assert classify(message) == "fallback"
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("hi", "greeting"),
+    ("Hi, thanks", "thanks"),
+    ("HEY there", "greeting"),
+    ("Book me a ride", "transportation"),
+])
+def test_keywords_match_as_whole_words_in_any_case(message, intent):
+    assert classify(message) == intent
+
+
+@pytest.mark.parametrize("message, intent", [
+    # Specific symptoms outrank side effects in general, and both outrank the overview
+    ("Is a headache a side effect of Tysabri", "headache"),
+    ("What side effects does Tysabri have", "side_effects"),
+    # Feelings outrank symptoms
+    ("I'm anxious about the headaches", "emotional_support"),
+    # Greetings and thanks lose to anything more specific
+    ("Hi, when is my next infusion?", "appointment"),
+    ("Thanks! Can you book a ride?", "transportation"),
+    # A bare question only reaches the general fallback
+    ("Could you explain that again?", "general_question"),
+])
+def test_highest_priority_intent_wins(message, intent):
+    assert classify(message) == intent
+
+
+def test_priority_ties_go_to_the_intent_declared_first():
+    first = Intent("first", 50, ("alpha",), "first")
+    second = Intent("second", 50, ("beta",), "second")
+    matcher = IntentMatcher((first, second), FALLBACK_INTENT)
+    assert matcher.classify("beta then alpha").name == "first"
+    assert [intent.name for intent in matcher.matches("beta then alpha")] == ["second", "first"]
+    assert IntentMatcher((), FALLBACK_INTENT).classify("alpha") is FALLBACK_INTENT
+
+
+def test_render_fills_in_the_patient_context():
+    text = DEMO_MATCHER.classify("When is my next infusion?").render("", dict(CONTEXT, nextInfusion="November 3, 2025"))
+    assert "November 3, 2025" in text
+    assert DEMO_MATCHER.classify("hello").render("hello", CONTEXT).startswith("Hello Sarah!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite patient store
+"""
+
+import threading
+
+from patient_store import PatientRepository, synthetic_patients
+
+
+def make_repository(tmp_path, patients=50):
+    repository = PatientRepository(str(tmp_path / "patients.sqlite3"))
+    repository.bulk_load(synthetic_patients(patients))
+    return repository
+
+
+def test_bulk_load_round_trips_patients(tmp_path):
+    repository = make_repository(tmp_path, patients=20)
+    assert repository.count_patients() == 20
+    patient = repository.get_patient("PT-001003")
+    assert patient["status"] in ("High Priority", "Medium Priority", "Low Priority")
+    assert isinstance(patient["concerns"], list) and len(patient["concerns"]) == 2
+    assert repository.get_patient("PT-999999") is None
+
+
+def test_saving_appointments_moves_the_next_appointment(tmp_path):
+    repository = make_repository(tmp_path, patients=3)
+    repository.save_appointments("PT-001001", ["2026-02-02", "2026-01-05"])
+    assert repository.get_appointments("PT-001001") == ["2026-02-02", "2026-01-05"]
+    assert repository.get_patient("PT-001001")["next_appointment"] == "2026-01-05"
+    repository.save_appointments("PT-001001", [])
+    assert repository.get_appointments("PT-001001") == []
+    assert repository.get_patient("PT-001001")["next_appointment"] is None
+
+
+def test_record_contact(tmp_path):
+    repository = make_repository(tmp_path, patients=3)
+    repository.record_contact("PT-001002", "2026-03-01")
+    assert repository.get_patient("PT-001002")["last_contact"] == "2026-03-01"
+
+
+def test_one_connection_is_shared_across_threads(tmp_path):
+    repository = make_repository(tmp_path)
+    connection = repository._shared
+    errors = []
+
+    def worker(index):
+        try:
+            for _ in range(20):
+                repository.record_contact(f"PT-{1000 + index:06d}", "2026-01-01")
+                repository.query_patients(limit=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert repository._shared is connection
+    assert repository.get_patient("PT-001007")["last_contact"] == "2026-01-01"
+
+
+def test_writes_between_appointment_batches(tmp_path):
+    repository = make_repository(tmp_path, patients=25)
+    seen = []
+    for patient_ids, starts in repository.iter_next_appointments(batch_size=10):
+        seen.extend(patient_ids)
+        repository.save_appointments_bulk(patient_ids, [[start] for start in starts])
+    assert len(seen) == len(set(seen)) == 25
+
+
+def test_reloading_patients_keeps_their_appointments(tmp_path):
+    repository = make_repository(tmp_path, patients=3)
+    repository.save_appointments("PT-001000", ["2026-01-05", "2026-02-02"], "Palo Alto Infusion Center", [8.0, 9.5])
+    repository.bulk_load(synthetic_patients(3))
+    assert repository.get_bookings("PT-001000") == [
+        ("2026-01-05", "Palo Alto Infusion Center", 8.0),
+        ("2026-02-02", "Palo Alto Infusion Center", 9.5),
+    ]
+    repository.bulk_load([{"patient_id": "PT-001000", "name": "Renamed Patient", "priority": 1}])
+    assert repository.get_patient("PT-001000")["name"] == "Renamed Patient"
+    assert len(repository.get_bookings("PT-001000")) == 2
+
+
+def test_name_search_matches_wildcards_literally(tmp_path):
+    repository = make_repository(tmp_path, patients=5)
+    repository.bulk_load([
+        {"patient_id": "PT-100", "name": "Ann 100% Lee", "priority": 1},
+        {"patient_id": "PT-101", "name": "Ann_Lee", "priority": 1},
+        {"patient_id": "PT-102", "name": "Ann\\Lee", "priority": 1},
+    ])
+    assert [info["name"] for info in repository.query_patients(name_contains="0%")[0]] == ["Ann 100% Lee"]
+    assert [info["name"] for info in repository.query_patients(name_contains="n_L")[0]] == ["Ann_Lee"]
+    assert [info["name"] for info in repository.query_patients(name_contains="n\\L")[0]] == ["Ann\\Lee"]
+    assert repository.query_patients(name_contains="%")[1] == 1
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for E.164 phone number normalization
+"""
+
+import pytest
+
+from phone_numbers import (
+    EMPTY, INVALID_AREA_CODE, INVALID_CHARACTERS, INVALID_COUNTRY_CODE, MISSING_COUNTRY_CODE, TOO_LONG, TOO_SHORT,
+    PhoneNumberError, normalize_many, normalize_phone, parse_phone,
+)
+
+
+@pytest.mark.parametrize("text", [
+    "(650) 123-4567",
+    "650.123.4567",
+    "+1 650 123 4567",
+    "1-650-123-4567",
+    "001 650 123 4567",
+    "650 123‑4567",
+])
+def test_north_american_formats(text):
+    assert normalize_phone(text) == "+16501234567"
+
+
+def test_international_numbers_keep_their_country_code():
+    assert normalize_phone("+44 20 7946 0958") == "+442079460958"
+    assert normalize_phone("0044 20 7946 0958") == "+442079460958"
+
+
+@pytest.mark.parametrize("text, code", [
+    ("", EMPTY),
+    (None, EMPTY),
+    ("  - ", EMPTY),
+    ("650-123-4567 ext 12", INVALID_CHARACTERS),
+    ("+1 650 123 45x7", INVALID_CHARACTERS),
+    ("123-4567", TOO_SHORT),
+    ("+44 1234", TOO_SHORT),
+    ("+1234567890123456", TOO_LONG),
+    ("+0 650 123 4567", INVALID_COUNTRY_CODE),
+    ("0650123456789", INVALID_COUNTRY_CODE),
+    ("(150) 123-4567", INVALID_AREA_CODE),
+    ("1 050 123 4567", INVALID_AREA_CODE),
+    ("650123456789", MISSING_COUNTRY_CODE),
+    ("44 20 7946 0958", MISSING_COUNTRY_CODE),
+    ("961234567890123", MISSING_COUNTRY_CODE),
+])
+def test_error_codes(text, code):
+    number, error = parse_phone(text)
+    assert number is None and error.code == code and error.number == text
+    with pytest.raises(PhoneNumberError) as raised:
+        normalize_phone(text)
+    assert raised.value.code == code
+
+
+def test_memoized_failures_raise_a_fresh_exception_each_time():
+    errors = []
+    for _ in range(3):
+        try:
+            normalize_phone("123")
+        except PhoneNumberError as e:
+            errors.append(e)
+    assert len({id(error) for error in errors}) == 3
+    assert all(len(list(_frames(error.__traceback__))) == 2 for error in errors)
+
+
+def _frames(traceback):
+    while traceback is not None:
+        yield traceback
+        traceback = traceback.tb_next
+
+
+def test_normalize_many_reports_errors_by_index():
+    normalized, errors = normalize_many(["650-123-4567", "nope", "+44 20 7946 0958"])
+    assert normalized == ["+16501234567", None, "+442079460958"]
+    assert list(errors) == [1] and errors[1].code == INVALID_CHARACTERS
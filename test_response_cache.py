@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the exact and paraphrase response cache tiers
+"""
+
+import prompts
+from response_cache import CONTEXT_FIELDS, ResponseCache
+from semantic_cache import SemanticCache
+
+CONTEXT = {
+    "patientId": "SP-2025-001",
+    "name": "Sarah Parker",
+    "role": "patient",
+    "diagnosis": "Relapsing-Remitting MS",
+    "therapy": "Tysabri",
+    "nextInfusion": "October 25, 2025",
+}
+
+
+def test_normalized_questions_share_an_answer():
+    cache = ResponseCache()
+    cache.set("What is Tysabri?", CONTEXT, "answer")
+    assert cache.get("  what is   TYSABRI ", CONTEXT) == "answer"
+    assert cache.get("What is Tysabri used for?", CONTEXT) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("first question", CONTEXT, "1")
+    cache.set("second question", CONTEXT, "2")
+    assert cache.get("first question", CONTEXT) == "1"
+    cache.set("third question", CONTEXT, "3")
+    assert cache.get("second question", CONTEXT) is None
+    assert cache.get("first question", CONTEXT) == "1"
+
+
+def test_expired_entries_miss():
+    cache = ResponseCache(ttl_seconds=0)
+    cache.set("What is Tysabri?", CONTEXT, "answer")
+    assert cache.get("What is Tysabri?", CONTEXT) is None
+
+
+def test_disk_tier_survives_reopen_under_same_namespace(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(db_path=db_path, namespace="v1").set("What is Tysabri?", CONTEXT, "answer")
+    assert ResponseCache(db_path=db_path, namespace="v1").get("what is tysabri", CONTEXT) == "answer"
+
+
+def test_namespace_change_clears_disk_tier(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(db_path=db_path, namespace="v1").set("What is Tysabri?", CONTEXT, "answer")
+    assert ResponseCache(db_path=db_path, namespace="v2").get("What is Tysabri?", CONTEXT) is None
+    # The old answers are gone, not just hidden
+    assert ResponseCache(db_path=db_path, namespace="v1").get("What is Tysabri?", CONTEXT) is None
+
+
+def test_fingerprint_tracks_completion_params(monkeypatch):
+    before = prompts.prompt_fingerprint()
+    prompts.prompt_fingerprint.cache_clear()
+    monkeypatch.setitem(prompts.COMPLETION_PARAMS, "model", "gpt-4o")
+    try:
+        assert prompts.prompt_fingerprint() != before
+    finally:
+        prompts.prompt_fingerprint.cache_clear()
+
+
+def test_patients_sharing_a_name_do_not_share_answers():
+    cache = ResponseCache()
+    other = dict(CONTEXT, patientId="SP-2025-999")
+    cache.set("When is my next infusion?", CONTEXT, "October 25")
+    assert cache.get("When is my next infusion?", other) is None
+
+
+def test_context_change_invalidates_patient():
+    cache = ResponseCache(semantic=SemanticCache(CONTEXT_FIELDS))
+    cache.set("When is my next infusion?", CONTEXT, "October 25")
+    moved = dict(CONTEXT, nextInfusion="November 1, 2025")
+    assert cache.get("When is my next infusion?", moved) is None
+    assert cache.get("When is my next infusion?", CONTEXT) is None
+
+
+def test_paraphrase_hits_only_within_the_same_context():
+    cache = ResponseCache(semantic=SemanticCache(CONTEXT_FIELDS))
+    cache.set("What can I eat before my infusion?", CONTEXT, "A light meal")
+    assert cache.get("what should I eat before the infusion", CONTEXT) == "A light meal"
+    assert cache.get("what should I eat before the infusion", dict(CONTEXT, patientId="SP-2025-999")) is None
+    assert cache.get("can I drink wine before my infusion", CONTEXT) is None
+    assert cache.stats()["semantic_hits"] == 1
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized ride time and fare estimates
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from ride_estimates import (
+    AVERAGE_MPH, DETOUR_FACTOR, RETURN_AFTER_HOURS, SURGE_BY_HOUR, TIER_RATES, TIERS, TRAFFIC_BY_HOUR,
+    RideEstimator, estimate_matrix,
+)
+
+PICKUP = (42.3601, -71.0589)
+CENTERS = [
+    {"name": "Near", "lat": 42.3736, "lon": -71.1097},
+    {"name": "Far", "lat": 42.4501, "lon": -71.2257},
+    {"name": "Middle", "lat": 42.3396, "lon": -71.1581},
+]
+
+
+def scalar_estimate(origin, destination, tier, hour):
+    """One trip priced the long way, term by term"""
+    lat1, lon1, lat2, lon2 = map(math.radians, origin + destination)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    miles = 2 * 3958.8 * math.asin(math.sqrt(a)) * DETOUR_FACTOR
+    base, fee, per_mile, per_minute, minimum, pickup_wait = TIER_RATES[TIERS.index(tier)]
+    drive = miles / AVERAGE_MPH * 60 * TRAFFIC_BY_HOUR[hour]
+    fare = max(base + fee + per_mile * miles + per_minute * drive, minimum) * SURGE_BY_HOUR[hour]
+    return miles, drive + pickup_wait, fare
+
+
+@pytest.mark.parametrize("tier", TIERS)
+@pytest.mark.parametrize("hour", [3, 8, 11, 17])
+def test_matrix_matches_the_scalar_formula(tier, hour):
+    destination = (CENTERS[1]["lat"], CENTERS[1]["lon"])
+    miles, minutes, fares = estimate_matrix([PICKUP[0]], [PICKUP[1]], [destination[0]], [destination[1]], [hour])
+    expected = scalar_estimate(PICKUP, destination, tier, hour)
+    column = TIERS.index(tier)
+    assert (miles[0, 0], minutes[0, 0, column, 0], fares[0, 0, column, 0]) == pytest.approx(expected, rel=1e-3)
+
+
+def test_rush_hour_slows_the_drive_and_raises_the_fare():
+    _, minutes, fares = estimate_matrix([PICKUP[0]], [PICKUP[1]], [CENTERS[1]["lat"]], [CENTERS[1]["lon"]], [11, 8, 32])
+    pickup_wait = TIER_RATES[:, 5]
+    drive = minutes[0, 0, :, :] - pickup_wait[:, None]
+    assert drive[:, 1] / drive[:, 0] == pytest.approx([TRAFFIC_BY_HOUR[8]] * len(TIERS))
+    assert (fares[0, 0, :, 1] > fares[0, 0, :, 0] * SURGE_BY_HOUR[8]).all()
+    # Hours wrap around the day
+    assert np.array_equal(minutes[..., 1], minutes[..., 2])
+
+
+def test_centers_rank_by_distance_time_and_fare():
+    estimates = RideEstimator().estimate(*PICKUP, CENTERS, hour=11)
+    assert [CENTERS[index]["name"] for index in estimates.order("miles")] == ["Near", "Middle", "Far"]
+    assert [CENTERS[index]["name"] for index in estimates.order("minutes", tier="XL")] == ["Near", "Middle", "Far"]
+    assert list(estimates.order("fare", round_trip=True)) == list(estimates.order("fare"))
+    one_way, round_trip = estimates.trip(2, "Comfort"), estimates.trip(2, "Comfort", round_trip=True)
+    assert round_trip[0] > one_way[0] and round_trip[1] > one_way[1]
+
+
+def test_ride_home_uses_the_traffic_after_the_infusion():
+    estimator = RideEstimator()
+    estimates = estimator.estimate(*PICKUP, CENTERS, hour=13)
+    # Estimates are made from the middle of the pickup's grid cell
+    origin = [(math.floor(value / estimator.cell_degrees) + 0.5) * estimator.cell_degrees for value in PICKUP]
+    _, minutes, fares = estimate_matrix([origin[0]], [origin[1]], [CENTERS[0]["lat"]], [CENTERS[0]["lon"]], [13 + RETURN_AFTER_HOURS])
+    assert (estimates.return_minutes[0, 0], estimates.return_fares[0, 0]) == pytest.approx((minutes[0, 0, 0, 0], fares[0, 0, 0, 0]))
+
+
+def test_nearby_pickups_share_cached_estimates():
+    estimator = RideEstimator(max_entries=2)
+    first = estimator.estimate(*PICKUP, CENTERS, hour=9)
+    assert estimator.estimate(PICKUP[0] + 0.0001, PICKUP[1] + 0.0001, CENTERS, hour=33) is first
+    assert estimator.estimate(*PICKUP, CENTERS, hour=10) is not first
+    assert estimator.estimate(*PICKUP, CENTERS[:2], hour=9) is not first
+    # The least recently used entry was evicted
+    assert estimator.estimate(*PICKUP, CENTERS, hour=9) is not first
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the paraphrase (semantic) answer cache
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import semantic_cache
+from reference_data import PATIENT_CONTEXT
+from response_cache import CONTEXT_FIELDS
+from semantic_cache import SemanticCache, embed
+
+OTHER_PATIENT = dict(PATIENT_CONTEXT, patientId="SP-2025-999", name="Jordan Lee")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(semantic_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_embeddings_are_unit_length_or_empty():
+    assert np.linalg.norm(embed("Can I drive home after my infusion?")) == pytest.approx(1.0)
+    assert not embed("?").any()
+
+
+def test_paraphrase_clears_the_threshold():
+    cache = SemanticCache(CONTEXT_FIELDS)
+    cache.set("Can I drive home after my infusion?", PATIENT_CONTEXT, "Usually, yes")
+    response, similarity = cache.get("can I drive home after infusions", PATIENT_CONTEXT)
+    assert response == "Usually, yes" and similarity >= cache.threshold
+    assert cache.recent_hits[-1][1:] == ("can I drive home after infusions", "Can I drive home after my infusion?")
+
+
+def test_questions_differing_in_one_key_word_miss():
+    cache = SemanticCache(CONTEXT_FIELDS)
+    cache.set("Can I take Tysabri while pregnant?", PATIENT_CONTEXT, "Talk to your neurologist before trying to conceive")
+    assert cache.get("Can I take Tysabri while breastfeeding?", PATIENT_CONTEXT) is None
+    # A question with no content words never matches anything
+    assert cache.get("?", PATIENT_CONTEXT) is None
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
+
+
+def test_answers_stay_in_their_patient_context():
+    cache = SemanticCache(CONTEXT_FIELDS)
+    cache.set("Can I drive home after my infusion?", PATIENT_CONTEXT, "Usually, yes")
+    cache.set("Can I drive home after my infusion?", OTHER_PATIENT, "Not after your first one")
+    assert cache.get("can I drive home after infusions", OTHER_PATIENT)[0] == "Not after your first one"
+    # A moved appointment changes the prompt, so it is a different partition
+    assert cache.get("can I drive home after infusions", dict(PATIENT_CONTEXT, nextInfusion="November 3, 2025")) is None
+    assert cache.stats()["partitions"] == 2
+
+    cache.invalidate_patient(OTHER_PATIENT["patientId"])
+    assert cache.get("can I drive home after infusions", OTHER_PATIENT) is None
+    assert cache.get("can I drive home after infusions", PATIENT_CONTEXT)[0] == "Usually, yes"
+    assert cache.stats()["entries"] == 1
+
+
+def test_expired_entries_give_way_to_the_next_closest(clock):
+    cache = SemanticCache(CONTEXT_FIELDS, threshold=0.5, ttl_seconds=100)
+    cache.set("Can I drive home after my infusion?", PATIENT_CONTEXT, "old")
+    clock.value += 50
+    cache.set("can I drive myself home after the infusions", PATIENT_CONTEXT, "newer")
+    assert cache.get("Can I drive home after my infusion?", PATIENT_CONTEXT)[0] == "old"
+    clock.value += 60
+    assert cache.get("Can I drive home after my infusion?", PATIENT_CONTEXT)[0] == "newer"
+    assert cache.stats()["entries"] == 1
+    clock.value += 100
+    assert cache.get("Can I drive home after my infusion?", PATIENT_CONTEXT) is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["partitions"] == 0
+
+
+def test_eviction_is_least_recently_used_across_partitions():
+    cache = SemanticCache(CONTEXT_FIELDS, max_entries=2)
+    cache.set("Can I drive home after my infusion?", PATIENT_CONTEXT, "1")
+    cache.set("What should I eat before my infusion?", OTHER_PATIENT, "2")
+    assert cache.get("Can I drive home after my infusion?", PATIENT_CONTEXT)[0] == "1"
+    cache.set("Where do I park at the center?", PATIENT_CONTEXT, "3")
+    assert cache.get("What should I eat before my infusion?", OTHER_PATIENT) is None
+    assert cache.stats()["entries"] == 2 and cache.stats()["partitions"] == 1
+
+
+def test_repeating_a_question_replaces_its_answer():
+    cache = SemanticCache(CONTEXT_FIELDS, max_entries=2)
+    cache.set("Can I drive home after my infusion?", PATIENT_CONTEXT, "old")
+    cache.set("Can I drive home after my infusion?", PATIENT_CONTEXT, "new")
+    cache.set("Where do I park at the center?", PATIENT_CONTEXT, "lot B")
+    assert cache.get("Can I drive home after my infusion?", PATIENT_CONTEXT)[0] == "new"
+    assert cache.get("Where do I park at the center?", PATIENT_CONTEXT)[0] == "lot B"
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the chair slot allocator's booking window and capacity handling
+"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from slot_allocator import OutsideBookingHorizon, SlotAllocator, SlotUnavailable
+
+CENTER = {"name": "Test Center", "hours": "Mon-Fri 8AM-12PM", "chairs": 1}
+
+
+class Clock:
+    def __init__(self, today):
+        self.today = today
+
+    def __call__(self):
+        return self.today
+
+
+def make_allocator(today=date(2027, 6, 1), horizon_days=3 * 365):
+    clock = Clock(today)
+    return SlotAllocator(centers=[CENTER], epoch="2025-01-01", horizon_days=horizon_days, holidays=(), clock=clock), clock
+
+
+def test_books_past_the_original_three_year_grid():
+    allocator, _ = make_allocator()
+    slot = allocator.next_available("Test Center", "2028-01-05")
+    assert slot is not None and slot.date == np.datetime64("2028-01-05")
+    assert allocator.is_free("Test Center", "2028-02-01", 8)
+    series = allocator.place_series("Test Center", ["2027-11-15", "2027-12-13", "2028-01-10", "2028-02-07"], "P1")
+    assert [str(booking.date) for booking in series][-1] == "2028-02-07"
+
+
+def test_dates_outside_the_window_raise_horizon_error():
+    allocator, _ = make_allocator(today=date(2026, 1, 1), horizon_days=30)
+    assert not allocator.is_free("Test Center", "2024-12-31", 8)
+    assert not allocator.is_free("Test Center", "2026-03-01", 8)
+    with pytest.raises(OutsideBookingHorizon):
+        allocator.next_available("Test Center", "2024-12-01")
+    with pytest.raises(OutsideBookingHorizon):
+        allocator.book("Test Center", "2026-03-02", 8)
+
+
+def test_last_day_of_window_is_bookable():
+    allocator, _ = make_allocator(today=date(2026, 1, 1), horizon_days=30)
+    # 2026-01-31 is a Saturday, so the last open day is Friday the 30th
+    assert allocator.book("Test Center", "2026-01-30", 8).date == np.datetime64("2026-01-30")
+    with pytest.raises(OutsideBookingHorizon):
+        allocator.book("Test Center", "2026-02-02", 8)
+
+
+def test_window_rolls_forward_with_the_clock():
+    allocator, clock = make_allocator(today=date(2026, 1, 1), horizon_days=30)
+    with pytest.raises(OutsideBookingHorizon):
+        allocator.book("Test Center", "2026-03-02", 8)
+    clock.today = date(2026, 2, 15)
+    assert allocator.book("Test Center", "2026-03-02", 8).start_hour == 8
+
+
+def test_series_crossing_the_horizon_is_rolled_back():
+    allocator, _ = make_allocator(today=date(2026, 1, 1), horizon_days=30)
+    with pytest.raises(OutsideBookingHorizon):
+        allocator.place_series("Test Center", ["2026-01-05", "2026-01-19", "2026-02-16"], "P1")
+    assert allocator.is_free("Test Center", "2026-01-05", 8)
+    assert allocator.is_free("Test Center", "2026-01-19", 8)
+
+
+def test_full_day_moves_to_next_open_day():
+    allocator, _ = make_allocator(today=date(2026, 1, 1))
+    # Two-hour infusions in a four-hour day with one chair: 8AM and 10AM
+    allocator.book("Test Center", "2026-01-05", 8)
+    allocator.book("Test Center", "2026-01-05", 10)
+    with pytest.raises(SlotUnavailable) as error:
+        allocator.book("Test Center", "2026-01-05", 9)
+    assert not isinstance(error.value, OutsideBookingHorizon)
+    slot = allocator.next_available("Test Center", "2026-01-05")
+    assert slot.date == np.datetime64("2026-01-06") and slot.start_hour == 8
+
+
+def test_reschedule_keeps_old_bookings_when_new_series_does_not_fit():
+    allocator, _ = make_allocator(today=date(2026, 1, 1), horizon_days=30)
+    allocator.place_series("Test Center", ["2026-01-05"], "P1")
+    with pytest.raises(OutsideBookingHorizon):
+        allocator.reschedule_patient("Test Center", ["2026-01-12", "2026-03-09"], "P1")
+    assert not allocator.is_free("Test Center", "2026-01-05", 8)
+    assert allocator.is_free("Test Center", "2026-01-12", 8)